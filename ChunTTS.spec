@@ -27,6 +27,10 @@ a = Analysis(
         'pydub.utils',             
         'pydub.scipy_effects',
         'pydub.effects',
+        # Provider services are imported by name from services/registry.py
+        'services.gtts_service',
+        'services.edge_tts_service',
+        'services.pyttsx3_service',
     ],
     hookspath=[],                  
     runtime_hooks=[],              
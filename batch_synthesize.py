@@ -0,0 +1,267 @@
+import argparse
+import csv
+import json
+import os
+import re
+import shutil
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+
+from services.tts_manager import TTSManager
+from utils.config_manager import ConfigManager
+from utils.audio_processor import AudioProcessor
+from utils import audio_format, tracing
+
+# Default number of simultaneous jobs per provider
+DEFAULT_CONCURRENCY = {'gtts': 4, 'edge_tts': 8, 'pyttsx3': 1}
+
+
+def parse_concurrency(value):
+    """Parse 'gtts=4,edge_tts=8' into a dict"""
+    limits = dict(DEFAULT_CONCURRENCY)
+    for part in filter(None, (value or '').split(',')):
+        name, _, count = part.partition('=')
+        limits[name.strip()] = max(1, int(count))
+    return limits
+
+
+def _json_record(line):
+    """A JSONL line as a dict, or None if it isn't a JSON object"""
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return None
+    return record if isinstance(record, dict) else None
+
+
+def read_rows(input_path, input_format, defaults):
+    """Yield job dicts (id, text, provider, voice, rate, pitch) from a TXT, CSV or JSONL file.
+
+    A row that can't be parsed is yielded as {'id', 'error'} instead, so one
+    bad line doesn't stop the rest of the file.
+    """
+    if input_format == 'auto':
+        input_format = Path(input_path).suffix.lower().lstrip('.') or 'txt'
+
+    with open(input_path, 'r', encoding='utf-8', newline='') as f:
+        if input_format == 'csv':
+            records = csv.DictReader(f)
+        elif input_format in ('jsonl', 'json'):
+            records = (_json_record(line) for line in f if line.strip())
+        elif input_format == 'txt':
+            records = ({'text': line.strip()} for line in f)
+        else:
+            raise ValueError(f"Unsupported input format: {input_format}")
+
+        for number, record in enumerate(records, start=1):
+            if record is None:
+                yield {'id': str(number), 'error': 'invalid JSON object'}
+                continue
+            row_id = str(record.get('id') or number)
+            text = record.get('text') or ''
+            if not isinstance(text, str):
+                yield {'id': row_id, 'error': 'text must be a string'}
+                continue
+            text = text.strip()
+            if not text:
+                continue
+            try:
+                rate = float(record.get('rate') or defaults['rate'])
+                pitch = float(record.get('pitch') or defaults['pitch'])
+            except (TypeError, ValueError):
+                yield {'id': row_id, 'error': 'invalid rate/pitch'}
+                continue
+            provider = record.get('provider') or defaults['provider']
+            voice = record.get('voice') or defaults['voice']
+            if not isinstance(provider, str) or not isinstance(voice, str):
+                yield {'id': row_id, 'error': 'provider and voice must be strings'}
+                continue
+            yield {
+                'id': row_id,
+                'text': text,
+                'provider': provider,
+                'voice': voice,
+                'rate': rate,
+                'pitch': pitch,
+            }
+
+
+def load_completed(manifest_path):
+    """Ids already synthesized successfully in a previous run"""
+    completed = set()
+    if not os.path.exists(manifest_path):
+        return completed
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # Last line may be truncated if the previous run was killed mid-write
+                continue
+            if entry.get('status') == 'ok':
+                completed.add(entry['id'])
+    return completed
+
+
+class ManifestWriter:
+    """Append-only JSONL manifest shared by the worker threads"""
+
+    def __init__(self, manifest_path):
+        self._file = open(manifest_path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+
+    def write(self, entry):
+        with self._lock:
+            self._file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def safe_filename(job_id):
+    return re.sub(r'[^A-Za-z0-9._-]+', '_', job_id)[:120] or 'item'
+
+
+def synthesize_row(tts_manager, row, output_dir, measure_duration, output_format=None):
+    """Synthesize one row and build its manifest entry"""
+    entry = {'id': row['id'], 'provider': row['provider'], 'voice': row['voice']}
+    started = time.perf_counter()
+    try:
+        with tracing.span('batch.row', row_id=row['id'], provider=row['provider']):
+            if tts_manager.is_long_text(row['text']):
+                path = tts_manager.generate_long_audio(
+                    row['text'], row['provider'], row['voice'], row['rate'], row['pitch'], priority='batch'
+                )
+            else:
+                path = tts_manager.generate_audio(
+                    row['text'], row['provider'], row['voice'], row['rate'], row['pitch'], priority='batch'
+                )
+        if output_dir:
+            suffix = f".{audio_format.extension_for(output_format)}" if output_format else Path(path).suffix
+            target = output_dir / f"{safe_filename(row['id'])}{suffix}"
+            if output_format:
+                path = tts_manager.convert_audio(path, output_format, target).result()
+            else:
+                shutil.copyfile(path, target)
+                path = str(target)
+        elif output_format:
+            path = tts_manager.convert_audio(path, output_format).result()
+        entry.update({
+            'status': 'ok',
+            'path': path,
+            'bytes': os.path.getsize(path),
+            'duration_ms': AudioProcessor.get_audio_duration(path) if measure_duration else None,
+        })
+    except Exception as e:
+        entry.update({'status': 'error', 'error': str(e)})
+    entry['latency_s'] = round(time.perf_counter() - started, 3)
+    entry['finished_at'] = time.time()
+    return entry
+
+
+def run_batch(args):
+    config = ConfigManager(args.config)
+    tts_manager = TTSManager(config)
+    limits = parse_concurrency(args.concurrency)
+    defaults = {'provider': args.provider, 'voice': args.voice, 'rate': args.rate, 'pitch': args.pitch}
+
+    output_dir = Path(args.output_dir) if args.output_dir else None
+    if output_dir:
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+    completed = load_completed(args.manifest)
+    if completed:
+        print(f"Resuming: {len(completed)} rows already done according to {args.manifest}")
+
+    manifest = ManifestWriter(args.manifest)
+    executors = {}
+    pending = set()
+    counts = {'ok': 0, 'error': 0, 'skipped': 0}
+    interrupted = False
+
+    def collect(done):
+        for future in done:
+            entry = future.result()
+            manifest.write(entry)
+            counts[entry['status']] += 1
+            if entry['status'] == 'error':
+                print(f"[{entry['id']}] failed: {entry['error']}")
+        finished = counts['ok'] + counts['error']
+        if finished and finished % args.progress_every == 0:
+            print(f"Progress: {counts['ok']} ok, {counts['error']} failed, {len(pending)} in flight")
+
+    try:
+        for row in read_rows(args.input, args.format, defaults):
+            if row['id'] in completed:
+                counts['skipped'] += 1
+                continue
+            if 'error' in row:
+                manifest.write({'id': row['id'], 'status': 'error', 'error': row['error'], 'finished_at': time.time()})
+                counts['error'] += 1
+                print(f"[{row['id']}] skipped: {row['error']}")
+                continue
+            provider = row['provider']
+            if provider not in executors:
+                executors[provider] = ThreadPoolExecutor(
+                    max_workers=limits.get(provider, 1), thread_name_prefix=f"batch-{provider}"
+                )
+            pending.add(executors[provider].submit(
+                synthesize_row, tts_manager, row, output_dir, not args.no_duration, args.audio_format
+            ))
+            # Bound the number of queued rows so huge inputs are streamed, not loaded at once
+            if len(pending) >= args.max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            collect(done)
+    except KeyboardInterrupt:
+        interrupted = True
+        print("Interrupted, finishing in-flight rows. Rerun with the same manifest to resume.")
+        for future in pending:
+            future.cancel()
+        for executor in executors.values():
+            executor.shutdown(wait=True)
+        # Record rows that were already running so the rerun doesn't redo them
+        collect([f for f in pending if not f.cancelled()])
+    finally:
+        for executor in executors.values():
+            executor.shutdown(wait=True, cancel_futures=True)
+        manifest.close()
+        tts_manager.shutdown()
+
+    print(f"{'Stopped' if interrupted else 'Done'}: {counts['ok']} ok, {counts['error']} failed, "
+          f"{counts['skipped']} skipped (already done)")
+    if interrupted:
+        return 130
+    return 1 if counts['error'] else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthesize a TXT/CSV/JSONL file of texts without the GUI")
+    parser.add_argument('input', help="Input file: TXT (one text per line), CSV or JSONL with a 'text' column")
+    parser.add_argument('--manifest', required=True, help="JSONL manifest of results, also used to resume")
+    parser.add_argument('--format', default='auto', choices=['auto', 'txt', 'csv', 'jsonl'])
+    parser.add_argument('--output-dir', help="Copy each result here as <id>.<ext>")
+    parser.add_argument('--audio-format', choices=sorted(audio_format.FORMATS),
+                        help="Convert results to this format (default: keep the stored format)")
+    parser.add_argument('--config', default='config.json')
+    parser.add_argument('--provider', default='gtts', help="Default provider for rows without one")
+    parser.add_argument('--voice', default='', help="Default voice for rows without one")
+    parser.add_argument('--rate', type=float, default=1.0)
+    parser.add_argument('--pitch', type=float, default=1.0)
+    parser.add_argument('--concurrency', default='', help="Per-provider limits, e.g. gtts=4,edge_tts=8")
+    parser.add_argument('--max-pending', type=int, default=1000, help="Rows queued ahead of the workers")
+    parser.add_argument('--no-duration', action='store_true', help="Skip decoding files to measure duration")
+    parser.add_argument('--progress-every', type=int, default=100)
+    args = parser.parse_args()
+    return run_batch(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""Compare peak memory of whole-clip decoding and streaming analysis of a long clip.
+
+Usage: python benchmarks/decode_memory.py [--minutes 60] [--format wav] [--input clip.mp3]
+
+Modes: decode is the previous path (the whole clip decoded into memory,
+then summarized), stream is a single pass without any cache, and cached is
+the get_peaks path, decoding into a PCM cache in a temporary directory.
+
+Without --input a clip of the given length is generated (a tone with
+noise); formats other than wav are produced with ffmpeg. Each mode runs in
+a fresh process and reports the peak RSS the OS recorded for it, so this
+needs a Unix-like system (the resource module).
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from utils import audio_format
+from utils.audio_processor import AudioProcessor
+from utils.decoded_audio import DecodeCache
+from utils.pcm_cache import PcmCache
+from utils.pcm_stream import LevelMeter, analyze
+from utils.peaks import PeakBuilder, PeakPyramid
+
+MODES = ('baseline', 'decode', 'stream', 'cached')
+
+
+def generate_clip(path, minutes, rate, channels):
+    """Write a 16-bit WAV of the given length a second at a time"""
+    rng = np.random.default_rng(0)
+    with wave.open(path, 'wb') as f:
+        f.setnchannels(channels)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        t = np.arange(rate) / rate
+        for second in range(int(minutes * 60)):
+            tone = 0.3 * np.sin(2 * np.pi * (220 + second % 200) * t) + 0.05 * rng.standard_normal(rate)
+            f.writeframes((np.repeat(tone[:, None], channels, axis=1) * 32767).astype('<i2').tobytes())
+
+
+def run_mode(mode, path, cache_dir):
+    """Run one analysis in this process; returns its timing and peak RSS"""
+    # Nothing is read from or written to the repository's caches
+    AudioProcessor.pcm_cache = PcmCache(cache_dir) if mode == 'cached' else None
+    AudioProcessor.decode_cache = DecodeCache()
+    AudioProcessor.peak_cache = DecodeCache()
+    started = time.perf_counter()
+    if mode == 'decode':
+        # Previous path: decode the whole clip into memory, then summarize it
+        decoded = AudioProcessor.decode(path)
+        PeakPyramid.from_samples(decoded.samples, decoded.frame_rate, decoded.sample_width)
+    elif mode == 'stream':
+        analyze(path, PeakBuilder(), LevelMeter())
+    elif mode == 'cached':
+        # What get_peaks does on a miss, without writing a sidecar next to an --input clip
+        builder = PeakBuilder()
+        builder.result(AudioProcessor.pcm_cache.analyze(path, builder)[0])
+    elapsed = time.perf_counter() - started
+    scale = 1 if sys.platform == 'darwin' else 1024  # ru_maxrss is bytes on macOS, KiB elsewhere
+    return {
+        'mode': mode,
+        'seconds': round(elapsed, 3),
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / (1024 * 1024), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--input', help="Existing clip to measure instead of a generated one")
+    parser.add_argument('--minutes', type=float, default=60)
+    parser.add_argument('--rate', type=int, default=24000)
+    parser.add_argument('--channels', type=int, default=1)
+    parser.add_argument('--format', default='wav', help="Container of the generated clip")
+    parser.add_argument('--child', choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument('--cache-dir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_mode(args.child, args.input, args.cache_dir)))
+        return
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = args.input
+        if path is None:
+            path = os.path.join(temp_dir, 'clip.wav')
+            print(f"Generating {args.minutes:g} min clip...", file=sys.stderr)
+            generate_clip(path, args.minutes, args.rate, args.channels)
+            if args.format != 'wav':
+                path = audio_format.transcode(path, audio_format.with_extension(path, args.format), args.format)
+        results = {'input': args.input, 'bytes': os.path.getsize(path), 'parameters': vars(args), 'modes': []}
+        for mode in MODES:
+            print(f"Running {mode}...", file=sys.stderr)
+            cache_dir = os.path.join(temp_dir, f'pcm-{mode}')
+            output = subprocess.run([sys.executable, __file__, '--child', mode, '--input', path,
+                                     '--cache-dir', cache_dir],
+                                    capture_output=True, text=True, check=True).stdout
+            results['modes'].append(json.loads(output))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Compare Edge TTS throughput: asyncio.run per call vs the shared service loop.
+
+Usage: python benchmarks/edge_throughput.py [--clips 100] [--voice en-US-JennyNeural]
+
+Requires network access to the Edge TTS endpoint.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import edge_tts
+from services.edge_tts_service import EdgeTTSService
+
+
+def run_per_call(texts, out_dir, voice):
+    """Previous behaviour: one event loop created and torn down per clip"""
+    latencies = []
+    for i, text in enumerate(texts):
+        path = os.path.join(out_dir, f"per_call_{i}.mp3")
+        started = time.perf_counter()
+        asyncio.run(edge_tts.Communicate(text, voice).save(path))
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def run_shared_loop(texts, out_dir, voice, concurrency):
+    """All clips submitted to the service's background loop at once"""
+    service = EdgeTTSService(max_concurrency=concurrency)
+    try:
+        submitted = []
+        for i, text in enumerate(texts):
+            path = os.path.join(out_dir, f"shared_{i}.mp3")
+            submitted.append((time.perf_counter(), service.submit_synthesis(text, path, voice)))
+        latencies = []
+        for started, future in submitted:
+            future.result()
+            latencies.append(time.perf_counter() - started)
+        return latencies
+    finally:
+        service.close()
+
+
+def summarize(name, latencies, wall):
+    ordered = sorted(latencies)
+    return {
+        'mode': name,
+        'clips': len(latencies),
+        'wall_s': round(wall, 3),
+        'clips_per_s': round(len(latencies) / wall, 2) if wall else None,
+        'p50_s': round(statistics.median(ordered), 3),
+        'p95_s': round(ordered[int(len(ordered) * 0.95) - 1], 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clips', type=int, default=100)
+    parser.add_argument('--voice', default='en-US-JennyNeural')
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+
+    texts = [f"This is short benchmark clip number {i}." for i in range(args.clips)]
+    results = []
+    with tempfile.TemporaryDirectory() as out_dir:
+        started = time.perf_counter()
+        latencies = run_per_call(texts, out_dir, args.voice)
+        results.append(summarize('asyncio_run_per_call', latencies, time.perf_counter() - started))
+
+        started = time.perf_counter()
+        latencies = run_shared_loop(texts, out_dir, args.voice, args.concurrency)
+        results.append(summarize('shared_loop', latencies, time.perf_counter() - started))
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
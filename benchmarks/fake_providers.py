@@ -0,0 +1,149 @@
+"""Local stand-ins for the gTTS and Edge TTS endpoints used by the offline benchmarks.
+
+One aiohttp server answers gTTS batchexecute requests and Edge websocket
+sessions with canned MP3 frames after a configurable delay. A fraction of
+requests can fail. ``install()`` points the gtts and edge_tts libraries at
+the local server for the current process.
+"""
+import asyncio
+import base64
+import json
+import os
+import random
+import threading
+
+import edge_tts.communicate
+import gtts.tts
+from aiohttp import web, WSMsgType
+
+# One silent MPEG-1 Layer III frame (128 kbps, 44.1 kHz), about 26 ms of audio
+MP3_FRAME = b'\xff\xfb\x90\x64' + b'\x00' * 413
+
+
+def canned_audio(text):
+    """Fake MP3 whose length grows with the text, roughly 15 characters per second"""
+    return MP3_FRAME * max(4, len(text) * 40 // 15 // 26)
+
+
+class FakeProviderServer:
+    """gTTS and Edge TTS stand-ins served from a background event loop"""
+
+    def __init__(self, latency=0.05, chunk_interval=0.01, error_rate=0.0, tail_rate=0.05, seed=0):
+        self.latency = latency
+        self.chunk_interval = chunk_interval
+        self.error_rate = error_rate
+        self.tail_rate = tail_rate
+        self._random = random.Random(seed)
+        self.counts = {'gtts_requests': 0, 'gtts_errors': 0, 'edge_sessions': 0, 'edge_errors': 0}
+        self._loop = None
+        self._thread = None
+        self._runner = None
+        self.base_url = None
+
+    # --- Behaviour ---
+
+    def _delay(self):
+        """Request latency, spread around the configured value with an occasional slow tail"""
+        delay = self.latency * (0.5 + self._random.random())
+        if self._random.random() < self.tail_rate:
+            delay *= 5
+        return delay
+
+    def _should_fail(self):
+        return self._random.random() < self.error_rate
+
+    async def handle_gtts(self, request):
+        self.counts['gtts_requests'] += 1
+        form = await request.post()
+        rpc = json.loads(form['f.req'])
+        text = json.loads(rpc[0][0][1])[0]
+        await asyncio.sleep(self._delay())
+        if self._should_fail():
+            self.counts['gtts_errors'] += 1
+            raise web.HTTPServiceUnavailable()
+        encoded = base64.b64encode(canned_audio(text)).decode('ascii')
+        body = f')]}}\'\n\n[["wrb.fr","jQ1olc","[\\"{encoded}\\"]",null,null,null,"generic"]]\n'
+        return web.Response(text=body, content_type='application/json')
+
+    async def handle_edge(self, request):
+        self.counts['edge_sessions'] += 1
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        ssml = None
+        async for message in ws:
+            if message.type == WSMsgType.TEXT and 'Path:ssml' in message.data:
+                ssml = message.data
+                break
+        if ssml is None:
+            return ws
+
+        await asyncio.sleep(self._delay())
+        if self._should_fail():
+            # Closing without audio makes edge_tts raise NoAudioReceived
+            self.counts['edge_errors'] += 1
+            await ws.close()
+            return ws
+
+        try:
+            await ws.send_str("Content-Type:application/json; charset=utf-8\r\nPath:turn.start\r\n\r\n{}")
+            audio = canned_audio(ssml.split('\r\n\r\n', 1)[-1])
+            # Same layout as the real service: 2-byte header length, headers ending in CRLF, audio
+            header = b"X-RequestId:benchmark\r\nContent-Type:audio/mpeg\r\nPath:audio\r\n"
+            step = len(MP3_FRAME) * 8
+            for offset in range(0, len(audio), step):
+                await ws.send_bytes(len(header).to_bytes(2, 'big') + header + audio[offset:offset + step])
+                await asyncio.sleep(self.chunk_interval)
+            await ws.send_str("Content-Type:application/json; charset=utf-8\r\nPath:turn.end\r\n\r\n{}")
+            await ws.close()
+        except ConnectionResetError:
+            pass  # Client cancelled the synthesis and went away
+        return ws
+
+    # --- Lifecycle ---
+
+    def start(self):
+        """Start serving on a free local port and return the base URL"""
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="fake-providers", daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._start_server(), self._loop).result()
+        return self.base_url
+
+    async def _start_server(self):
+        app = web.Application()
+        app.add_routes([
+            web.post('/_/TranslateWebserverUi/data/batchexecute', self.handle_gtts),
+            web.get('/edge/v1', self.handle_edge),
+        ])
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.base_url = f"127.0.0.1:{port}"
+
+    def stop(self):
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = None
+
+    def install(self):
+        """Point gtts and edge_tts at this server; returns a function that undoes it"""
+        original_translate_url = gtts.tts._translate_url
+        original_wss_url = edge_tts.communicate.WSS_URL
+        gtts.tts._translate_url = lambda tld='com', path='': f"http://{self.base_url}/{path}"
+        edge_tts.communicate.WSS_URL = f"ws://{self.base_url}/edge/v1?TrustedClientToken=benchmark"
+        # Make sure a proxy from the environment doesn't intercept local traffic
+        no_proxy = os.environ.get('NO_PROXY', '')
+        os.environ['NO_PROXY'] = ','.join(filter(None, [no_proxy, '127.0.0.1', 'localhost']))
+
+        def restore():
+            gtts.tts._translate_url = original_translate_url
+            edge_tts.communicate.WSS_URL = original_wss_url
+            os.environ['NO_PROXY'] = no_proxy
+
+        return restore
@@ -0,0 +1,299 @@
+"""Offline performance benchmarks for TTSManager.
+
+Usage: python benchmarks/offline_suite.py [--providers gtts,edge_tts,pyttsx3] [--output results.json]
+
+gTTS and Edge TTS requests go to local stand-in servers (fake_providers.py),
+so no network access is needed. pyttsx3 is included when an engine can be
+initialized on this machine. Results are written as JSON so runs on
+different commits can be compared with --baseline.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from fake_providers import FakeProviderServer
+from services.tts_manager import TTSManager
+from utils.config_manager import ConfigManager
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+SENTENCE = "The quick brown fox jumps over the lazy dog while the announcer reads the next item."
+
+
+class ResourceSampler:
+    """Track peak RSS (this process plus children) and the number of processes during a workload"""
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak_rss_mb = None
+        self.peak_processes = 1
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        if psutil is None:
+            self.peak_processes = max(self.peak_processes, 1 + len(multiprocessing.active_children()))
+            return
+        process = psutil.Process()
+        try:
+            children = process.children(recursive=True)
+            rss = process.memory_info().rss + sum(child.memory_info().rss for child in children)
+        except psutil.Error:
+            return
+        self.peak_processes = max(self.peak_processes, 1 + len(children))
+        self.peak_rss_mb = max(self.peak_rss_mb or 0, rss / (1024 * 1024))
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        self._sample()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+        if self.peak_rss_mb is None and resource is not None:
+            # Without psutil fall back to the lifetime peak reported by the OS
+            scale = 1024 if sys.platform != 'darwin' else 1
+            usage = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                     + resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+            self.peak_rss_mb = usage * scale / (1024 * 1024)
+
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def summarize(latencies, first_audio, errors, wall, sampler):
+    ordered = sorted(latencies)
+    ttfa = sorted(first_audio)
+
+    def ms(value):
+        return round(value * 1000, 1) if value is not None else None
+
+    return {
+        'requests': len(latencies) + errors,
+        'errors': errors,
+        'wall_s': round(wall, 3),
+        'throughput_rps': round(len(latencies) / wall, 2) if wall else None,
+        'latency_ms': {
+            'p50': ms(percentile(ordered, 0.50)),
+            'p95': ms(percentile(ordered, 0.95)),
+            'p99': ms(percentile(ordered, 0.99)),
+            'mean': ms(statistics.fmean(ordered)) if ordered else None,
+        },
+        'ttfa_ms': {
+            'p50': ms(percentile(ttfa, 0.50)),
+            'p95': ms(percentile(ttfa, 0.95)),
+        } if ttfa else None,
+        'peak_rss_mb': round(sampler.peak_rss_mb, 1) if sampler.peak_rss_mb is not None else None,
+        'peak_processes': sampler.peak_processes,
+    }
+
+
+class Benchmark:
+    def __init__(self, tts_manager, voices):
+        self.tts_manager = tts_manager
+        self.voices = voices
+        # Everything written to the output directory during the run is deleted afterwards
+        self._existing = set(tts_manager.output_dir.iterdir())
+        self._run_id = time.time_ns()
+
+    def text(self, index, sentences=1):
+        # Unique texts so coalescing and the cache don't hide provider work
+        return " ".join(f"Run {self._run_id} item {index} line {n}: {SENTENCE}" for n in range(sentences))
+
+    def request(self, provider, text, long_text=False, priority='interactive'):
+        """Run one request; returns (latency, time_to_first_audio or None)"""
+        started = time.perf_counter()
+        first_audio = []
+
+        def on_audio(*_):
+            if not first_audio:
+                first_audio.append(time.perf_counter() - started)
+
+        voice = self.voices[provider]
+        if long_text:
+            self.tts_manager.generate_long_audio(
+                text, provider, voice, priority=priority, chunk_callback=on_audio
+            )
+        elif self.tts_manager.supports_streaming(provider):
+            self.tts_manager.generate_audio_streaming(
+                text, provider, voice, chunk_callback=on_audio, priority=priority
+            )
+        else:
+            self.tts_manager.generate_audio(text, provider, voice, priority=priority)
+        latency = time.perf_counter() - started
+        return latency, (first_audio[0] if first_audio else None)
+
+    def run(self, provider, count, concurrency, sentences=1, long_text=False, priority='interactive'):
+        latencies, first_audio, errors = [], [], 0
+        with ResourceSampler() as sampler:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                futures = [
+                    executor.submit(self.request, provider, self.text(i, sentences), long_text, priority)
+                    for i in range(count)
+                ]
+                for future in futures:
+                    try:
+                        latency, ttfa = future.result()
+                    except Exception as e:
+                        errors += 1
+                        print(f"  {provider} request failed: {e}", file=sys.stderr)
+                        continue
+                    latencies.append(latency)
+                    if ttfa is not None:
+                        first_audio.append(ttfa)
+            wall = time.perf_counter() - started
+        return summarize(latencies, first_audio, errors, wall, sampler)
+
+    def cleanup(self):
+        for path in set(self.tts_manager.output_dir.iterdir()) - self._existing:
+            if path.is_file():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+def pyttsx3_available():
+    """Whether a pyttsx3 engine can be initialized here (probed in a child process)"""
+    probe = "import pyttsx3; pyttsx3.init()"
+    try:
+        return subprocess.run([sys.executable, '-c', probe], capture_output=True, timeout=30).returncode == 0
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+            cwd=Path(__file__).parent, timeout=10
+        ).stdout.strip() or None
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+
+
+def compare(results, baseline_path):
+    """Print relative change of throughput and p95 latency against a previous run"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    print(f"Compared with {baseline_path} (commit {baseline.get('commit')}):", file=sys.stderr)
+    for key, current in results['workloads'].items():
+        previous = baseline.get('workloads', {}).get(key)
+        if not previous:
+            continue
+        for label, now, before in (
+            ('throughput', current['throughput_rps'], previous['throughput_rps']),
+            ('p95', current['latency_ms']['p95'], previous['latency_ms']['p95']),
+        ):
+            if now and before:
+                print(f"  {key:28} {label:10} {before:>10} -> {now:<10} ({(now - before) / before:+.1%})",
+                      file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--providers', default='gtts,edge_tts,pyttsx3')
+    parser.add_argument('--config', default=str(Path(__file__).parent.parent / 'config.json'))
+    parser.add_argument('--requests', type=int, default=50, help="Requests in the single and batch workloads")
+    parser.add_argument('--concurrency', type=int, default=16, help="Concurrent callers in the batch workload")
+    parser.add_argument('--long-requests', type=int, default=4, help="Requests in the long-text workload")
+    parser.add_argument('--long-sentences', type=int, default=40, help="Sentences per long text")
+    parser.add_argument('--latency-ms', type=float, default=50, help="Median latency of the fake endpoints")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of fake requests that fail")
+    parser.add_argument('--tail-rate', type=float, default=0.05, help="Fraction of fake requests that are 5x slower")
+    parser.add_argument('--output', help="Write JSON results here instead of stdout")
+    parser.add_argument('--baseline', help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    providers = [p.strip() for p in args.providers.split(',') if p.strip()]
+    skipped = {}
+    if 'pyttsx3' in providers and not pyttsx3_available():
+        providers.remove('pyttsx3')
+        skipped['pyttsx3'] = 'no pyttsx3 engine available on this machine'
+
+    server = FakeProviderServer(latency=args.latency_ms / 1000, error_rate=args.error_rate,
+                                tail_rate=args.tail_rate)
+    server.start()
+    restore = server.install()
+
+    config = ConfigManager(args.config)
+    config.config['cache_enabled'] = False  # Measure synthesis, not cache hits
+    tts_manager = TTSManager(config)
+    voices = {'gtts': 'en-US', 'edge_tts': 'en-US-JennyNeural', 'pyttsx3': ''}
+    benchmark = Benchmark(tts_manager, voices)
+
+    results = {
+        'commit': git_commit(),
+        'timestamp': time.time(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'parameters': vars(args),
+        'skipped': skipped,
+        'workloads': {},
+    }
+    try:
+        for provider in providers:
+            if provider == 'pyttsx3':
+                tts_manager.warm_up(provider)
+            workloads = {
+                'single': lambda: benchmark.run(provider, args.requests, 1),
+                'batch': lambda: benchmark.run(provider, args.requests, args.concurrency, priority='batch'),
+                'long_text': lambda: benchmark.run(
+                    provider, args.long_requests, 1, sentences=args.long_sentences, long_text=True
+                ),
+            }
+            for name, run in workloads.items():
+                print(f"Running {provider}/{name}...", file=sys.stderr)
+                results['workloads'][f"{provider}/{name}"] = run()
+        results['fake_server'] = dict(server.counts)
+        results['queue_stats'] = tts_manager.get_queue_stats()
+    finally:
+        tts_manager.shutdown()
+        benchmark.cleanup()
+        restore()
+        server.stop()
+
+    output = json.dumps(results, indent=2, default=str)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+        print(f"Results written to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+    if args.baseline:
+        compare(results, args.baseline)
+
+
+if __name__ == '__main__':
+    main()
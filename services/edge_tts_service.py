@@ -1,54 +1,162 @@
 import asyncio
+import threading
+from concurrent.futures import CancelledError
 import edge_tts
 
+from utils.audio_format import open_output
+from utils.cancellation import OperationCancelled
+
 class EdgeTTSService:
-    def __init__(self):
+    def __init__(self, max_concurrency=8):
         self._voices = None
+        # Upper bound on simultaneous Communicate sessions
+        self.max_concurrency = max_concurrency
+        # Background event loop shared by every request, started on first use
+        self._loop = None
+        self._thread = None
+        self._semaphore = None
+        self._loop_lock = threading.Lock()
 
-    def synthesize(self, text, output_path, voice='en-US-JennyNeural', rate=1.0, pitch=1.0):
-        """Synthesize speech using Microsoft Edge TTS"""
-        # Convert rate (e.g., 1.0, 1.5) to percentage format (e.g., "+0%", "+50%")
+    @staticmethod
+    def _rate_string(rate):
+        """Convert rate (e.g., 1.0, 1.5) to percentage format (e.g., "+0%", "+50%")"""
         rate_percentage = (rate - 1.0) * 100
-        rate_str = f"{'+' if rate_percentage >= 0 else ''}{rate_percentage:.0f}%"
+        return f"{'+' if rate_percentage >= 0 else ''}{rate_percentage:.0f}%"
+
+    def _ensure_loop(self):
+        """Start the background event-loop thread if it isn't running yet"""
+        with self._loop_lock:
+            if self._loop is None or self._loop.is_closed():
+                loop = asyncio.new_event_loop()
+                started = threading.Event()
+
+                def _run_loop():
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(started.set)
+                    loop.run_forever()
+
+                self._thread = threading.Thread(target=_run_loop, name="edge-tts-loop", daemon=True)
+                self._thread.start()
+                started.wait()
+                self._loop = loop
+                self._semaphore = None  # Must be created on the new loop
+            return self._loop
+
+    async def _limited(self, coro):
+        """Run a coroutine under the service's concurrency limit"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            return await coro
+
+    def submit(self, coro):
+        """Schedule a coroutine on the service's event loop.
+
+        Thread-safe; returns a concurrent.futures.Future. Cancelling the
+        future cancels the underlying task.
+        """
+        return asyncio.run_coroutine_threadsafe(self._limited(coro), self._ensure_loop())
+
+    def close(self):
+        """Stop the background event loop"""
+        with self._loop_lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = self._semaphore = None
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(2.0)
+            if not loop.is_running():
+                loop.close()
 
+    async def synthesize_async(self, text, output_path, voice='en-US-JennyNeural', rate=1.0, pitch=1.0):
+        """Coroutine version of synthesize, for callers already on an event loop"""
+        if hasattr(output_path, 'write'):
+            # Communicate.save only takes a file name
+            return await self.stream_async(text, output_path, voice, rate, pitch)
         # Pitch is not directly supported by edge-tts library's Communicate,
         # but can sometimes be embedded in SSML if needed. Ignoring for now.
+        communicate = edge_tts.Communicate(text, voice, rate=self._rate_string(rate))
+        await communicate.save(output_path)
+        return output_path
 
-        async def _synthesize():
-            communicate = edge_tts.Communicate(text, voice, rate=rate_str)
-            await communicate.save(output_path)
+    def submit_synthesis(self, text, output_path, voice='en-US-JennyNeural', rate=1.0, pitch=1.0):
+        """Start a synthesis on the shared loop and return a Future resolving to output_path"""
+        return self.submit(self.synthesize_async(text, output_path, voice, rate, pitch))
 
-        # Run async code in sync context
+    def _wait(self, future, cancel_token=None):
+        """Wait for a loop task; cancelling cancel_token cancels the task, closing its websocket"""
+        if cancel_token is None:
+            return future.result()
+        cancel_token.add_callback(future.cancel)
         try:
-            asyncio.run(_synthesize())
+            return future.result()
+        except CancelledError:
+            cancel_token.raise_if_cancelled()
+            raise
+
+    def synthesize(self, text, output_path, voice='en-US-JennyNeural', rate=1.0, pitch=1.0, cancel_token=None):
+        """Synthesize speech using Microsoft Edge TTS"""
+        try:
+            return self._wait(self.submit_synthesis(text, output_path, voice, rate, pitch), cancel_token)
+        except OperationCancelled:
+            raise
         except Exception as e:
-             # Catch potential asyncio errors if loop is already running etc.
-             print(f"Error running Edge TTS async task: {e}")
-             # Fallback or alternative execution might be needed in complex GUI apps
-             # For now, re-raise to indicate failure
-             raise
+            print(f"Error running Edge TTS async task: {e}")
+            raise
+
+    async def stream_async(self, text, output_path, voice='en-US-JennyNeural', rate=1.0, pitch=1.0,
+                           chunk_callback=None):
+        """Coroutine version of synthesize_streaming"""
+        communicate = edge_tts.Communicate(text, voice, rate=self._rate_string(rate))
+        with open_output(output_path) as f:
+            async for chunk in communicate.stream():
+                if chunk["type"] != "audio":
+                    continue
+                f.write(chunk["data"])
+                f.flush()
+                if chunk_callback:
+                    chunk_callback(chunk["data"])
         return output_path
 
-    def get_voices(self):
+    def synthesize_streaming(self, text, output_path, voice='en-US-JennyNeural', rate=1.0, pitch=1.0,
+                             chunk_callback=None, cancel_token=None):
+        """Synthesize speech, writing audio to output_path as it arrives.
+
+        chunk_callback(bytes) is called for every audio chunk (on the service's
+        loop thread), so playback can start long before the whole clip has
+        been received. output_path may also be a writable binary file object.
+        """
+        try:
+            return self._wait(
+                self.submit(self.stream_async(text, output_path, voice, rate, pitch, chunk_callback)),
+                cancel_token
+            )
+        except OperationCancelled:
+            raise
+        except Exception as e:
+            print(f"Error running Edge TTS stream: {e}")
+            raise
+
+    def get_voices(self, refresh=False):
         """Get available voices from Edge TTS"""
-        if self._voices is None:
+        if self._voices is None or refresh:
             async def _get_voices():
-                self._voices = []
+                result = []
                 voices = await edge_tts.list_voices()
                 for voice in voices:
                     # Adjust keys based on potential library changes
                     # Common keys are 'Name', 'ShortName', 'Gender', 'Locale'
                     display_name = voice.get('DisplayName', voice.get('Name', voice.get('ShortName'))) # Try multiple keys
                     locale_name = voice.get('LocaleName', voice.get('Locale', 'N/A')) # Try multiple keys
-                    self._voices.append({
+                    result.append({
                         'id': voice['ShortName'],
                         'name': f"{locale_name} - {display_name}", # Use fetched names
                         'gender': voice['Gender'],
                         'locale': voice['Locale']
                     })
-                return self._voices
+                return result
 
-            # Run async code in sync context
-            self._voices = asyncio.run(_get_voices())
+            # Run on the shared loop and wait for the result
+            self._voices = self.submit(_get_voices()).result()
 
         return self._voices
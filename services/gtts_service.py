@@ -1,7 +1,47 @@
+import base64
+import re
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
 from gtts import gTTS
+from gtts.tts import gTTSError
+
+from utils.audio_format import open_output
+from utils.retry import RetryPolicy, call_with_retry
+
+# Audio payload inside a batchexecute response line (same pattern as gTTS 2.5's write_to_fp)
+AUDIO_PATTERN = re.compile(r'jQ1olc","\[\\"(.*)\\"]')
+
+
+class _SegmentWriter:
+    """File-like target for gTTS.write_to_fp that also hands each segment to a callback"""
+
+    def __init__(self, f, chunk_callback=None, cancel_token=None):
+        self.f = f
+        self.chunk_callback = chunk_callback
+        self.cancel_token = cancel_token
+
+    def write(self, data):
+        if self.cancel_token is not None:
+            self.cancel_token.raise_if_cancelled()
+        self.f.write(data)
+        if self.chunk_callback and data:
+            self.chunk_callback(data)
 
 class GTTSService:
-    def __init__(self):
+    def __init__(self, segment_concurrency=4, max_connections=16, retry_policy=None):
+        # gTTS splits text into ~100 character segments, this many are fetched at once per request
+        self.segment_concurrency = max(1, segment_concurrency)
+        self.max_connections = max_connections
+        # Segments after the first are retried on their own, see _fetch_segment
+        self.retry_policy = retry_policy or RetryPolicy()
+        # Keep-alive session and fetch threads shared by every request, created on first use
+        self._session = None
+        self._executor = None
+        self._init_lock = threading.Lock()
         self.langs = {
             'en-US': 'English (US)',
             'en-GB': 'English (UK)',
@@ -15,16 +55,117 @@ class GTTSService:
             'zh-TW': 'Chinese (Taiwan)',
         }
 
-    def synthesize(self, text, output_path, voice='en-US', rate=1.0, pitch=1.0):
+    def _ensure_session(self):
+        with self._init_lock:
+            if self._session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.max_connections)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                self._session = session
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_connections, thread_name_prefix="gtts-fetch"
+                )
+            return self._session, self._executor
+
+    def close(self):
+        """Close pooled connections and stop the fetch threads"""
+        with self._init_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._session.close()
+            self._session = None
+            self._executor = None
+
+    def _fetch_segment(self, session, tts, prepared_request, index=0, cancel_token=None):
+        """Return the MP3 bytes of segment number index, retrying transient errors.
+
+        The first segment isn't retried here: until it arrives nothing has
+        been written, so the caller can retry the whole request instead. Later
+        segments follow audio that may already have been played, and only the
+        failed segment is fetched again.
         """
-        Synthesize speech using Google Text-to-Speech
-        Note: gTTS doesn't support rate/pitch modification directly
+        return call_with_retry(
+            lambda: self._request_segment(session, tts, prepared_request),
+            self.retry_policy,
+            should_retry=lambda e: index > 0,
+            description=f"gTTS segment {index + 1}",
+            cancel_token=cancel_token
+        )
+
+    def _request_segment(self, session, tts, prepared_request):
+        """Send one segment request over the pooled session and return its MP3 bytes"""
+        try:
+            response = session.send(prepared_request, timeout=tts.timeout)
+            response.raise_for_status()
+        except requests.exceptions.HTTPError as e:
+            raise gTTSError(tts=tts, response=response) from e
+        except requests.exceptions.RequestException as e:
+            raise gTTSError(tts=tts) from e
+
+        audio = bytearray()
+        for line in response.iter_lines(chunk_size=1024):
+            decoded_line = line.decode('utf-8')
+            if 'jQ1olc' in decoded_line:
+                match = AUDIO_PATTERN.search(decoded_line)
+                if not match:
+                    raise gTTSError(tts=tts, response=response)
+                audio += base64.b64decode(match.group(1).encode('ascii'))
+        return bytes(audio)
+
+    def synthesize_streaming(self, text, output_path, voice='en-US', rate=1.0, pitch=1.0, chunk_callback=None,
+                             cancel_token=None):
+        """Synthesize like synthesize, fetching segments concurrently and passing each
+        segment's audio to chunk_callback in text order as soon as it is available.
+
+        Cancelling cancel_token stops the request between segments, dropping the
+        segments not yet sent, and raises OperationCancelled. output_path may
+        also be a writable binary file object, e.g. io.BytesIO.
         """
         lang = voice.split('-')[0] if voice else 'en'
         tts = gTTS(text=text, lang=lang, slow=rate < 1.0)
-        tts.save(output_path)
+        prepare_requests = getattr(tts, '_prepare_requests', None)
+        if prepare_requests is None:
+            # Private API gone in this gTTS version: fetch through its public one, one segment at a time
+            with open_output(output_path) as f:
+                tts.write_to_fp(_SegmentWriter(f, chunk_callback, cancel_token))
+            return output_path
+        prepared_requests = prepare_requests()
+        session, executor = self._ensure_session()
+
+        # Sliding window: at most segment_concurrency segments of this request in flight
+        pending = deque()
+        next_segment = 0
+        try:
+            with open_output(output_path) as f:
+                while next_segment < len(prepared_requests) or pending:
+                    if cancel_token is not None:
+                        cancel_token.raise_if_cancelled()
+                    while next_segment < len(prepared_requests) and len(pending) < self.segment_concurrency:
+                        pending.append(executor.submit(
+                            self._fetch_segment, session, tts, prepared_requests[next_segment], next_segment,
+                            cancel_token
+                        ))
+                        next_segment += 1
+                    future = pending.popleft()
+                    if cancel_token is not None:
+                        cancel_token.wait_any(future)
+                    audio = future.result()
+                    f.write(audio)
+                    if chunk_callback and audio:
+                        chunk_callback(audio)
+        finally:
+            for future in pending:
+                future.cancel()
         return output_path
 
-    def get_voices(self):
+    def synthesize(self, text, output_path, voice='en-US', rate=1.0, pitch=1.0, cancel_token=None):
+        """
+        Synthesize speech using Google Text-to-Speech
+        Note: gTTS doesn't support rate/pitch modification directly
+        """
+        return self.synthesize_streaming(text, output_path, voice, rate, pitch, cancel_token=cancel_token)
+
+    def get_voices(self, refresh=False):
         """Get available voices/languages"""
         return [{'id': lang_code, 'name': name} for lang_code, name in self.langs.items()]
@@ -4,24 +4,37 @@ class Pyttsx3Service:
     def __init__(self):
         self.engine = pyttsx3.init()
         self._voices = None
+        # Remember the driver's default rate so rate multipliers never compound
+        self._base_rate = self.engine.getProperty('rate')
+        # Used when a request names no voice or one this engine doesn't have
+        self._default_voice = self.engine.getProperty('voice')
+        self._voice_ids = None
+        # Last values pushed to the engine, to skip redundant driver calls on a reused engine
+        self._engine_state = {'voice': self._default_voice}
+
+    def _set_property(self, name, value):
+        """Set an engine property only if it differs from what was last applied"""
+        if self._engine_state.get(name) != value:
+            self.engine.setProperty(name, value)
+            self._engine_state[name] = value
 
     def synthesize(self, text, output_path, voice=None, rate=1.0, pitch=1.0):
         """Synthesize speech using local pyttsx3"""
         try:
-            # Set voice if specified
-            if voice and self.engine.getProperty('voices'):
-                voices = self.engine.getProperty('voices')
-                for v in voices:
-                    if v.id == voice:
-                        self.engine.setProperty('voice', v.id)
-                        break
-
-            # Set rate (pyttsx3 uses words per minute, default is 200)
-            current_rate = self.engine.getProperty('rate')
-            self.engine.setProperty('rate', int(current_rate * rate))
+            # Set voice if specified; the engine is reused, so otherwise go back to the default
+            # instead of keeping the previous job's voice
+            if voice and self._voice_ids is None:
+                self._voice_ids = {v.id for v in (self.engine.getProperty('voices') or [])}
+            if voice and voice in self._voice_ids:
+                self._set_property('voice', voice)
+            elif self._default_voice:
+                self._set_property('voice', self._default_voice)
+
+            # Set rate relative to the driver default (pyttsx3 uses words per minute, default is 200)
+            self._set_property('rate', int(self._base_rate * rate))
 
             # Set volume (as proxy for pitch since pyttsx3 doesn't support pitch)
-            self.engine.setProperty('volume', min(1.0, pitch))
+            self._set_property('volume', min(1.0, pitch))
 
             # Save to file
             self.engine.save_to_file(text, output_path)
@@ -32,9 +45,9 @@ class Pyttsx3Service:
             print(f"Error in pyttsx3 synthesis: {e}")
             raise
 
-    def get_voices(self):
+    def get_voices(self, refresh=False):
         """Get available voices from the system"""
-        if self._voices is None:
+        if self._voices is None or refresh:
             self._voices = []
             try:
                 print("pyttsx3: Initializing engine...")
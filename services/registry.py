@@ -0,0 +1,173 @@
+"""Registry of TTS providers.
+
+Each provider is described by a ProviderSpec. Its service module is only
+imported, and the service only constructed, the first time it is used, so
+starting the app doesn't pay for libraries (or a pyttsx3 speech driver)
+that are never touched. Other packages add providers with
+``register_provider`` or through the "extra_providers" config section.
+"""
+import importlib
+import threading
+from collections.abc import Mapping
+
+
+class ProviderSpec:
+    """Metadata describing a provider and how to build its service.
+
+    factory is either "module:ClassName" (imported on first use) or a
+    callable returning the service. streaming says whether the service has
+    synthesize_streaming; None means unknown until it is loaded. cancellable
+    services accept a cancel_token keyword in synthesize/synthesize_streaming.
+    in_memory services accept a writable binary file object in place of
+    output_path, so audio never has to touch the disk.
+    """
+
+    def __init__(self, name, factory, label=None, streaming=None, cancellable=False, in_memory=False):
+        self.name = name
+        self.factory = factory
+        self.label = label or name
+        self.streaming = streaming
+        self.cancellable = cancellable
+        self.in_memory = in_memory
+
+    def load_factory(self):
+        if not isinstance(self.factory, str):
+            return self.factory
+        module_name, _, attr = self.factory.partition(':')
+        return getattr(importlib.import_module(module_name), attr)
+
+    def create(self, **options):
+        """Import the service and construct it"""
+        return self.load_factory()(**options)
+
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+def register_provider(name, factory, label=None, streaming=None, cancellable=False, in_memory=False):
+    """Add (or replace) a provider; returns its ProviderSpec"""
+    spec = ProviderSpec(name, factory, label, streaming, cancellable, in_memory)
+    with _providers_lock:
+        _providers[name] = spec
+    return spec
+
+
+def get_provider(name):
+    """ProviderSpec for a registered provider, or None"""
+    with _providers_lock:
+        return _providers.get(name)
+
+
+def provider_names():
+    with _providers_lock:
+        return list(_providers)
+
+
+def register_from_config(settings):
+    """Register providers from the "extra_providers" config section.
+
+    Maps a name to {"factory": "module:ClassName", "label": ..., "streaming": ...,
+    "cancellable": ..., "in_memory": ...}.
+    """
+    for name, entry in (settings or {}).items():
+        try:
+            register_provider(
+                name, entry['factory'], entry.get('label'), entry.get('streaming'), entry.get('cancellable', False),
+                entry.get('in_memory', False)
+            )
+        except (KeyError, TypeError) as e:
+            print(f"Ignoring provider {name} from config: {e}")
+
+
+def create_service(provider, **options):
+    """Construct a service from a provider name or ProviderSpec.
+
+    Worker processes receive the spec itself, so providers registered at
+    runtime work there too.
+    """
+    spec = provider if isinstance(provider, ProviderSpec) else get_provider(provider)
+    if spec is None:
+        raise ValueError(f"Unknown provider: {provider}")
+    return spec.create(**options)
+
+
+register_provider('gtts', 'services.gtts_service:GTTSService', 'Google Text-to-Speech',
+                  streaming=True, cancellable=True, in_memory=True)
+register_provider('edge_tts', 'services.edge_tts_service:EdgeTTSService', 'Microsoft Edge TTS',
+                  streaming=True, cancellable=True, in_memory=True)
+register_provider('pyttsx3', 'services.pyttsx3_service:Pyttsx3Service', 'System voices (pyttsx3)',
+                  streaming=False)
+
+
+class ServiceRegistry(Mapping):
+    """Provider name -> service instance, with each service created on first access.
+
+    Iterating, len() and ``in`` only look at the registered specs; indexing
+    imports and constructs the service. Without names the registry follows
+    every registered provider, including ones added later. options maps a
+    provider name to the keyword arguments its service is constructed with.
+    """
+
+    def __init__(self, names=None, options=None):
+        self._names = list(names) if names is not None else None
+        self._options = options or {}
+        self._instances = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def spec(self, name):
+        """ProviderSpec for name, or None if this registry doesn't offer it"""
+        if self._names is not None and name not in self._names:
+            return None
+        return get_provider(name)
+
+    def __getitem__(self, name):
+        service = self._instances.get(name)
+        if service is not None:
+            return service
+        spec = self.spec(name)
+        if spec is None:
+            raise KeyError(name)
+        with self._lock:
+            lock = self._locks.setdefault(name, threading.Lock())
+        # Per-provider lock, so a slow driver load doesn't hold up other providers
+        with lock:
+            service = self._instances.get(name)
+            if service is None:
+                service = spec.create(**self._options.get(name, {}))
+                self._instances[name] = service
+        return service
+
+    def __setitem__(self, name, service):
+        """Use an existing service instance for a provider, registering the name if it is new"""
+        if get_provider(name) is None:
+            register_provider(name, type(service))
+        if self._names is not None and name not in self._names:
+            self._names.append(name)
+        self._instances[name] = service
+
+    def __iter__(self):
+        return iter([name for name in provider_names() if self._names is None or name in self._names])
+
+    def __len__(self):
+        return len(list(iter(self)))
+
+    def __contains__(self, name):
+        return self.spec(name) is not None
+
+    def is_loaded(self, name):
+        return name in self._instances
+
+    def loaded(self):
+        """Services constructed so far"""
+        return dict(self._instances)
+
+    def supports_streaming(self, name):
+        """Whether a provider's service has synthesize_streaming; only loads it if the spec doesn't say"""
+        spec = self.spec(name)
+        if spec is None:
+            return False
+        if spec.streaming is not None and name not in self._instances:
+            return spec.streaming
+        return hasattr(self[name], 'synthesize_streaming')
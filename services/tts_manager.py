@@ -1,175 +1,1014 @@
+import io
 import os
-import multiprocessing as mp
+import shutil
+import threading
+import time
+from collections import deque
+from concurrent.futures import (
+    CancelledError, Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+)
 from pathlib import Path
 import uuid
-from .gtts_service import GTTSService
-from .edge_tts_service import EdgeTTSService
-from .pyttsx3_service import Pyttsx3Service
+from .registry import ServiceRegistry, register_from_config
 from utils.process_manager import ProcessManager
+from utils.audio_cache import AudioCache
+from utils.audio_buffer import AudioBuffer
+from utils.audio_store import AudioStore
+from utils.worker_pool import Pyttsx3WorkerPool
+from utils.text_chunker import split_text
+from utils.voice_cache import VoiceCatalogCache
+from utils.single_flight import SingleFlight
+from utils.scheduler import ProviderScheduler
+from utils.retry import RetryPolicy, LatencyTracker, call_with_retry
+from utils.cancellation import CancelToken, OperationCancelled, cancel_future
+from utils import audio_format, tracing
 
 class TTSManager:
     def __init__(self, config):
         self.config = config
-        # Define output directory relative to the project root
+        tracing.configure_from_config(config)
+        # Audio and cache directories, relative paths are resolved against the project root
         project_root = Path(__file__).parent.parent # Assumes tts_manager.py is in services/
-        self.output_dir = project_root / "audios"
+        self.output_dir = project_root / self._config_get("audio_dir", "audios")
         self.output_dir.mkdir(parents=True, exist_ok=True) # Create if it doesn't exist
+        cache_dir = project_root / self._config_get("cache_dir", "cache")
 
-        # Create service instances for direct access when needed
-        self.services = {
-            'gtts': GTTSService(),
-            'edge_tts': EdgeTTSService(),
-            'pyttsx3': Pyttsx3Service()
-        }
+        # Transient network errors are retried with jittered exponential backoff
+        self.retry_policy = RetryPolicy.from_config(self._config_get("retry"))
+
+        # Providers are imported and their services created on first use
+        register_from_config(self._config_get("extra_providers"))
+        self.services = ServiceRegistry(options={
+            'gtts': {'segment_concurrency': self._config_get("gtts_segment_concurrency", 4),
+                     'retry_policy': self.retry_policy},
+            'edge_tts': {'max_concurrency': self._config_get("edge_max_concurrency", 8)},
+        })
         print(f"Audio output directory: {self.output_dir}")
 
-        # Create a multiprocessing manager
-        self.mp_manager = mp.Manager()
+        # Content-addressed cache so identical requests reuse the existing file
+        self.cache_enabled = bool(self._config_get("cache_enabled", True))
+        cache_max_mb = self._config_get("cache_max_mb", 500)
+        # Index of every file under audios/, swept in the background against age and size budgets
+        store_settings = self._config_get("audio_store", {}) or {}
+        self.audio_store = AudioStore(
+            self.output_dir,
+            max_bytes=int(store_settings.get("max_mb", cache_max_mb) * 1024 * 1024),
+            max_age=store_settings.get("max_age_days", 30) * 24 * 3600,
+            sweep_interval=store_settings.get("sweep_interval_sec", 600)
+        )
+        self.cache = AudioCache(
+            self.output_dir / "cache", max_bytes=int(cache_max_mb * 1024 * 1024), store=self.audio_store
+        )
+        self.audio_store.start()
+        # Codec cached audio is re-encoded to in the background ("native" keeps what the provider sent)
+        self.storage_format = self._config_get("storage_format", "opus")
+        if self.storage_format != "native" and self.storage_format not in audio_format.FORMATS:
+            print(f"Unknown storage_format {self.storage_format}, keeping provider output as is")
+            self.storage_format = "native"
+        self._ffmpeg_warned = False
 
-        # Track running processes
+        # Track running jobs
         self.active_processes = {}
-        
-    def generate_audio_mp(self, text, provider='gtts', voice='', rate=1.0, pitch=1.0):
-        """Generate audio using multiprocessing for CPU-intensive providers"""
-        # Use multiprocessing for CPU-intensive providers (pyttsx3)
-        # or network-bound providers that can benefit from being in a separate process
-        
+
+        # Identical requests made while a job is running attach to that job, whether they want a path
+        # or an AudioBuffer; each caller's ticket converts the job's result (see _as_path, _as_buffer)
+        self._flights = SingleFlight()
+        # Runs the network-bound providers; pyttsx3 jobs go to the worker pool
+        self._job_executor = ThreadPoolExecutor(
+            max_workers=self._config_get("synthesis_threads", 16), thread_name_prefix="tts-job"
+        )
+        # Per-provider concurrency and request-rate limits, interactive jobs first
+        self.scheduler = ProviderScheduler(self._job_executor, self._config_get("provider_limits", {}))
+
+        # Interactive requests slower than the provider's p95 get a second, hedged request
+        self.hedging_enabled = bool(self._config_get("hedging_enabled", False))
+        self._hedge_executor = ThreadPoolExecutor(
+            max_workers=self._config_get("synthesis_threads", 16), thread_name_prefix="tts-hedge"
+        )
+        self._latencies = {}
+        self.hedge_stats = {'sent': 0, 'won': 0}
+        self._hedge_stats_lock = threading.Lock()  # Updated from the hedge threads
+        # Writes in-memory results to disk after they have been handed to the caller
+        self._persist_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="tts-persist")
+
+        # Voice catalogs persisted on disk, refreshed in the background once stale
+        self.voice_cache = VoiceCatalogCache(
+            cache_dir / "voices",
+            ttl_seconds=self._config_get("voice_cache_ttl_hours", 24) * 3600
+        )
+        self._voice_refreshes = set()
+        self._voice_refresh_lock = threading.Lock()
+
+        # Recent time-to-first-audio samples (seconds) per streaming provider
+        self.time_to_first_audio = {}
+
+        # Background process pools, both created on first use
+        self._pyttsx3_pool = None
+        self._process_pool = None
+
+    @property
+    def pyttsx3_pool(self):
+        """Pool of pre-initialized pyttsx3 worker processes"""
+        return self._get_pyttsx3_pool()
+
+    def _get_pyttsx3_pool(self):
+        """Create the pyttsx3 pool on first use, which spawns and initializes its workers"""
+        if self._pyttsx3_pool is None:
+            self._pyttsx3_pool = Pyttsx3WorkerPool(size=self._config_get("pyttsx3_workers", 1))
+        return self._pyttsx3_pool
+
+    @property
+    def process_pool(self):
+        """General-purpose worker processes for voice loading and transcoding"""
+        if self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor(max_workers=self._config_get("process_workers", 2))
+        return self._process_pool
+
+    def warm_up(self, provider):
+        """Start any background workers a provider needs before the first request"""
+        if provider == 'pyttsx3':
+            self._get_pyttsx3_pool()
+
+    def get_queue_stats(self):
+        """Report queue depth and worker state of the background pools"""
+        stats = {}
+        if self._pyttsx3_pool is not None:
+            stats['pyttsx3'] = self._pyttsx3_pool.stats()
+        stats['scheduler'] = self.scheduler.stats()
+        stats['audio_store'] = self.audio_store.stats()
+        with self._hedge_stats_lock:
+            stats['hedging'] = dict(self.hedge_stats, enabled=self.hedging_enabled)
+        stats['jobs'] = {
+            'in_flight': self._flights.in_flight(),
+            'coalesced': self._flights.coalesced
+        }
+        return stats
+
+    def shutdown(self):
+        """Stop background workers"""
+        self.scheduler.shutdown()
+        self._job_executor.shutdown(wait=False, cancel_futures=True)
+        self._hedge_executor.shutdown(wait=False, cancel_futures=True)
+        # Pending writes still finish, the audio was already handed out
+        self._persist_executor.shutdown(wait=False)
+        if self._pyttsx3_pool is not None:
+            self._pyttsx3_pool.shutdown()
+            self._pyttsx3_pool = None
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
+        for service in self.services.loaded().values():
+            if hasattr(service, 'close'):
+                service.close()
+        self.audio_store.close()
+        tracing.flush()
+
+    def _config_get(self, key, default=None):
+        """Read a config value, tolerating a missing config object"""
+        if self.config is None:
+            return default
+        return self.config.get(key, default)
+
+    def _new_output_path(self, provider, cache_key=None):
+        """Pick where a provider should write its output"""
+        if cache_key:
+            return self.cache.temp_path(cache_key)
+        filename = f"{provider}_{uuid.uuid4().hex}.mp3"
+        return str(self.output_dir / filename)
+
+    def _submit(self, text, provider, voice, rate, pitch, listener=None, priority='interactive'):
+        """Start a synthesis job, or attach to the identical one already running.
+
+        Returns a FlightTicket whose future resolves to the audio path.
+        listener(data) receives streamed audio, including what was already
+        produced before this caller attached. priority is the scheduler lane,
+        'interactive' or 'batch'.
+        """
         if provider not in self.services:
             raise ValueError(f"Unsupported provider: {provider}")
-        
-        # Generate unique filename
-        filename = f"{provider}_{uuid.uuid4().hex}.mp3"
-        output_path = str(self.output_dir / filename)
+        key = self.cache.make_key(provider, voice, rate, pitch, text)
+        meta = {'provider': provider, 'text_hash': AudioCache.text_hash(text)}
+        ticket = self._flights.join(
+            key,
+            lambda flight: self._start_job(flight, text, provider, voice, rate, pitch, priority),
+            listener,
+            lambda result: self._as_path(result, key, meta)
+        )
+        if ticket.flight.job is not None:
+            # An interactive caller joining a queued batch job shouldn't wait behind the batch
+            self.scheduler.reprioritize(ticket.flight.job, priority)
+        return ticket
+
+    def _as_path(self, result, key, meta):
+        """Path of a flight's result; an AudioBuffer from generate_audio_memory resolves once it is written"""
+        if not isinstance(result, AudioBuffer):
+            return result
+        return self._written(result, key, meta).persisted
+
+    def _as_buffer(self, result, key, meta, persist):
+        """AudioBuffer of a flight's result, which is a path if the job was started by the path API"""
+        if not isinstance(result, AudioBuffer):
+            return AudioBuffer.from_file(result)
+        return self._written(result, key, meta) if persist else result
+
+    def _written(self, audio, key, meta):
+        """audio if its job writes it to disk, otherwise a copy that is written in the background"""
+        if audio.persisted.done() and audio.persisted.result() is None:
+            # Started by a caller that passed persist=False
+            audio = AudioBuffer(audio.data, audio.format)
+            self._persist_later(audio, key if self.cache_enabled else None, meta)
+        return audio
+
+    def _start_job(self, flight, text, provider, voice, rate, pitch, priority='interactive'):
+        """Launch the work behind a flight and return a callable that cancels it.
+
+        Cancelling drops a queued job, and stops a running one: the pyttsx3
+        worker process is terminated, network streams are aborted. The partial
+        output file is deleted by _finish_job.
+        """
+        flight.trace = tracing.new_job_id()
+        flight.meta = {'provider': provider, 'text_hash': AudioCache.text_hash(text)}
+        started = time.time()
+        cache_key = flight.key if self.cache_enabled else None
+        if cache_key:
+            with tracing.span('cache.lookup', flight.trace):
+                cached_path = self.cache.get(cache_key)
+            if cached_path:
+                print(f"Cache hit: {cached_path}")
+                tracing.record('job', started, time.time(), flight.trace, provider=provider, cache='hit')
+                flight.resolve(cached_path)
+                return None
+
+        output_path = self._new_output_path(provider, cache_key)
         print(f"Attempting to save audio to: {output_path}")
-        
-        # Create result queue for the process to communicate back
-        result_queue = self.mp_manager.Queue()
-        
-        # Start the process
-        process = mp.Process(
-            target=ProcessManager.run_tts_generation,
-            args=(provider, text, output_path, voice, rate, pitch, result_queue)
+
+        token = CancelToken()
+        if provider == 'pyttsx3':
+            # Reuse a warm engine instead of spawning and initializing a new process
+            future = self.pyttsx3_pool.submit(text, output_path, voice, rate, pitch, trace=flight.trace)
+            future.add_done_callback(
+                lambda f: f.cancelled() or self._finish_job(flight, output_path, cache_key, f.exception(), started)
+            )
+            token.add_callback(lambda: self.pyttsx3_pool.cancel(future))
+        else:
+            flight.job = self.scheduler.submit(
+                provider, self._run_job, flight, text, provider, voice, rate, pitch, output_path, cache_key,
+                priority, started, token, lane=priority
+            )
+            future = flight.job.future
+            token.add_callback(flight.job.cancel)
+        # A job dropped before it started (e.g. on shutdown) never reports back
+        future.add_done_callback(lambda f: f.cancelled() and cancel_future(flight.future))
+        return token.cancel
+
+    def _run_job(self, flight, text, provider, voice, rate, pitch, output_path, cache_key, priority, started,
+                 cancel_token=None):
+        if tracing.enabled():
+            now = time.time()
+            waited = time.monotonic() - flight.job.queued_at
+            tracing.record('scheduler.queue', now - waited, now, flight.trace, provider=provider, lane=priority)
+        error = None
+        try:
+            if self.supports_streaming(provider) and self.hedging_enabled and priority == 'interactive':
+                output_path = self._synthesize_streaming_hedged(
+                    flight, text, provider, voice, rate, pitch, output_path, cache_key, cancel_token
+                )
+            elif self.supports_streaming(provider):
+                self._synthesize_streaming(flight, text, provider, voice, rate, pitch, output_path, cancel_token)
+            elif self.hedging_enabled and priority == 'interactive':
+                output_path = self._synthesize_hedged(
+                    text, provider, voice, rate, pitch, output_path, cache_key, flight.trace, cancel_token
+                )
+            else:
+                self._synthesize(text, provider, voice, rate, pitch, output_path, flight.trace, cancel_token)
+        except Exception as e:
+            error = e
+        self._finish_job(flight, output_path, cache_key, error, started)
+
+    def _latency(self, provider, first_audio=False):
+        """Recent request durations of a provider, or of its streaming requests' time to first audio"""
+        return self._latencies.setdefault((provider, first_audio), LatencyTracker())
+
+    def _cancel_option(self, provider, cancel_token):
+        """Keyword arguments passing cancel_token to services that accept one"""
+        if cancel_token is None or not self.services.spec(provider).cancellable:
+            return {}
+        return {'cancel_token': cancel_token}
+
+    def _synthesize(self, text, provider, voice, rate, pitch, output_path, trace=None, cancel_token=None):
+        """Synthesize to output_path, retrying transient errors"""
+        options = self._cancel_option(provider, cancel_token)
+
+        def attempt():
+            started = time.perf_counter()
+            if hasattr(output_path, 'truncate'):
+                # In-memory output, drop whatever a failed attempt left behind
+                output_path.seek(0)
+                output_path.truncate()
+            with tracing.span(f'{provider}.request', trace, chars=len(text)):
+                self.services[provider].synthesize(text, output_path, voice, rate, pitch, **options)
+            self._latency(provider).record(time.perf_counter() - started)
+
+        call_with_retry(attempt, self.retry_policy, description=f"{provider} synthesis", cancel_token=cancel_token)
+        return output_path
+
+    def _synthesize_hedged(self, text, provider, voice, rate, pitch, output_path, cache_key, trace=None,
+                           cancel_token=None):
+        """Synthesize, sending a second identical request if the first takes longer than the
+        provider's observed p95. Returns the path written by whichever request finished first.
+        """
+        threshold = self._latency(provider).percentile(0.95)
+        if threshold is None:
+            return self._synthesize(text, provider, voice, rate, pitch, output_path, trace, cancel_token)
+
+        # Each request has its own token so the loser can be stopped on its own
+        primary_token = CancelToken(cancel_token)
+        primary = self._hedge_executor.submit(
+            self._synthesize, text, provider, voice, rate, pitch, output_path, trace, primary_token
         )
-        process.start()
-        
-        # Store the process and queue for later retrieval
+        if wait([primary], timeout=threshold).done:
+            return primary.result()
+
+        print(f"{provider} request slower than p95 ({threshold:.2f}s), sending a hedged request")
+        with self._hedge_stats_lock:
+            self.hedge_stats['sent'] += 1
+        hedge_path = self._new_output_path(provider, cache_key)
+        # The hedge goes through the scheduler so it still respects the provider's limits
+        hedge_token = CancelToken(cancel_token)
+        hedge_job = self.scheduler.submit(
+            provider, self._synthesize, text, provider, voice, rate, pitch, hedge_path, trace, hedge_token
+        )
+        hedge_token.add_callback(hedge_job.cancel)
+        hedge = hedge_job.future
+        paths = {primary: output_path, hedge: hedge_path}
+        tokens = {primary: primary_token, hedge: hedge_token}
+
+        pending = set(paths)
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.cancelled():
+                    continue
+                if future.exception() is not None:
+                    error = future.exception()
+                    continue
+                if future is hedge:
+                    with self._hedge_stats_lock:
+                        self.hedge_stats['won'] += 1
+                tracing.record('hedge', time.time() - threshold, time.time(), trace, won=future is hedge)
+                # The slower request's output is thrown away once it finishes
+                for loser in paths:
+                    if loser is future:
+                        continue
+                    tokens[loser].cancel()
+                    loser.add_done_callback(lambda _, path=paths[loser]: self.cache.discard(path))
+                return future.result()
+        raise error or RuntimeError(f"{provider} synthesis was cancelled")
+
+    def _synthesize_streaming(self, flight, text, provider, voice, rate, pitch, output_path, cancel_token=None,
+                              claim=None):
+        """Run a streaming provider, publishing its audio to everyone attached to the flight.
+
+        In a hedged race, claim() is called with the first chunk; only the
+        request it returns True for publishes, the other one stops there.
+        """
+        started = time.perf_counter()
+        first_audio = []
+
+        def on_chunk(data):
+            if not first_audio:
+                if claim is not None and not claim():
+                    raise OperationCancelled(f"{provider} request lost the hedged race")
+                first_audio.append(time.perf_counter() - started)
+                self._latency(provider, first_audio=True).record(first_audio[0])
+                self.time_to_first_audio.setdefault(provider, deque(maxlen=100)).append(first_audio[0])
+                print(f"Time to first audio ({provider}): {first_audio[0] * 1000:.0f} ms")
+                tracing.record('first_audio', time.time() - first_audio[0], time.time(), flight.trace,
+                               provider=provider)
+            flight.publish(data)
+
+        options = self._cancel_option(provider, cancel_token)
+
+        def attempt():
+            attempt_started = time.perf_counter()
+            with tracing.span(f'{provider}.stream', flight.trace, chars=len(text)):
+                self.services[provider].synthesize_streaming(
+                    text, output_path, voice, rate, pitch, chunk_callback=on_chunk, **options
+                )
+            self._latency(provider).record(time.perf_counter() - attempt_started)
+
+        # Audio already sent to listeners can't be taken back, so only retry before the first chunk
+        call_with_retry(
+            attempt,
+            self.retry_policy,
+            should_retry=lambda e: not first_audio,
+            description=f"{provider} streaming synthesis",
+            cancel_token=cancel_token
+        )
+        if not first_audio:
+            raise FileNotFoundError(f"TTS service produced no audio at {output_path}")
+
+    def _synthesize_streaming_hedged(self, flight, text, provider, voice, rate, pitch, output_path, cache_key,
+                                     cancel_token=None):
+        """Stream, sending a second identical request if no audio arrives within the provider's
+        p95 time to first audio. Whichever request produces audio first streams to the flight and
+        the other is cancelled; returns the path the winner wrote.
+        """
+        threshold = self._latency(provider, first_audio=True).percentile(0.95)
+        if threshold is None:
+            self._synthesize_streaming(flight, text, provider, voice, rate, pitch, output_path, cancel_token)
+            return output_path
+
+        tokens = {output_path: CancelToken(cancel_token)}
+        winner = []
+        decided = threading.Event()
+        claim_lock = threading.Lock()
+
+        def claim_for(path):
+            def claim():
+                with claim_lock:
+                    if not winner:
+                        winner.append(path)
+                        for other, token in tokens.items():
+                            if other != path:
+                                token.cancel()
+                decided.set()
+                return winner[0] == path
+            return claim
+
+        primary = self._hedge_executor.submit(
+            self._synthesize_streaming, flight, text, provider, voice, rate, pitch, output_path,
+            tokens[output_path], claim_for(output_path)
+        )
+        primary.add_done_callback(lambda _: decided.set())
+        decided.wait(threshold)
+        with claim_lock:
+            if winner or primary.done():
+                # Audio (or an error) arrived in time, no hedge needed
+                primary.result()
+                return output_path
+            hedge_path = self._new_output_path(provider, cache_key)
+            tokens[hedge_path] = CancelToken(cancel_token)
+
+        print(f"No {provider} audio within p95 ({threshold:.2f}s), sending a hedged request")
+        with self._hedge_stats_lock:
+            self.hedge_stats['sent'] += 1
+        # The hedge goes through the scheduler so it still respects the provider's limits
+        hedge_job = self.scheduler.submit(
+            provider, self._synthesize_streaming, flight, text, provider, voice, rate, pitch, hedge_path,
+            tokens[hedge_path], claim_for(hedge_path)
+        )
+        tokens[hedge_path].add_callback(hedge_job.cancel)
+        paths = {primary: output_path, hedge_job.future: hedge_path}
+
+        pending = set(paths)
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.cancelled():
+                    continue
+                if future.exception() is not None:
+                    if winner and winner[0] == paths[future]:
+                        raise future.exception()  # Audio was already streamed, nothing to fall back on
+                    if error is None or isinstance(error, OperationCancelled):
+                        error = future.exception()
+                    continue
+                won = future is hedge_job.future
+                if won:
+                    with self._hedge_stats_lock:
+                        self.hedge_stats['won'] += 1
+                tracing.record('hedge', time.time() - threshold, time.time(), flight.trace, won=won)
+                # The losing request stopped at its first chunk; its partial output is thrown away
+                for loser in paths:
+                    if loser is not future:
+                        loser.add_done_callback(lambda _, path=paths[loser]: self.cache.discard(path))
+                return paths[future]
+        raise error or RuntimeError(f"{provider} synthesis was cancelled")
+
+    def _finish_job(self, flight, output_path, cache_key, error, started=None):
+        """Store a finished job's output and hand the path to every waiter"""
+        if error is None and not os.path.exists(output_path):
+            error = FileNotFoundError(f"TTS service failed to create file at {output_path}")
+        if error is not None:
+            if isinstance(error, OperationCancelled):
+                print(f"Synthesis cancelled, removing partial output: {output_path}")
+            else:
+                print(f"Error during synthesis or file check: {error}")
+            # Never leave a partial file behind
+            self.cache.discard(output_path)
+            if started is not None:
+                tracing.record('job', started, time.time(), flight.trace, error=type(error).__name__)
+            flight.fail(error)
+            return
+
+        # Name the file after what the provider actually wrote (pyttsx3 usually writes WAV)
+        output_path = audio_format.match_extension(output_path)
+        if cache_key:
+            # Cache the result even if every caller gave up, the next request can use it
+            with tracing.span('cache.put', flight.trace):
+                output_path = self.cache.put(cache_key, output_path, **flight.meta)
+            self._compact(cache_key, output_path, flight.meta)
+        else:
+            self.audio_store.add(output_path, **flight.meta)
+        if started is not None:
+            tracing.record('job', started, time.time(), flight.trace, cache='miss')
+        if flight.resolve(output_path):
+            print(f"Audio successfully generated at: {output_path}")
+        elif not cache_key:
+            self.cache.discard(output_path)
+
+    def generate_audio_mp(self, text, provider='gtts', voice='', rate=1.0, pitch=1.0, priority='interactive',
+                          on_complete=None):
+        """Start generating audio in the background and return a process id.
+
+        on_complete(status) is called from a worker thread the moment the job
+        finishes, with the dict check_generation_status would return; it is
+        not called if the job is cancelled through cancel_generation.
+        Alternatively block in wait_for_generation.
+        """
         process_id = str(uuid.uuid4())
-        self.active_processes[process_id] = {
-            'process': process,
-            'queue': result_queue,
-            'output_path': output_path
-        }
-        
+        ticket = self._submit(text, provider, voice, rate, pitch, priority=priority)
+        self.active_processes[process_id] = {'ticket': ticket}
+        if on_complete:
+            ticket.future.add_done_callback(
+                lambda f: f.cancelled() or on_complete(self._collect_generation(process_id, ticket))
+            )
         return process_id
-    
+
+    def _collect_generation(self, process_id, ticket):
+        """Forget a finished job and turn its result into a status dict"""
+        self.active_processes.pop(process_id, None)
+        try:
+            return {'status': 'complete', 'path': ticket.result()}
+        except CancelledError:
+            return {'status': 'cancelled'}
+        except Exception as e:
+            return {'status': 'error', 'message': str(e) or type(e).__name__}
+
     def check_generation_status(self, process_id):
         """Check if the generation process has completed"""
         if process_id not in self.active_processes:
             return {'status': 'error', 'message': 'Invalid process ID'}
         
-        process_info = self.active_processes[process_id]
-        process = process_info['process']
-        queue = process_info['queue']
-        
-        # Check if process is done
-        if not process.is_alive():
-            # Process finished, check result
-            if queue.empty():
-                # Something went wrong, no result in queue
-                return {'status': 'error', 'message': 'Process completed but no result returned'}
-            
-            result = queue.get()
-            
-            # Clean up
-            del self.active_processes[process_id]
-            
-            # Return result
-            if 'error' in result:
-                return {'status': 'error', 'message': result['error']}
-            else:
-                return {'status': 'complete', 'path': result['path']}
-        else:
-            # Process still running
+        ticket = self.active_processes[process_id]['ticket']
+        if not ticket.done():
             return {'status': 'running'}
+        return self._collect_generation(process_id, ticket)
 
-    # Keep the synchronous method for compatibility
-    def generate_audio(self, text, provider='gtts', voice='', rate=1.0, pitch=1.0):
-        """Generate audio from text using specified provider (synchronous)"""
+    def wait_for_generation(self, process_id, timeout=None):
+        """Block until a job finishes (or timeout seconds pass) and return its status.
+
+        Returns as soon as the result is ready, or with status 'cancelled'
+        once cancel_generation is called from another thread.
+        """
+        process_info = self.active_processes.get(process_id)
+        if process_info is None:
+            return {'status': 'error', 'message': 'Invalid process ID'}
+        ticket = process_info['ticket']
+        if wait([ticket.future], timeout=timeout).not_done:
+            return {'status': 'running'}
+        return self._collect_generation(process_id, ticket)
+
+    def cancel_generation(self, process_id):
+        """Stop waiting for a job and forget it.
+
+        The job itself is stopped, and its partial output deleted, unless other
+        callers still want its result.
+        """
+        process_info = self.active_processes.pop(process_id, None)
+        if process_info is None:
+            return False
+        return process_info['ticket'].cancel()
+
+    def _wait(self, ticket, cancel_token=None):
+        """Wait for a ticket's result; cancelling cancel_token releases the ticket"""
+        if cancel_token is not None:
+            cancel_token.add_callback(ticket.cancel)
+        try:
+            return ticket.result()
+        except CancelledError:
+            if cancel_token is not None and cancel_token.cancelled:
+                raise OperationCancelled("Generation was cancelled")
+            raise
+
+    def generate_audio(self, text, provider='gtts', voice='', rate=1.0, pitch=1.0, priority='interactive',
+                       cancel_token=None):
+        """Generate audio from text using specified provider and wait for the path.
+
+        Safe to call from any thread; pyttsx3 jobs run in the worker pool.
+        Cancelling cancel_token (a CancelToken) raises OperationCancelled here
+        and stops the job unless another caller is waiting for the same audio.
+        """
+        return self._wait(self._submit(text, provider, voice, rate, pitch, priority=priority), cancel_token)
+    
+    def supports_streaming(self, provider):
+        """Whether a provider can deliver audio while it is still synthesizing"""
+        if not self._config_get("streaming_enabled", True):
+            return False
+        return self.services.supports_streaming(provider)
+
+    def generate_audio_streaming(self, text, provider='edge_tts', voice='', rate=1.0, pitch=1.0,
+                                 chunk_callback=None, priority='interactive', cancel_token=None):
+        """Generate audio like generate_audio, passing audio bytes to chunk_callback as they arrive.
+
+        On a cache hit the callback is not called and the cached path is returned.
+        """
+        if not self.supports_streaming(provider):
+            return self.generate_audio(text, provider, voice, rate, pitch, priority, cancel_token)
+        return self._wait(
+            self._submit(text, provider, voice, rate, pitch, listener=chunk_callback, priority=priority),
+            cancel_token
+        )
+
+    def supports_in_memory(self, provider):
+        """Whether a provider synthesizes straight into memory, see generate_audio_memory"""
+        if not self._config_get("in_memory_enabled", True):
+            return False
+        spec = self.services.spec(provider)
+        return spec is not None and spec.in_memory
+
+    def generate_audio_memory(self, text, provider='edge_tts', voice='', rate=1.0, pitch=1.0, chunk_callback=None,
+                              persist=True, priority='interactive', cancel_token=None):
+        """Generate audio and return it as an AudioBuffer instead of a file path.
+
+        Providers flagged in_memory synthesize straight into memory. The
+        buffer is handed over first; with persist it is then written to the
+        cache (or audios/ when caching is off) on a background thread, see
+        AudioBuffer.persisted. Other providers, e.g. pyttsx3 whose drivers
+        only write files, go through generate_audio and the file is read back.
+        chunk_callback receives streamed audio as in generate_audio_streaming.
+        """
         if provider not in self.services:
             raise ValueError(f"Unsupported provider: {provider}")
+        if not self.services.spec(provider).in_memory:
+            path = self.generate_audio_streaming(
+                text, provider, voice, rate, pitch, chunk_callback, priority, cancel_token
+            )
+            return AudioBuffer.from_file(path)
 
-        service = self.services[provider]
+        key = self.cache.make_key(provider, voice, rate, pitch, text)
+        meta = {'provider': provider, 'text_hash': AudioCache.text_hash(text)}
+        # Shares the flight with generate_audio callers for the same audio
+        ticket = self._flights.join(
+            key,
+            lambda flight: self._start_memory_job(flight, key, text, provider, voice, rate, pitch, persist, priority),
+            chunk_callback,
+            lambda result: self._as_buffer(result, key, meta, persist)
+        )
+        if ticket.flight.job is not None:
+            self.scheduler.reprioritize(ticket.flight.job, priority)
+        return self._wait(ticket, cancel_token)
 
-        # Generate unique filename
-        filename = f"{provider}_{uuid.uuid4().hex}.mp3"
-        output_path = self.output_dir / filename
-        print(f"Attempting to save audio to: {output_path}")
+    def _start_memory_job(self, flight, key, text, provider, voice, rate, pitch, persist, priority):
+        """Like _start_job, for a flight that resolves to an AudioBuffer"""
+        flight.trace = tracing.new_job_id()
+        flight.meta = {'provider': provider, 'text_hash': AudioCache.text_hash(text)}
+        started = time.time()
+        cache_key = key if self.cache_enabled else None
+        if cache_key:
+            with tracing.span('cache.lookup', flight.trace):
+                cached_path = self.cache.get(cache_key)
+            if cached_path:
+                print(f"Cache hit: {cached_path}")
+                try:
+                    audio = AudioBuffer.from_file(cached_path)
+                except OSError:
+                    audio = None  # Evicted in the meantime, synthesize again
+                if audio is not None:
+                    tracing.record('job', started, time.time(), flight.trace, provider=provider, cache='hit')
+                    flight.resolve(audio)
+                    return None
 
+        token = CancelToken()
+        flight.job = self.scheduler.submit(
+            provider, self._run_memory_job, flight, cache_key, text, provider, voice, rate, pitch, persist,
+            started, token, lane=priority
+        )
+        token.add_callback(flight.job.cancel)
+        flight.job.future.add_done_callback(lambda f: f.cancelled() and cancel_future(flight.future))
+        return token.cancel
+
+    def _run_memory_job(self, flight, cache_key, text, provider, voice, rate, pitch, persist, started,
+                        cancel_token=None):
+        output = io.BytesIO()
         try:
-            # Generate audio
-            service.synthesize(text, str(output_path), voice, rate, pitch)
-            if not output_path.exists():
-                raise FileNotFoundError(f"TTS service failed to create file at {output_path}")
-            print(f"Audio successfully generated at: {output_path}")
-            return str(output_path)
+            if self.supports_streaming(provider):
+                self._synthesize_streaming(flight, text, provider, voice, rate, pitch, output, cancel_token)
+            else:
+                self._synthesize(text, provider, voice, rate, pitch, output, flight.trace, cancel_token)
+            if not output.getbuffer().nbytes:
+                raise RuntimeError(f"{provider} produced no audio")
+        except Exception as e:
+            if not isinstance(e, OperationCancelled):
+                print(f"Error during in-memory synthesis: {e}")
+            tracing.record('job', started, time.time(), flight.trace, error=type(e).__name__)
+            flight.fail(e)
+            return
+
+        audio = AudioBuffer(output.getvalue())
+        tracing.record('job', started, time.time(), flight.trace, cache='miss', memory=True)
+        if not persist:
+            # Settled before resolving, so callers that need a file can tell they must write it (see _written)
+            audio.persisted.set_result(None)
+            flight.resolve(audio)
+            return
+        flight.resolve(audio)
+        # Written even if every caller gave up, the next request can use it
+        self._persist_later(audio, cache_key, flight.meta, flight.trace)
+
+    def _persist_later(self, audio, cache_key, meta, trace=None):
+        """Write audio to disk on the persist thread, see AudioBuffer.persisted"""
+        try:
+            self._persist_executor.submit(self._persist, audio, cache_key, meta, trace)
+        except RuntimeError:
+            audio.persisted.set_result(None)  # Shutting down
+
+    def _persist(self, audio, cache_key, meta, trace=None):
+        """Write an in-memory result to the cache, or to audios/ when caching is off"""
+        extension = audio_format.extension_for(audio.format or 'mp3')
+        if cache_key:
+            path = self.cache.temp_path(cache_key, extension)
+        else:
+            path = str(self.output_dir / f"{meta['provider']}_{uuid.uuid4().hex}.{extension}")
+        try:
+            with tracing.span('audio.persist', trace, bytes=len(audio)):
+                with open(path, 'wb') as f:
+                    f.write(audio.data)
+                if cache_key:
+                    path = self.cache.put(cache_key, path, **meta)
+                else:
+                    self.audio_store.add(path, **meta)
         except Exception as e:
-            print(f"Error during synthesis or file check: {e}")
+            print(f"Error writing audio to {path}: {e}")
+            self.cache.discard(path)
+            audio.persisted.set_exception(e)
+            return
+        audio.path = path
+        audio.persisted.set_result(path)
+        if cache_key:
+            self._compact(cache_key, path, meta)
+
+    def get_time_to_first_audio(self, provider):
+        """Summary of recent time-to-first-audio samples for a provider, in seconds"""
+        samples = sorted(self.time_to_first_audio.get(provider, ()))
+        if not samples:
+            return {'count': 0, 'last': None, 'median': None}
+        return {
+            'count': len(samples),
+            'last': self.time_to_first_audio[provider][-1],
+            'median': samples[len(samples) // 2]
+        }
+
+    def is_long_text(self, text):
+        """Whether text should go through the chunked long-text pipeline"""
+        return len(text) > self._config_get("long_text_threshold", 1000)
+
+    def generate_long_audio(self, text, provider='gtts', voice='', rate=1.0, pitch=1.0,
+                            progress_callback=None, chunk_callback=None, priority='interactive',
+                            cancel_token=None):
+        """Synthesize long text as sentence chunks in parallel and join them in order.
+
+        progress_callback(done, total) is called as each chunk completes.
+        chunk_callback(index, path) is called in text order as soon as a chunk
+        and every chunk before it are ready, so playback can start early.
+        """
+        if provider not in self.services:
+            raise ValueError(f"Unsupported provider: {provider}")
+
+        cache_key = self.cache.make_key(provider, voice, rate, pitch, text) if self.cache_enabled else None
+        cached_path = self.cache.get(cache_key) if cache_key else None
+        if cached_path:
+            print(f"Cache hit: {cached_path}")
+            if progress_callback:
+                progress_callback(1, 1)
+            if chunk_callback:
+                chunk_callback(0, cached_path)
+            return cached_path
+
+        chunks = split_text(text, self._config_get("chunk_max_chars", 400))
+        if not chunks:
+            raise ValueError("No text to synthesize")
+        total = len(chunks)
+        fanout = self._config_get("chunk_fanout", {}).get(provider, 1)
+        print(f"Long text mode: {total} chunks, fan-out {fanout} for {provider}")
+
+        trace = tracing.new_job_id()
+        paths = [None] * total
+        done = 0
+        next_to_emit = 0
+        chunk_span = tracing.span('long_text.chunks', trace, provider=provider, chunks=total, fanout=fanout)
+        with chunk_span, ThreadPoolExecutor(max_workers=max(1, fanout), thread_name_prefix=f"{provider}-chunk") as executor:
+            futures = {
+                executor.submit(
+                    self.generate_audio, chunk, provider, voice, rate, pitch, priority, cancel_token
+                ): index
+                for index, chunk in enumerate(chunks)
+            }
+            try:
+                for future in as_completed(futures):
+                    paths[futures[future]] = future.result()
+                    done += 1
+                    if progress_callback:
+                        progress_callback(done, total)
+                    # Release chunks in order once there is no gap before them
+                    while next_to_emit < total and paths[next_to_emit] is not None:
+                        if chunk_callback:
+                            chunk_callback(next_to_emit, paths[next_to_emit])
+                        next_to_emit += 1
+            except Exception:
+                for pending in futures:
+                    pending.cancel()
+                raise
+
+        if total == 1:
+            return paths[0]
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+
+        # Imported here, pydub and numpy are only needed once there is something to join
+        from utils.audio_processor import AudioProcessor
+
+        output_path = self._new_output_path(provider, cache_key)
+        try:
+            with tracing.span('audio.concatenate', trace, chunks=total):
+                AudioProcessor.concatenate(paths, output_path)
+        except Exception:
+            if cache_key:
+                self.cache.discard(output_path)
             raise
-    
+        output_path = audio_format.match_extension(output_path)
+        meta = {'provider': provider, 'text_hash': AudioCache.text_hash(text)}
+        if cache_key:
+            output_path = self.cache.put(cache_key, output_path, **meta)
+            self._compact(cache_key, output_path, meta)
+        else:
+            self.audio_store.add(output_path, **meta)
+        print(f"Joined {total} chunks into: {output_path}")
+        return output_path
+
+    def _compact(self, cache_key, path, meta=None):
+        """Re-encode a new cache entry to the storage codec in the process pool.
+
+        The entry is replaced only if the result is smaller; until then
+        callers keep using the file the provider wrote.
+        """
+        fmt = self.storage_format
+        if fmt == "native" or audio_format.detect_format(path) in (fmt, None):
+            return
+        if audio_format.ffmpeg_path() is None:
+            if not self._ffmpeg_warned:
+                self._ffmpeg_warned = True
+                print(f"ffmpeg not found, cached audio is kept as produced instead of {fmt}")
+            return
+        temp_path = self.cache.temp_path(cache_key, audio_format.extension_for(fmt))
+        try:
+            future = self.process_pool.submit(audio_format.transcode, path, temp_path, fmt)
+        except RuntimeError:
+            return  # Shutting down
+        future.add_done_callback(lambda f: self._finish_compaction(cache_key, path, temp_path, f, meta))
+
+    def _finish_compaction(self, cache_key, source_path, temp_path, future, meta=None):
+        try:
+            future.result()
+            smaller = os.path.getsize(temp_path) < os.path.getsize(source_path)
+        except Exception as e:
+            print(f"Could not re-encode {source_path} to {self.storage_format}: {e}")
+            self.cache.discard(temp_path)
+            return
+        if not smaller:
+            self.cache.discard(temp_path)
+            return
+        # The original stays until the sweeper drops it as superseded, in case it is playing
+        self.cache.put(cache_key, temp_path, **(meta or {}))
+
+    def convert_audio(self, path, fmt, output_path=None):
+        """Get audio in a given format, transcoding in the process pool only when needed.
+
+        Returns a Future resolving to a path in fmt: path itself if it already
+        is that format, otherwise output_path (by default a file under
+        audios/exports/ that later calls reuse).
+        """
+        if fmt not in audio_format.FORMATS:
+            raise ValueError(f"Unsupported audio format: {fmt}")
+        future = Future()
+        if audio_format.detect_format(path) == fmt:
+            if output_path is not None:
+                shutil.copyfile(path, output_path)
+            future.set_result(str(output_path or path))
+            return future
+
+        if output_path is None:
+            export_dir = self.output_dir / "exports"
+            export_dir.mkdir(parents=True, exist_ok=True)
+            output_path = export_dir / f"{Path(path).stem}.{audio_format.extension_for(fmt)}"
+            if output_path.exists() and output_path.stat().st_mtime >= os.path.getmtime(path):
+                self.audio_store.touch(output_path)
+                future.set_result(str(output_path))
+                return future
+        future = self.process_pool.submit(audio_format.transcode, str(path), str(output_path), fmt)
+        # Exports under audios/ are swept like everything else there; other destinations are left alone
+        future.add_done_callback(lambda f: f.cancelled() or f.exception() or self.audio_store.add(f.result()))
+        return future
+
     def get_available_voices_mp(self, provider):
         """Get available voices using multiprocessing"""
         if provider not in self.services:
             return {provider: []}
         
-        # Create result queue for the process to communicate back
-        result_queue = self.mp_manager.Queue()
-        
-        # Start the process
-        process = mp.Process(
-            target=ProcessManager.run_voice_loading,
-            args=(provider, result_queue)
-        )
-        process.start()
-        
-        # Wait for completion (could be made non-blocking in the future)
-        process.join()
-        
-        # Get result
-        if not result_queue.empty():
-            result = result_queue.get()
-            if 'error' in result:
-                print(f"Error getting voices for {provider}: {result['error']}")
-                return {provider: []}
-            else:
-                return {provider: result['voices']}
-        else:
+        try:
+            # Pass the spec so providers registered at runtime load in the worker too
+            result = self.process_pool.submit(
+                ProcessManager.run_voice_loading, self.services.spec(provider)
+            ).result()
+        except Exception as e:
+            result = {'error': str(e)}
+
+        if 'error' in result:
+            print(f"Error getting voices for {provider}: {result['error']}")
             return {provider: []}
+        return {provider: result['voices']}
 
     # Keep the original method for compatibility
     def get_available_voices(self, provider=None):
         """Get available voices for specified provider or all providers (synchronous)"""
         result = {}
-        target_services = self.services.items()
+        names = list(self.services)
         if provider and provider in self.services:
-            target_services = [(provider, self.services[provider])]
+            names = [provider]
         elif provider:
             return {provider: []}
 
-        for name, service in target_services:
+        for name in names:
             try:
-                result[name] = service.get_voices()
+                # Loading the service happens here, so a provider that fails to initialize only loses its voices
+                result[name] = self.services[name].get_voices()
             except Exception as e:
                 print(f"Error getting voices for {name}: {e}")
                 result[name] = []
         return result
 
+    def _fetch_voices(self, provider):
+        """Fetch a provider's voice list from the source and persist it; None on failure"""
+        try:
+            with tracing.span('voices.fetch', provider=provider):
+                voices = self.services[provider].get_voices(refresh=True)
+        except Exception as e:
+            print(f"Error getting voices for {provider}: {e}")
+            return None
+        if not voices:
+            # Treat an empty list as a failed fetch, keep whatever was cached before
+            return None
+        self.voice_cache.save(provider, voices)
+        return voices
+
+    def _refresh_voices(self, provider, previous, on_refresh):
+        try:
+            voices = self._fetch_voices(provider)
+            if voices is not None and voices != previous and on_refresh:
+                on_refresh({provider: voices})
+        finally:
+            with self._voice_refresh_lock:
+                self._voice_refreshes.discard(provider)
+
+    def get_available_voices_cached(self, provider, on_refresh=None):
+        """Get voices for a provider from the on-disk catalog (stale-while-revalidate).
+
+        A cached list is returned immediately, even if it has expired. Expired
+        lists are refreshed on a background thread and on_refresh({provider:
+        voices}) is called if the list changed. Only a provider that was never
+        cached is fetched synchronously.
+        """
+        if provider not in self.services:
+            return {provider: []}
+
+        voices, fetched_at = self.voice_cache.load(provider)
+        if voices is None:
+            return {provider: self._fetch_voices(provider) or []}
+
+        if not self.voice_cache.is_fresh(fetched_at):
+            with self._voice_refresh_lock:
+                already_running = provider in self._voice_refreshes
+                self._voice_refreshes.add(provider)
+            if not already_running:
+                threading.Thread(
+                    target=self._refresh_voices,
+                    args=(provider, voices, on_refresh),
+                    name=f"{provider}-voice-refresh",
+                    daemon=True
+                ).start()
+        return {provider: voices}
+
     def cleanup_old_audio(self, max_age_days=7):
-        """Clean up old audio files"""
+        """Remove audio not used for max_age_days, then the least recently used beyond the size budget.
+
+        Runs a sweep of the audio store right away (it also sweeps on its own
+        in the background). Pinned files are kept. Returns how many files
+        were removed.
+        """
         try:
-            current_time = Path().stat().st_mtime
-            for file in self.output_dir.glob("*.mp3"):
-                file_age_days = (current_time - file.stat().st_mtime) / (24 * 3600)
-                if file_age_days > max_age_days:
-                    file.unlink()
+            return self.audio_store.sweep(max_age=max_age_days * 24 * 3600)
         except Exception as e:
             print(f"Error during cleanup: {e}")
+            return 0
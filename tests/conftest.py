@@ -0,0 +1,54 @@
+import sys
+import wave
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Same layout the benchmarks use: repo modules and the fake providers importable by name
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "benchmarks"))
+
+from fake_providers import FakeProviderServer
+from services.tts_manager import TTSManager
+
+
+@pytest.fixture
+def fake_providers():
+    """Local gTTS and Edge TTS stand-ins, installed for the duration of a test"""
+    server = FakeProviderServer(latency=0.05, tail_rate=0.0)
+    server.start()
+    restore = server.install()
+    yield server
+    restore()
+    server.stop()
+
+
+@pytest.fixture
+def tts_manager(fake_providers, tmp_path):
+    """TTSManager talking to the fake providers, with its files under tmp_path and no cache or sweeper"""
+    manager = TTSManager({
+        'cache_enabled': False,
+        'storage_format': 'native',
+        'audio_dir': str(tmp_path / "audios"),
+        'cache_dir': str(tmp_path / "cache"),
+        'audio_store': {'sweep_interval_sec': 0},
+    })
+    yield manager
+    manager.shutdown()
+
+
+@pytest.fixture
+def write_wav():
+    """Write (frames, channels) or mono int16 samples to a 16-bit WAV; returns the path"""
+    def write(path, samples, frame_rate=8000):
+        samples = np.asarray(samples, dtype='<i2')
+        if samples.ndim == 1:
+            samples = samples[:, None]
+        with wave.open(str(path), 'wb') as f:
+            f.setnchannels(samples.shape[1])
+            f.setsampwidth(2)
+            f.setframerate(frame_rate)
+            f.writeframes(samples.tobytes())
+        return path
+    return write
@@ -0,0 +1,51 @@
+import io
+import os
+
+import pytest
+
+from services.gtts_service import GTTSService
+from services.edge_tts_service import EdgeTTSService
+from utils.audio_buffer import AudioBuffer
+
+VOICES = {'gtts': 'en-US', 'edge_tts': 'en-US-JennyNeural'}
+
+
+def _files(root):
+    return sorted(os.path.join(folder, name) for folder, _, names in os.walk(root) for name in names)
+
+
+def test_buffer_sniffs_its_format_and_reads_back_files(tmp_path):
+    audio = AudioBuffer(b'ID3' + bytes(61))
+    assert audio.format == 'mp3'
+    assert audio.path is None and not audio.persisted.done()
+    assert audio.open().read() == audio.data
+
+    path = tmp_path / "clip.mp3"
+    path.write_bytes(audio.data)
+    loaded = AudioBuffer.from_file(path)
+    assert loaded.data == audio.data
+    assert loaded.wait_persisted(0) == str(path)
+
+
+@pytest.mark.parametrize('provider, service', [('gtts', GTTSService), ('edge_tts', EdgeTTSService)])
+@pytest.mark.parametrize('cache_enabled', [False, True])
+def test_unpersisted_audio_never_touches_the_disk(tts_manager, fake_providers, monkeypatch, provider, service,
+                                                  cache_enabled):
+    tts_manager.cache_enabled = cache_enabled
+    outputs = []
+    original = service.synthesize_streaming
+
+    def recording(self, text, output_path, *args, **kwargs):
+        outputs.append(output_path)
+        return original(self, text, output_path, *args, **kwargs)
+
+    monkeypatch.setattr(service, 'synthesize_streaming', recording)
+    before = _files(tts_manager.output_dir)
+
+    audio = tts_manager.generate_audio_memory("Kept in memory", provider, VOICES[provider], persist=False)
+
+    assert audio.format == 'mp3' and len(audio) > 0
+    assert audio.wait_persisted(5) is None
+    assert audio.path is None
+    assert len(outputs) == 1 and isinstance(outputs[0], io.BytesIO)
+    assert _files(tts_manager.output_dir) == before
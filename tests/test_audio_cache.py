@@ -0,0 +1,101 @@
+import os
+import time
+from pathlib import Path
+
+from utils.audio_cache import AudioCache
+
+
+def _age(path, seconds):
+    """Set path's mtime seconds into the past"""
+    stamp = time.time() - seconds
+    os.utime(path, (stamp, stamp))
+
+
+def _put(cache, key, size, extension="mp3"):
+    temp_path = cache.temp_path(key, extension)
+    with open(temp_path, 'wb') as f:
+        f.write(b'\0' * size)
+    return cache.put(key, temp_path)
+
+
+def test_make_key_ignores_whitespace_and_covers_parameters():
+    key = AudioCache.make_key('gtts', 'en', 1.0, 1.0, "Hello   world ")
+    assert key == AudioCache.make_key('gtts', 'en', 1.0, 1.0, "Hello world")
+    assert key != AudioCache.make_key('gtts', 'en', 1.1, 1.0, "Hello world")
+    assert key != AudioCache.make_key('edge', 'en', 1.0, 1.0, "Hello world")
+
+
+def test_put_publishes_temporary_file(tmp_path):
+    cache = AudioCache(tmp_path)
+    key = AudioCache.make_key('gtts', 'en', 1.0, 1.0, "hello")
+    assert cache.get(key) is None
+
+    temp_path = cache.temp_path(key)
+    assert AudioCache.PART_MARKER in temp_path
+    Path(temp_path).write_bytes(b'audio')
+    path = cache.put(key, temp_path)
+
+    assert not os.path.exists(temp_path)
+    assert cache.get(key) == path
+    assert Path(path).read_bytes() == b'audio'
+
+
+def test_get_bumps_mtime(tmp_path):
+    cache = AudioCache(tmp_path)
+    path = _put(cache, 'a', 10)
+    _age(path, 3600)
+    cache.get('a')
+    assert time.time() - os.path.getmtime(path) < 60
+
+
+def test_evict_removes_least_recently_used(tmp_path):
+    cache = AudioCache(tmp_path, max_bytes=250)
+    for index, key in enumerate(['a', 'b', 'c']):
+        _age(_put(cache, key, 100), 1000 - index)
+
+    assert cache.evict() == 200
+    assert cache.get('a') is None
+    assert cache.get('b') and cache.get('c')
+
+
+def test_evict_spares_recently_used_entries(tmp_path):
+    cache = AudioCache(tmp_path, max_bytes=50)
+    _put(cache, 'a', 100)
+    _put(cache, 'b', 100)
+    assert cache.evict() == 200
+    assert cache.get('a') and cache.get('b')
+
+
+def test_discard_removes_temporary_file(tmp_path):
+    cache = AudioCache(tmp_path)
+    temp_path = cache.temp_path('a')
+    Path(temp_path).write_bytes(b'partial')
+    cache.discard(temp_path)
+    assert not os.path.exists(temp_path)
+    assert cache.get('a') is None
+
+
+def test_stale_partial_files_are_removed(tmp_path):
+    cache = AudioCache(tmp_path)
+    stale = cache.temp_path('a')
+    fresh = cache.temp_path('b')
+    Path(stale).write_bytes(b'x')
+    Path(fresh).write_bytes(b'x')
+    _age(stale, AudioCache.STALE_PART_AGE + 10)
+
+    cache.evict()
+    assert not os.path.exists(stale)
+    assert os.path.exists(fresh)
+
+
+def test_preferred_format_supersedes_others(tmp_path):
+    cache = AudioCache(tmp_path)
+    mp3_path = _put(cache, 'a', 100, "mp3")
+    opus_path = _put(cache, 'a', 40, "opus")
+    assert cache.get('a') == opus_path
+
+    # The old copy stays while it may still be playing, then goes with the next scan
+    assert cache.evict() == 140
+    _age(mp3_path, AudioCache.MIN_EVICT_AGE + 10)
+    assert cache.evict() == 40
+    assert not os.path.exists(mp3_path)
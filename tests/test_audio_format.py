@@ -0,0 +1,66 @@
+import os
+
+import pytest
+
+from utils import audio_format
+from utils.audio_format import detect_format, match_extension, sniff_format
+
+WAV = b'RIFF\x24\x00\x00\x00WAVEfmt '
+HEADERS = [
+    (b'\xff\xfb\x90\x64' + bytes(60), 'mp3'),  # MPEG-1 layer III frame sync
+    (b'\xff\xf3\x84\xc4' + bytes(60), 'mp3'),  # MPEG-2 layer III
+    (b'ID3\x04\x00\x00\x00\x00\x00\x00' + bytes(54), 'mp3'),
+    (b'\xff\xf1\x50\x80' + bytes(60), 'aac'),  # ADTS: layer bits 00
+    (WAV + bytes(48), 'wav'),
+    (b'OggS\x00\x02' + bytes(22) + b'OpusHead\x01\x01', 'opus'),
+    (b'OggS\x00\x02' + bytes(23) + b'vorbis', 'ogg'),
+    (b'fLaC\x00\x00\x00\x22', 'flac'),
+    (b'FORM\x00\x00\x00\x00AIFF', 'aiff'),
+    (b'\x00\x00\x00\x20ftypM4A ', 'm4a'),
+    (b'RIFF\x24\x00\x00\x00AVI ', None),  # RIFF but not WAVE
+    (b'<html>', None),
+    (b'\xff', None),  # Too short for a frame sync
+    (b'', None),
+]
+
+
+@pytest.mark.parametrize('header, fmt', HEADERS)
+def test_sniff_format(header, fmt):
+    assert sniff_format(header) == fmt
+
+
+@pytest.mark.parametrize('header, fmt', HEADERS)
+def test_detect_format_reads_the_file_header(tmp_path, header, fmt):
+    path = tmp_path / "clip.bin"
+    path.write_bytes(header)
+    assert detect_format(path) == fmt
+
+
+def test_detect_format_of_a_missing_file(tmp_path):
+    assert detect_format(tmp_path / "missing.mp3") is None
+
+
+@pytest.mark.parametrize('name, header, expected', [
+    ("clip.mp3", WAV + bytes(48), "clip.wav"),  # pyttsx3 writes WAV whatever it is asked for
+    ("clip.mp3", b'OggS' + bytes(24) + b'OpusHead', "clip.opus"),
+    ("clip.wav", b'\xff\xfb\x90\x64' + bytes(60), "clip.mp3"),
+    ("clip.mp3", b'ID3' + bytes(61), "clip.mp3"),  # Already right
+    ("clip.mp3", b'<html>', "clip.mp3"),  # Unknown content keeps its name
+    ("clip.MP3", b'\xff\xfb\x90\x64' + bytes(60), "clip.MP3"),  # Case doesn't matter
+])
+def test_match_extension(tmp_path, name, header, expected):
+    path = tmp_path / name
+    path.write_bytes(header)
+    result = match_extension(path)
+    assert result == str(tmp_path / expected)
+    assert os.listdir(tmp_path) == [expected]
+    with open(result, 'rb') as f:
+        assert f.read() == header
+
+
+def test_format_for_path_and_extensions():
+    assert audio_format.format_for_path("a/b.OPUS") == 'opus'
+    assert audio_format.format_for_path("a/b.txt") is None
+    assert audio_format.with_extension("a/b.part.mp3", 'opus') == "a/b.part.opus"
+    assert audio_format.mime_type('mp3') == 'audio/mpeg'
+    assert audio_format.mime_type('unknown') == 'application/octet-stream'
@@ -0,0 +1,134 @@
+import os
+import time
+
+import pytest
+
+from utils.audio_store import AudioStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = AudioStore(tmp_path, max_bytes=250)
+    store.MIN_EVICT_AGE = 0  # Let sweeps remove files written moments ago
+    yield store
+    store.close()
+
+
+def _add(store, name, size=100):
+    path = store.root_dir / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b'\0' * size)
+    store.add(path, provider='gtts')
+    return path
+
+
+def test_add_and_stats(store):
+    _add(store, 'a.mp3')
+    _add(store, 'sub/b.mp3', 50)
+    assert store.stats() == {'files': 2, 'bytes': 150, 'pinned': 0, 'max_bytes': 250}
+
+
+def test_files_outside_the_root_are_ignored(store, tmp_path_factory):
+    outside = tmp_path_factory.mktemp('elsewhere') / 'c.mp3'
+    outside.write_bytes(b'\0' * 10)
+    store.add(outside)
+    assert store.stats()['files'] == 0
+
+
+def test_sweep_removes_least_recently_used_over_budget(store):
+    a, b, c = (_add(store, name) for name in ('a.mp3', 'b.mp3', 'c.mp3'))
+    store.touch(a)
+
+    assert store.sweep() == 1
+    assert not b.exists()
+    assert a.exists() and c.exists()
+    assert store.stats()['bytes'] == 200
+
+
+def test_sweep_removes_expired_files_within_budget(store):
+    a = _add(store, 'a.mp3')
+    time.sleep(0.01)
+    assert store.sweep(max_age=0.005) == 1
+    assert not a.exists()
+
+
+def test_recently_used_files_are_kept(store):
+    store.MIN_EVICT_AGE = 60
+    paths = [_add(store, f"{name}.mp3") for name in 'abc']
+    assert store.sweep(max_age=0) == 0
+    assert all(path.exists() for path in paths)
+
+
+def test_pinned_files_are_kept_until_unpinned(store):
+    a, b, c = (_add(store, name) for name in ('a.mp3', 'b.mp3', 'c.mp3'))
+    store.pin(a)
+    store.pin(a)
+    assert store.sweep() == 1
+    assert a.exists() and not b.exists()
+
+    store.unpin(a)
+    assert store.stats()['pinned'] == 1
+    _add(store, 'd.mp3')
+    store.expire(a)
+    assert store.sweep() == 1
+    assert a.exists() and not c.exists()
+
+    store.unpin(a)
+    assert store.sweep() == 1
+    assert not a.exists()
+
+
+def test_expired_file_goes_first(store):
+    a, b, c = (_add(store, name) for name in ('a.mp3', 'b.mp3', 'c.mp3'))
+    store.expire(c)
+    assert store.sweep() == 1
+    assert not c.exists()
+    assert a.exists() and b.exists()
+
+
+def test_companions_are_removed_with_their_audio(store):
+    a = _add(store, 'a.mp3')
+    companion = a.with_name(a.name + AudioStore.COMPANION_SUFFIXES[0])
+    companion.write_bytes(b'peaks')
+    assert store.sweep(max_age=-1) == 1
+    assert not companion.exists()
+
+
+def test_reconcile_adopts_and_forgets_files(store):
+    known = _add(store, 'known.mp3')
+    gone = _add(store, 'gone.mp3')
+    os.remove(gone)
+    unknown = store.root_dir / 'unknown.mp3'
+    unknown.write_bytes(b'\0' * 30)
+    orphan = store.root_dir / ('gone.mp3' + AudioStore.COMPANION_SUFFIXES[0])
+    orphan.write_bytes(b'peaks')
+    stale = store.root_dir / 'x.part.mp3'
+    fresh = store.root_dir / 'y.part.mp3'
+    stale.write_bytes(b'partial')
+    fresh.write_bytes(b'partial')
+    old = time.time() - AudioStore.STALE_TEMP_AGE - 10
+    os.utime(stale, (old, old))
+
+    store.reconcile()
+
+    assert store.stats()['files'] == 2
+    assert store.stats()['bytes'] == 130
+    assert known.exists() and unknown.exists()
+    assert not orphan.exists()
+    assert not stale.exists() and fresh.exists()
+
+
+def test_index_is_shared_through_the_directory(store):
+    _add(store, 'a.mp3')
+    other = AudioStore(store.root_dir)
+    try:
+        assert other.stats()['files'] == 1
+    finally:
+        other.close()
+
+
+def test_closed_store_ignores_calls(store):
+    store.close()
+    _add(store, 'a.mp3')
+    assert store.stats()['files'] == 0
+    assert store.sweep() == 0
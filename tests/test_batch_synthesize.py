@@ -0,0 +1,62 @@
+import argparse
+import json
+
+from batch_synthesize import read_rows, run_batch
+
+DEFAULTS = {'provider': 'gtts', 'voice': 'en-US', 'rate': 1.0, 'pitch': 1.0}
+
+
+def _write_lines(path, lines):
+    path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    return path
+
+
+def test_bad_jsonl_lines_become_error_rows(tmp_path):
+    source = _write_lines(tmp_path / "rows.jsonl", [
+        json.dumps({'id': 'first', 'text': "Hello"}),
+        '{"id": "broken", "text": ',
+        '["not", "an", "object"]',
+        json.dumps({'id': 'number', 'text': 5}),
+        json.dumps({'id': 'voice', 'text': "Hi", 'voice': 5}),
+        json.dumps({'id': 'rate', 'text': "Hi", 'rate': "fast"}),
+        json.dumps({'id': 'last', 'text': "World", 'provider': 'edge_tts'}),
+    ])
+    rows = list(read_rows(source, 'auto', DEFAULTS))
+
+    assert [row['id'] for row in rows] == ['first', '2', '3', 'number', 'voice', 'rate', 'last']
+    assert [row['id'] for row in rows if 'error' not in row] == ['first', 'last']
+    assert rows[-1]['provider'] == 'edge_tts'
+    assert rows[0]['voice'] == 'en-US'
+
+
+def test_empty_texts_are_skipped(tmp_path):
+    source = _write_lines(tmp_path / "rows.txt", ["one", "", "   ", "two"])
+    assert [row['text'] for row in read_rows(source, 'auto', DEFAULTS)] == ["one", "two"]
+
+
+def test_run_continues_past_a_bad_line(tmp_path, fake_providers):
+    config = tmp_path / "config.json"
+    config.write_text(json.dumps({
+        'cache_enabled': False,
+        'storage_format': 'native',
+        'audio_dir': str(tmp_path / "audios"),
+        'cache_dir': str(tmp_path / "cache"),
+        'audio_store': {'sweep_interval_sec': 0},
+    }))
+    source = _write_lines(tmp_path / "rows.jsonl", [
+        json.dumps({'id': 'a', 'text': "First row"}),
+        '{not json',
+        json.dumps({'id': 'c', 'text': "Third row"}),
+    ])
+    manifest = tmp_path / "manifest.jsonl"
+    args = argparse.Namespace(
+        input=str(source), manifest=str(manifest), format='auto', output_dir=None, audio_format=None,
+        config=str(config), provider='gtts', voice='en-US', rate=1.0, pitch=1.0, concurrency='',
+        max_pending=10, no_duration=True, progress_every=100
+    )
+
+    assert run_batch(args) == 1  # Some rows failed
+    entries = {entry['id']: entry for entry in map(json.loads, manifest.read_text().splitlines())}
+    assert entries['a']['status'] == 'ok'
+    assert entries['c']['status'] == 'ok'
+    assert (entries['2']['status'], entries['2']['error']) == ('error', 'invalid JSON object')
@@ -0,0 +1,60 @@
+import threading
+import time
+
+from utils.cancellation import CancelToken, OperationCancelled
+
+EDGE_VOICE = 'en-US-JennyNeural'
+
+
+def test_cancelling_a_parent_cancels_its_children():
+    parent = CancelToken()
+    child = CancelToken(parent)
+    calls = []
+    child.add_callback(lambda: calls.append('child'))
+    parent.cancel()
+    assert child.cancelled
+    assert calls == ['child']
+
+
+def test_cancelling_a_stream_part_way_cleans_up(tts_manager, fake_providers):
+    fake_providers.chunk_interval = 0.2
+    text = "A long passage that the provider streams back in several chunks. " * 5
+    token = CancelToken()
+    first_chunk = threading.Event()
+    chunks = []
+    errors = []
+
+    def on_chunk(data):
+        chunks.append(data)
+        first_chunk.set()
+
+    def request():
+        try:
+            tts_manager.generate_audio_streaming(text, 'edge_tts', EDGE_VOICE, chunk_callback=on_chunk,
+                                                 cancel_token=token)
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=request)
+    thread.start()
+    assert first_chunk.wait(5)
+    token.cancel()
+    thread.join(5)
+    assert len(errors) == 1 and isinstance(errors[0], OperationCancelled)
+
+    # The job stops, its partial file is removed and its scheduler slot is given back
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline and (
+            tts_manager.scheduler.stats()['edge_tts']['running']
+            or list(tts_manager.output_dir.glob("*.mp3"))
+            or tts_manager.get_queue_stats()['jobs']['in_flight']):
+        time.sleep(0.01)
+    assert tts_manager.scheduler.stats()['edge_tts']['running'] == 0
+    assert list(tts_manager.output_dir.glob("*.mp3")) == []
+    assert tts_manager.get_queue_stats()['jobs']['in_flight'] == 0
+    assert len(chunks) < 4
+
+    # The provider is free for the next request
+    fake_providers.chunk_interval = 0.0
+    path = tts_manager.generate_audio_streaming("Next request", 'edge_tts', EDGE_VOICE)
+    assert path.endswith(".mp3")
@@ -0,0 +1,113 @@
+import os
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from utils.audio_processor import AudioProcessor
+from utils.decoded_audio import DecodeCache, DecodedAudio, probe_duration, source_key
+
+
+class Entry:
+    def __init__(self, nbytes):
+        self.nbytes = nbytes
+
+
+@pytest.fixture
+def decodes(monkeypatch):
+    """Use an empty decode cache and no PCM cache; returns the sources AudioProcessor decoded"""
+    monkeypatch.setattr(AudioProcessor, 'pcm_cache', None)
+    monkeypatch.setattr(AudioProcessor, 'decode_cache', DecodeCache())
+    calls = []
+    original = AudioProcessor.load
+
+    def load(source):
+        calls.append(source)
+        return original(source)
+
+    monkeypatch.setattr(AudioProcessor, 'load', staticmethod(load))
+    return calls
+
+
+def test_cache_evicts_least_recently_used_by_size():
+    cache = DecodeCache(max_bytes=250)
+    for key in 'abc':
+        cache.get(key, lambda: Entry(100))
+    assert cache.peek('a') is None
+    assert cache.peek('b') is not None
+    cache.get('d', lambda: Entry(100))
+    assert cache.peek('c') is None  # b was used more recently
+    assert cache.stats()['bytes'] == 200
+
+
+def test_entries_larger_than_the_budget_are_not_kept():
+    cache = DecodeCache(max_bytes=50)
+    entry = cache.get('big', lambda: Entry(100))
+    assert entry.nbytes == 100
+    assert cache.peek('big') is None
+
+
+def test_concurrent_gets_share_one_load():
+    cache = DecodeCache()
+    calls = []
+
+    def load():
+        calls.append(1)
+        time.sleep(0.05)
+        return Entry(1)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get('k', load))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert len(calls) == 1
+    assert len({id(result) for result in results}) == 1
+
+
+def test_source_key_follows_file_version_and_content(tmp_path):
+    path = tmp_path / "a.wav"
+    path.write_bytes(b'one')
+    key = source_key(path)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert source_key(path) != key
+    assert source_key(b'audio') == source_key(bytearray(b'audio'))
+    assert source_key(b'audio') != source_key(b'other')
+
+
+def test_probe_duration_reads_the_wav_header(tmp_path, write_wav):
+    source = write_wav(tmp_path / "a.wav", np.zeros((12000, 1), np.int16))
+    assert probe_duration(source) == 1500
+    assert probe_duration(source.read_bytes()) == 1500
+
+
+def test_queries_share_one_decode(decodes, tmp_path, write_wav):
+    samples = np.arange(-4000, 4000, dtype=np.int16).reshape(-1, 2)
+    source = write_wav(tmp_path / "a.wav", samples)
+
+    np.testing.assert_array_equal(AudioProcessor.get_samples(source), samples)
+    assert len(AudioProcessor.get_audio_data(source)) == samples.size
+    assert AudioProcessor.get_audio_duration(source) == 500
+    assert len(decodes) == 1
+
+
+def test_rewritten_file_is_decoded_again(decodes, tmp_path, write_wav):
+    source = write_wav(tmp_path / "a.wav", np.zeros((800, 1), np.int16))
+    AudioProcessor.decode(source)
+    stat = os.stat(source)
+    write_wav(source, np.ones((800, 1), np.int16))
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    assert AudioProcessor.decode(source).samples.max() == 1
+    assert len(decodes) == 2
+
+
+def test_in_memory_audio_is_keyed_by_content(decodes, tmp_path, write_wav):
+    data = write_wav(tmp_path / "a.wav", np.zeros((800, 1), np.int16)).read_bytes()
+    first = AudioProcessor.decode(data)
+    assert AudioProcessor.decode(bytes(data)) is first
+    assert isinstance(first, DecodedAudio)
+    assert len(decodes) == 1
@@ -0,0 +1,178 @@
+import os
+import threading
+
+import numpy as np
+import pytest
+
+from utils.audio_processor import AudioProcessor
+from utils.decoded_audio import DecodeCache
+from utils.pcm_cache import HEADER_SIZE, PcmCache
+from utils.pcm_stream import BLOCK_FRAMES, LevelMeter
+from utils.peaks import PeakBuilder, PeakPyramid
+
+
+def _tone(frames, channels=1, seed=0):
+    return np.random.default_rng(seed).integers(-20000, 20000, (frames, channels)).astype(np.int16)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return PcmCache(tmp_path / "pcm")
+
+
+@pytest.fixture
+def writes(monkeypatch):
+    """Count decodes into the cache"""
+    calls = []
+    original = PcmCache._write
+
+    def counting(self, source, path, *passes):
+        calls.append(source)
+        return original(self, source, path, *passes)
+
+    monkeypatch.setattr(PcmCache, '_write', counting)
+    return calls
+
+
+def test_get_decodes_once_and_maps_the_entry(cache, tmp_path, write_wav, writes):
+    samples = _tone(10000, 2)
+    source = write_wav(tmp_path / "a.wav", samples)
+    assert cache.peek(source) is None
+
+    decoded = cache.get(source)
+    assert isinstance(decoded.samples, np.memmap)
+    assert (decoded.frame_rate, decoded.channels, decoded.sample_width) == (8000, 2, 2)
+    np.testing.assert_array_equal(decoded.samples, samples)
+
+    assert cache.get(source) is decoded
+    assert cache.peek(source) is decoded
+    assert len(writes) == 1
+    assert os.path.getsize(cache.entry_path(source)) == HEADER_SIZE + samples.nbytes
+
+
+def test_rewritten_source_gets_a_new_entry(cache, tmp_path, write_wav):
+    source = write_wav(tmp_path / "a.wav", _tone(1000))
+    old_entry = cache.entry_path(source)
+    cache.get(source)
+
+    # Same size, so only the mtime tells the versions apart
+    replacement = _tone(1000, seed=1)
+    stat = os.stat(source)
+    write_wav(source, replacement)
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    assert cache.entry_path(source) != old_entry
+    assert cache.peek(source) is None
+    np.testing.assert_array_equal(cache.get(source).samples, replacement)
+    assert not old_entry.exists()
+    assert cache.stats()['entries'] == 1
+
+
+def test_concurrent_gets_share_one_decode(cache, tmp_path, write_wav, writes):
+    source = write_wav(tmp_path / "a.wav", _tone(50000))
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get(source))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    assert len(results) == 4
+    assert len(writes) == 1
+
+
+def test_damaged_entry_is_decoded_again(cache, tmp_path, write_wav, writes):
+    samples = _tone(1000)
+    source = write_wav(tmp_path / "a.wav", samples)
+    cache.get(source)
+    cache.clear()
+    cache.entry_path(source).write_bytes(b'garbage')
+
+    np.testing.assert_array_equal(cache.get(source).samples, samples)
+    assert len(writes) == 2
+
+
+def test_evict_keeps_recent_entries_within_budget(tmp_path, write_wav, monkeypatch):
+    monkeypatch.setattr(PcmCache, 'MIN_EVICT_AGE', 0)
+    entry_bytes = HEADER_SIZE + 1000 * 2
+    cache = PcmCache(tmp_path / "pcm", max_bytes=2 * entry_bytes)
+    sources = [write_wav(tmp_path / f"{index}.wav", _tone(1000, seed=index)) for index in range(3)]
+    for index, source in enumerate(sources):
+        cache.get(source)
+        stamp = 1000 + index  # Oldest first, whatever the clock resolution
+        os.utime(cache.entry_path(source), (stamp, stamp))
+
+    assert cache.evict() == 2 * entry_bytes
+    assert not cache.entry_path(sources[0]).exists()
+    assert cache.entry_path(sources[2]).exists()
+
+
+def test_evict_spares_recently_used_entries(tmp_path, write_wav):
+    cache = PcmCache(tmp_path / "pcm", max_bytes=1)
+    source = write_wav(tmp_path / "a.wav", _tone(1000))
+    cache.get(source)
+    assert cache.evict() > 1
+    assert cache.entry_path(source).exists()
+
+
+def test_stale_temporary_files_are_removed(cache, tmp_path, write_wav):
+    source = write_wav(tmp_path / "a.wav", _tone(100))
+    cache.get(source)
+    stale = cache.cache_dir / f"leftover{PcmCache.TEMP_MARKER}"
+    stale.write_bytes(b'partial')
+    old = os.stat(stale).st_mtime - PcmCache.STALE_TEMP_AGE - 10
+    os.utime(stale, (old, old))
+
+    assert cache.stats()['entries'] == 1
+    assert not stale.exists()
+
+
+def test_audio_processor_reads_slices_from_the_cache(tmp_path, write_wav, monkeypatch):
+    monkeypatch.setattr(AudioProcessor, 'pcm_cache', PcmCache(tmp_path / "pcm"))
+    samples = _tone(8000, 2)
+    source = write_wav(tmp_path / "a.wav", samples)
+
+    view = AudioProcessor.get_samples(source, 250, 500)
+    np.testing.assert_array_equal(view, samples[2000:4000])
+    assert isinstance(view, np.memmap)
+
+    output = AudioProcessor.extract(source, tmp_path / "part.wav", 500)
+    np.testing.assert_array_equal(AudioProcessor.get_samples(output), samples[4000:])
+
+
+def test_analyze_feeds_the_decode_then_reads_the_entry_back(cache, tmp_path, write_wav, writes, monkeypatch):
+    samples = _tone(BLOCK_FRAMES * 2 + 1000, 2)
+    source = write_wav(tmp_path / "a.wav", samples)
+    expected = PeakPyramid.from_samples(samples, 8000, 2)
+    # Neither pass may go through the mapping, whose touched pages stay resident
+    monkeypatch.setattr(PcmCache, '_map', staticmethod(lambda path: pytest.fail("entry was mapped")))
+
+    for _ in range(2):
+        builder = PeakBuilder()
+        assert cache.analyze(source, builder) == (8000, 2)
+        np.testing.assert_array_equal(builder.result(8000).levels[0], expected.levels[0])
+    assert len(writes) == 1
+
+    meter, whole = LevelMeter(), LevelMeter()
+    assert cache.feed(source, meter) == (8000, 2)
+    whole.feed(samples)
+    assert meter.result(8000, 2) == pytest.approx(whole.result(8000, 2))
+
+
+def test_audio_processor_peaks_stream_through_the_cache(tmp_path, write_wav, monkeypatch):
+    monkeypatch.setattr(AudioProcessor, 'pcm_cache', PcmCache(tmp_path / "pcm"))
+    monkeypatch.setattr(AudioProcessor, 'peak_cache', DecodeCache())
+    monkeypatch.setattr(PeakPyramid, 'from_samples', lambda *args: pytest.fail("whole clip was summarized"))
+    samples = _tone(BLOCK_FRAMES + 5000)
+    source = write_wav(tmp_path / "a.wav", samples)
+
+    peaks = AudioProcessor.get_peaks(source)
+    assert peaks.frames == len(samples)
+    assert AudioProcessor.pcm_cache.peek(source) is not None
+    np.testing.assert_array_equal(AudioProcessor.get_samples(source, 0, 10), samples[:80])
+
+
+def test_empty_clip(cache, tmp_path, write_wav):
+    source = write_wav(tmp_path / "empty.wav", np.zeros((0, 1), np.int16))
+    decoded = cache.get(source)
+    assert decoded.frames == 0
+    assert decoded.channels == 1
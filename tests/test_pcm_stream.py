@@ -0,0 +1,101 @@
+import math
+import wave
+
+import numpy as np
+import pytest
+
+from utils import audio_format
+from utils.pcm_stream import LevelMeter, PcmStream, analyze
+
+needs_ffmpeg = pytest.mark.skipif(audio_format.ffmpeg_path() is None, reason="ffmpeg not found")
+
+
+def _noise(frames, channels=1, seed=0):
+    return np.random.default_rng(seed).integers(-30000, 30000, (frames, channels)).astype(np.int16)
+
+
+def test_wav_is_read_in_blocks(tmp_path, write_wav):
+    samples = _noise(10000, 2)
+    source = write_wav(tmp_path / "a.wav", samples)
+    with PcmStream(source, block_frames=4096) as stream:
+        assert (stream.channels, stream.frame_rate, stream.sample_width) == (2, 8000, 2)
+        blocks = list(stream)
+    assert [len(block) for block in blocks] == [4096, 4096, 1808]
+    np.testing.assert_array_equal(np.concatenate(blocks), samples)
+
+
+def test_in_memory_wav(tmp_path, write_wav):
+    samples = _noise(3000)
+    data = write_wav(tmp_path / "a.wav", samples).read_bytes()
+    np.testing.assert_array_equal(np.concatenate(list(PcmStream(data))), samples)
+
+
+@pytest.mark.parametrize('sample_width, values, expected', [
+    (1, np.array([0, 128, 255], np.uint8), [-32768, 0, 32512]),  # 8-bit WAV is unsigned around 128
+    (4, np.array([-2 ** 31, 0, 2 ** 31 - 1], np.int32), [-32768, 0, 32767]),
+])
+def test_other_sample_widths_become_int16(tmp_path, sample_width, values, expected):
+    path = tmp_path / "a.wav"
+    with wave.open(str(path), 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(sample_width)
+        f.setframerate(8000)
+        f.writeframes(values.tobytes())
+    assert np.concatenate(list(PcmStream(path))).ravel().tolist() == expected
+
+
+def test_level_meter():
+    meter = LevelMeter()
+    meter.feed(np.full((4000, 2), 16384, np.int16))
+    meter.feed(np.full((4000, 2), -16384, np.int16))
+    result = meter.result(8000, 2)
+    assert result['duration_ms'] == 1000
+    assert result['rms_dbfs'] == pytest.approx(20 * math.log10(0.5))
+    assert result['peak_dbfs'] == pytest.approx(20 * math.log10(0.5))
+    assert LevelMeter().result(8000, 1)['rms_dbfs'] == float('-inf')
+
+
+def test_analyze_runs_every_pass_over_one_stream(tmp_path, write_wav):
+    source = write_wav(tmp_path / "a.wav", _noise(5000))
+    first, second = LevelMeter(), LevelMeter()
+    stream = analyze(source, first, second, block_frames=1024)
+    assert stream.frame_rate == 8000
+    assert first.frames == second.frames == 5000
+
+
+def test_other_formats_need_ffmpeg(monkeypatch):
+    monkeypatch.setattr(audio_format, 'ffmpeg_path', lambda: None)
+    with pytest.raises(RuntimeError, match="ffmpeg is required"):
+        PcmStream(b'not a wav file')
+
+
+@needs_ffmpeg
+def test_compressed_file_is_decoded_through_ffmpeg(tmp_path, write_wav):
+    samples = _noise(20000, 2)
+    wav_path = write_wav(tmp_path / "a.wav", samples)
+    flac_path = audio_format.transcode(wav_path, tmp_path / "a.flac", 'flac')
+
+    with PcmStream(flac_path, block_frames=4096) as stream:
+        decoded = np.concatenate(list(stream))
+    np.testing.assert_array_equal(decoded, samples)  # Lossless round trip
+
+    with open(flac_path, 'rb') as f:
+        from_bytes = np.concatenate(list(PcmStream(f.read())))
+    np.testing.assert_array_equal(from_bytes, samples)
+
+
+@needs_ffmpeg
+def test_stopping_early_ends_ffmpeg(tmp_path, write_wav):
+    wav_path = write_wav(tmp_path / "a.wav", _noise(200000))
+    flac_path = audio_format.transcode(wav_path, tmp_path / "a.flac", 'flac')
+    stream = PcmStream(flac_path, block_frames=1024)
+    process = stream._process
+    for _ in stream:
+        break
+    assert process.poll() is not None
+
+
+@needs_ffmpeg
+def test_ffmpeg_errors_are_raised():
+    with pytest.raises(RuntimeError, match="ffmpeg"):
+        list(PcmStream(b'BAD' + b'\0' * 1000))
@@ -0,0 +1,120 @@
+import os
+
+import numpy as np
+import pytest
+
+from utils.audio_processor import AudioProcessor
+from utils.decoded_audio import DecodeCache
+from utils.pcm_stream import analyze
+from utils.peaks import BASE_BLOCK, MIN_LEVEL_BLOCKS, PeakBuilder, PeakPyramid, block_peaks, sidecar_path
+
+
+def _noise(frames, channels=1, seed=0):
+    return np.random.default_rng(seed).integers(-30000, 30000, (frames, channels)).astype(np.int16)
+
+
+def test_block_peaks_match_brute_force():
+    samples = _noise(BASE_BLOCK * 5 + 17, channels=2)
+    peaks = block_peaks(samples)
+    assert peaks.shape == (6, 2)
+    for index, row in enumerate(peaks):
+        block = samples[index * BASE_BLOCK:(index + 1) * BASE_BLOCK]
+        assert tuple(row) == (block.min(), block.max())
+
+
+def test_block_peaks_rescale_8_bit_samples():
+    # Signed, the way pydub decodes 8-bit audio
+    samples = np.array([[-128], [127]], np.int8)
+    assert tuple(block_peaks(samples, sample_width=1)[0]) == (-32768, 127 << 8)
+
+
+def test_block_peaks_of_less_than_a_block():
+    samples = _noise(3, channels=2)
+    assert tuple(block_peaks(samples)[0]) == (samples.min(), samples.max())
+
+
+def test_each_level_halves_the_previous():
+    pyramid = PeakPyramid.from_samples(_noise(BASE_BLOCK * 100), 8000)
+    lengths = [len(level) for level in pyramid.levels]
+    assert lengths[0] == 100
+    assert lengths[-1] <= MIN_LEVEL_BLOCKS
+    assert all(later == -(-earlier // 2) for earlier, later in zip(lengths, lengths[1:]))
+    for fine, coarse in zip(pyramid.levels, pyramid.levels[1:]):
+        assert fine[:, 0].min() == coarse[:, 0].min()
+        assert fine[:, 1].max() == coarse[:, 1].max()
+
+
+def test_minmax_matches_samples_per_column():
+    samples = _noise(BASE_BLOCK * 1024)
+    pyramid = PeakPyramid.from_samples(samples, 8000)
+    columns = pyramid.minmax(64)
+    expected = samples.reshape(64, -1)
+    np.testing.assert_array_equal(columns[:, 0], expected.min(axis=1) / 32768.0)
+    np.testing.assert_array_equal(columns[:, 1], expected.max(axis=1) / 32768.0)
+
+
+def test_minmax_of_a_range():
+    samples = _noise(BASE_BLOCK * 64)
+    pyramid = PeakPyramid.from_samples(samples, 8000)
+    start, end = BASE_BLOCK * 8, BASE_BLOCK * 24
+    columns = pyramid.minmax(4, start, end)
+    expected = samples[start:end].reshape(4, -1)
+    np.testing.assert_array_equal(columns[:, 1], expected.max(axis=1) / 32768.0)
+
+
+def test_minmax_of_nothing():
+    pyramid = PeakPyramid.from_samples(np.zeros((0, 1), np.int16), 8000)
+    assert pyramid.minmax(10).shape == (10, 2)
+    assert not pyramid.minmax(10).any()
+    assert pyramid.minmax(0).shape == (0, 2)
+
+
+def test_streamed_pyramid_matches_in_memory_one(tmp_path, write_wav):
+    samples = _noise(BASE_BLOCK * 40 + 3, channels=2)
+    source = write_wav(tmp_path / "a.wav", samples)
+    builder = PeakBuilder()
+    stream = analyze(source, builder, block_frames=BASE_BLOCK * 4)
+    streamed = builder.result(stream.frame_rate)
+    expected = PeakPyramid.from_samples(samples, 8000)
+    assert streamed.frames == expected.frames
+    for level, other in zip(streamed.levels, expected.levels):
+        np.testing.assert_array_equal(level, other)
+
+
+def test_sidecar_is_only_valid_for_the_same_source_version(tmp_path, write_wav):
+    source = write_wav(tmp_path / "a.wav", _noise(BASE_BLOCK * 40))
+    pyramid = PeakPyramid.from_samples(_noise(BASE_BLOCK * 40), 8000)
+    path = sidecar_path(source)
+    stat = os.stat(source)
+    pyramid.save(path, stat)
+
+    loaded = PeakPyramid.load(path, stat)
+    for level, other in zip(loaded.levels, pyramid.levels):
+        np.testing.assert_array_equal(level, other)
+
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert PeakPyramid.load(path, os.stat(source)) is None
+
+    with open(path, 'r+b') as f:
+        f.truncate(10)
+    assert PeakPyramid.load(path, stat) is None
+
+
+@pytest.fixture
+def processor(monkeypatch):
+    """AudioProcessor with empty in-memory caches and no PCM cache"""
+    monkeypatch.setattr(AudioProcessor, 'pcm_cache', None)
+    monkeypatch.setattr(AudioProcessor, 'decode_cache', DecodeCache())
+    monkeypatch.setattr(AudioProcessor, 'peak_cache', DecodeCache())
+    return AudioProcessor
+
+
+def test_get_peaks_writes_and_refreshes_the_sidecar(processor, tmp_path, write_wav):
+    source = write_wav(tmp_path / "a.wav", np.full((BASE_BLOCK * 8, 1), 1000, np.int16))
+    assert processor.get_peaks(source).minmax(1)[0, 1] == pytest.approx(1000 / 32768)
+    assert os.path.exists(sidecar_path(source))
+
+    stat = os.stat(source)
+    write_wav(source, np.full((BASE_BLOCK * 8, 1), 2000, np.int16))
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert processor.get_peaks(source).minmax(1)[0, 1] == pytest.approx(2000 / 32768)
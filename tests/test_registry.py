@@ -0,0 +1,51 @@
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+from services import registry as registry_module
+from services.registry import ServiceRegistry, register_provider
+
+ROOT = Path(__file__).parent.parent
+
+
+def test_provider_module_is_imported_on_first_use(tmp_path, monkeypatch):
+    (tmp_path / "lazy_provider.py").write_text(textwrap.dedent("""
+        class LazyService:
+            def __init__(self, greeting='hi'):
+                self.greeting = greeting
+    """))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, 'lazy_provider', raising=False)
+    # Registered into a copy of the table, so the provider is gone after the test
+    monkeypatch.setattr(registry_module, '_providers', dict(registry_module._providers))
+    register_provider('lazy', 'lazy_provider:LazyService', streaming=False)
+
+    registry = ServiceRegistry(options={'lazy': {'greeting': 'hello'}})
+    assert 'lazy' in registry
+    assert not registry.supports_streaming('lazy')
+    assert 'lazy_provider' not in sys.modules
+    assert not registry.is_loaded('lazy')
+
+    service = registry['lazy']
+    assert 'lazy_provider' in sys.modules
+    assert service.greeting == 'hello'
+    assert registry['lazy'] is service
+    monkeypatch.delitem(sys.modules, 'lazy_provider')
+
+
+def test_starting_the_manager_imports_no_provider_library(tmp_path):
+    script = textwrap.dedent(f"""
+        import sys
+        from services.tts_manager import TTSManager
+        manager = TTSManager({{'audio_dir': {str(tmp_path / 'audios')!r}, 'cache_dir': {str(tmp_path / 'cache')!r},
+                              'audio_store': {{'sweep_interval_sec': 0}}}})
+        names = list(manager.services)
+        loaded = [name for name in ('gtts', 'edge_tts', 'pyttsx3', 'services.gtts_service',
+                                    'services.edge_tts_service', 'services.pyttsx3_service') if name in sys.modules]
+        manager.shutdown()
+        print(sorted(names), loaded)
+    """)
+    output = subprocess.run([sys.executable, '-c', script], cwd=ROOT, capture_output=True, text=True,
+                            check=True).stdout
+    assert output.strip().splitlines()[-1] == "['edge_tts', 'gtts', 'pyttsx3'] []"
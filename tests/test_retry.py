@@ -0,0 +1,203 @@
+import io
+import os
+import time
+
+import pytest
+
+from utils.cancellation import CancelToken, OperationCancelled
+from utils.retry import (PERMANENT, RATE_LIMITED, TRANSIENT, LatencyTracker, RetryPolicy, call_with_retry,
+                         classify_error)
+
+GTTS_VOICE = 'en-US'
+NO_DELAY = RetryPolicy(max_attempts=3, base_delay=0, rate_limit_delay=0)
+
+
+class Response:
+    """Like requests.Response, false for error statuses"""
+
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+    def __bool__(self):
+        return self.status_code < 400
+
+
+class ProviderError(Exception):
+    """Shaped like gTTSError: the HTTP response, if any, is in rsp"""
+
+    def __init__(self, status=None):
+        super().__init__(f"status {status}")
+        self.rsp = Response(status) if status is not None else None
+
+
+class ReadTimeout(Exception):
+    pass
+
+
+class Flaky:
+    """Raises the given errors in turn, then returns 'ok'"""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return 'ok'
+
+
+@pytest.mark.parametrize('error, kind', [
+    (ProviderError(429), RATE_LIMITED),
+    (ProviderError(503), TRANSIENT),
+    (ProviderError(408), TRANSIENT),
+    (ProviderError(400), PERMANENT),
+    (ProviderError(), TRANSIENT),  # No response: the connection failed
+    (ConnectionResetError(), TRANSIENT),
+    (TimeoutError(), TRANSIENT),
+    (ReadTimeout(), TRANSIENT),
+    (ValueError("bad voice"), PERMANENT),
+])
+def test_classify_error(error, kind):
+    assert classify_error(error) == kind
+
+
+def test_transient_errors_are_retried():
+    fn = Flaky(ProviderError(503), ProviderError(429))
+    assert call_with_retry(fn, NO_DELAY) == 'ok'
+    assert fn.calls == 3
+
+
+def test_permanent_error_is_raised_at_once():
+    fn = Flaky(ProviderError(400))
+    with pytest.raises(ProviderError):
+        call_with_retry(fn, NO_DELAY)
+    assert fn.calls == 1
+
+
+def test_last_error_is_raised_after_max_attempts():
+    fn = Flaky(*(ProviderError(503) for _ in range(5)))
+    with pytest.raises(ProviderError):
+        call_with_retry(fn, NO_DELAY)
+    assert fn.calls == 3
+
+
+def test_should_retry_can_veto():
+    fn = Flaky(ProviderError(503))
+    with pytest.raises(ProviderError):
+        call_with_retry(fn, NO_DELAY, should_retry=lambda e: False)
+    assert fn.calls == 1
+
+
+def test_cancel_ends_the_backoff():
+    token = CancelToken()
+    token.cancel()
+    fn = Flaky(ProviderError(503))
+    started = time.monotonic()
+    with pytest.raises(OperationCancelled):
+        call_with_retry(fn, RetryPolicy(base_delay=30, max_delay=30), cancel_token=token)
+    assert time.monotonic() - started < 5
+
+
+def test_delay_is_capped_and_rate_limits_wait_longer():
+    policy = RetryPolicy(base_delay=1, max_delay=4, rate_limit_delay=100)
+    for _ in range(50):
+        assert 0 <= policy.delay(1, TRANSIENT) <= 1
+        assert 0 <= policy.delay(10, TRANSIENT) <= 4
+        assert 0 <= policy.delay(1, RATE_LIMITED) <= 4
+
+
+def test_from_config_ignores_unknown_keys(capsys):
+    policy = RetryPolicy.from_config({'max_attempts': 5, 'jitter': True})
+    assert policy.max_attempts == 5
+    assert "jitter" in capsys.readouterr().out
+    assert RetryPolicy.from_config(None).max_attempts == 3
+
+
+def test_latency_tracker_needs_enough_samples():
+    tracker = LatencyTracker(size=100, min_samples=10)
+    for value in range(9):
+        tracker.record(value)
+    assert tracker.percentile(0.95) is None
+    tracker.record(9)
+    assert tracker.percentile(0.5) == 5
+    assert tracker.percentile(0.95) == 9
+
+
+def test_provider_errors_are_retried_up_to_the_limit(tts_manager, fake_providers):
+    tts_manager.retry_policy = NO_DELAY
+    fake_providers.error_rate = 1.0
+    with pytest.raises(Exception) as info:
+        tts_manager.generate_audio("Always failing", 'gtts', GTTS_VOICE)
+    assert classify_error(info.value) == TRANSIENT
+    assert fake_providers.counts['gtts_requests'] == 3
+
+
+def test_slow_request_is_hedged(tts_manager, fake_providers):
+    tts_manager.config['streaming_enabled'] = False  # The non-streaming path
+    tts_manager.hedging_enabled = True
+    for _ in range(20):
+        tts_manager._latency('gtts').record(0.01)
+    fake_providers.latency = 0.3
+
+    path = tts_manager.generate_audio("Hedged request", 'gtts', GTTS_VOICE)
+
+    assert os.path.getsize(path) > 0
+    assert tts_manager.get_queue_stats()['hedging']['sent'] == 1
+    assert fake_providers.counts['gtts_requests'] == 2
+
+
+def test_slow_stream_is_hedged_until_its_first_chunk(tts_manager, fake_providers):
+    # Default config: gtts streams
+    tts_manager.hedging_enabled = True
+    tracker = tts_manager._latency('gtts', first_audio=True)
+    for _ in range(19):
+        tracker.record(0.01)
+    fake_providers.latency = 0.01
+    tts_manager.generate_audio_streaming("Warm up", 'gtts', GTTS_VOICE)
+    assert tracker.percentile(0.95) is not None  # The stream's time to first audio was recorded
+    assert tts_manager.get_queue_stats()['hedging']['sent'] == 0
+
+    fake_providers.latency = 0.3
+    chunks = []
+    path = tts_manager.generate_audio_streaming("Hedged stream", 'gtts', GTTS_VOICE, chunk_callback=chunks.append)
+
+    assert tts_manager.get_queue_stats()['hedging']['sent'] == 1
+    assert fake_providers.counts['gtts_requests'] == 3
+    # Only the winner streamed, and its file holds exactly what was streamed
+    with open(path, 'rb') as f:
+        assert f.read() == b"".join(chunks)
+    deadline = time.monotonic() + 5
+    while len(list(tts_manager.output_dir.glob("*.mp3"))) > 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(list(tts_manager.output_dir.glob("*.mp3"))) == 2  # Warm-up and winner; the loser was removed
+
+
+def test_later_gtts_segment_is_retried_on_its_own(fake_providers, monkeypatch):
+    from gtts.tts import gTTSError
+    from services.gtts_service import GTTSService
+
+    service = GTTSService(segment_concurrency=1, retry_policy=NO_DELAY)
+    original = GTTSService._request_segment
+    calls = []
+
+    def flaky(self, session, tts, prepared_request):
+        calls.append(prepared_request)
+        if len(calls) == 2:
+            raise gTTSError(tts=tts)  # No response: a dropped connection
+        return original(self, session, tts, prepared_request)
+
+    monkeypatch.setattr(GTTSService, '_request_segment', flaky)
+    text = " ".join(f"Sentence number {n} is long enough that the text needs several segments." for n in range(3))
+    chunks = []
+    try:
+        output = service.synthesize_streaming(text, io.BytesIO(), GTTS_VOICE, chunk_callback=chunks.append)
+    finally:
+        service.close()
+
+    # The failed segment was sent again and the others only once
+    assert len(chunks) >= 2
+    assert len(calls) == len(chunks) + 1
+    assert calls[1] is calls[2]
+    assert output.getvalue() == b"".join(chunks)
@@ -0,0 +1,148 @@
+import threading
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+import pytest
+
+from utils.scheduler import ProviderScheduler, TokenBucket
+
+
+@pytest.fixture
+def executor():
+    executor = ThreadPoolExecutor(max_workers=8)
+    yield executor
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _scheduler(executor, **limits):
+    return ProviderScheduler(executor, {'fake': limits})
+
+
+def _blocker(scheduler):
+    """Occupy the provider's only slot until the returned event is set"""
+    release = threading.Event()
+    started = threading.Event()
+
+    def block():
+        started.set()
+        release.wait(5)
+
+    job = scheduler.submit('fake', block)
+    assert started.wait(5)
+    return job, release
+
+
+def test_token_bucket_allows_burst_then_paces():
+    bucket = TokenBucket(rate=10, burst=2)
+    now = time.monotonic()
+    assert bucket.try_acquire(now) == 0.0
+    assert bucket.try_acquire(now) == 0.0
+    assert bucket.try_acquire(now) == pytest.approx(0.1)
+    assert bucket.try_acquire(now + 0.05) == pytest.approx(0.05)
+    assert bucket.try_acquire(now + 0.11) == 0.0
+
+
+def test_token_bucket_never_exceeds_capacity():
+    bucket = TokenBucket(rate=10, burst=1)
+    now = time.monotonic()
+    assert bucket.try_acquire(now + 100) == 0.0
+    assert bucket.try_acquire(now + 100) > 0
+
+
+def test_interactive_jobs_run_before_queued_batch_jobs(executor):
+    scheduler = _scheduler(executor, max_concurrency=1)
+    order = []
+    _, release = _blocker(scheduler)
+    jobs = [
+        scheduler.submit('fake', order.append, 'batch-1', lane='batch'),
+        scheduler.submit('fake', order.append, 'batch-2', lane='batch'),
+        scheduler.submit('fake', order.append, 'interactive', lane='interactive'),
+    ]
+    release.set()
+    for job in jobs:
+        job.future.result(5)
+    assert order == ['interactive', 'batch-1', 'batch-2']
+    scheduler.shutdown()
+
+
+def test_concurrency_limit_is_respected(executor):
+    scheduler = _scheduler(executor, max_concurrency=2)
+    lock = threading.Lock()
+    running = [0]
+    peak = [0]
+
+    def work():
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.02)
+        with lock:
+            running[0] -= 1
+
+    jobs = [scheduler.submit('fake', work) for _ in range(8)]
+    for job in jobs:
+        job.future.result(5)
+    assert peak[0] == 2
+    assert scheduler.stats()['fake']['completed'] == 8
+    scheduler.shutdown()
+
+
+def test_rate_limit_spaces_out_dispatches(executor):
+    scheduler = _scheduler(executor, rate_per_sec=50, burst=1)
+    started = time.monotonic()
+    jobs = [scheduler.submit('fake', time.monotonic) for _ in range(5)]
+    times = [job.future.result(5) for job in jobs]
+    # One token up front, then one every 20 ms
+    assert times[-1] - started >= 0.07
+    assert scheduler.stats()['fake']['throttled'] >= 1
+    scheduler.shutdown()
+
+
+def test_cancelled_job_leaves_the_queue(executor):
+    scheduler = _scheduler(executor, max_concurrency=1)
+    blocker, release = _blocker(scheduler)
+    job = scheduler.submit('fake', lambda: 'never')
+    assert scheduler.stats()['fake']['queued']['interactive'] == 1
+
+    assert job.cancel()
+    assert scheduler.stats()['fake']['queued']['interactive'] == 0
+    release.set()
+    blocker.future.result(5)
+    with pytest.raises(CancelledError):
+        job.future.result(5)
+    scheduler.shutdown()
+
+
+def test_reprioritize_moves_a_batch_job_ahead(executor):
+    scheduler = _scheduler(executor, max_concurrency=1)
+    order = []
+    _, release = _blocker(scheduler)
+    first = scheduler.submit('fake', order.append, 'first', lane='batch')
+    promoted = scheduler.submit('fake', order.append, 'promoted', lane='batch')
+
+    assert scheduler.reprioritize(promoted, 'interactive')
+    assert not scheduler.reprioritize(promoted, 'batch')  # Never demoted
+    assert scheduler.stats()['fake']['queued'] == {'interactive': 1, 'batch': 1}
+
+    release.set()
+    first.future.result(5)
+    assert order == ['promoted', 'first']
+    scheduler.shutdown()
+
+
+def test_shutdown_cancels_queued_jobs(executor):
+    scheduler = _scheduler(executor, max_concurrency=1)
+    _, release = _blocker(scheduler)
+    job = scheduler.submit('fake', lambda: None)
+    scheduler.shutdown()
+    release.set()
+    assert job.future.cancelled()
+    with pytest.raises(RuntimeError):
+        scheduler.submit('fake', lambda: None)
+
+
+def test_unknown_lane_is_rejected(executor):
+    scheduler = _scheduler(executor)
+    with pytest.raises(ValueError):
+        scheduler.submit('fake', lambda: None, lane='urgent')
+    scheduler.shutdown()
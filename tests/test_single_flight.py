@@ -0,0 +1,201 @@
+import threading
+import time
+from concurrent.futures import CancelledError, Future
+
+import pytest
+
+from utils.single_flight import SingleFlight
+
+EDGE_VOICE = 'en-US-JennyNeural'
+GTTS_VOICE = 'en-US'
+
+
+class FakeJob:
+    """start() for SingleFlight.join that records how often it ran and whether it was cancelled"""
+
+    def __init__(self):
+        self.started = 0
+        self.cancelled = 0
+        self.flight = None
+
+    def __call__(self, flight):
+        self.started += 1
+        self.flight = flight
+        return self.cancel
+
+    def cancel(self):
+        self.cancelled += 1
+
+
+def test_identical_requests_share_one_job():
+    group = SingleFlight()
+    job = FakeJob()
+    first = group.join('key', job)
+    second = group.join('key', job)
+
+    assert job.started == 1
+    assert group.coalesced == 1
+    assert group.in_flight() == 1
+
+    job.flight.resolve('audio.mp3')
+    assert first.result(1) == 'audio.mp3'
+    assert second.result(1) == 'audio.mp3'
+    assert group.in_flight() == 0
+
+
+def test_failure_reaches_every_caller():
+    group = SingleFlight()
+    job = FakeJob()
+    tickets = [group.join('key', job) for _ in range(3)]
+    job.flight.fail(RuntimeError("provider down"))
+    for ticket in tickets:
+        with pytest.raises(RuntimeError, match="provider down"):
+            ticket.result(1)
+
+
+def test_job_is_cancelled_only_with_the_last_caller():
+    group = SingleFlight()
+    job = FakeJob()
+    first = group.join('key', job)
+    second = group.join('key', job)
+
+    assert first.cancel() is False
+    assert job.cancelled == 0
+    with pytest.raises(CancelledError):
+        first.result(1)
+    assert not second.done()
+
+    assert second.cancel() is True
+    assert job.cancelled == 1
+    assert job.flight.future.cancelled()
+    # Cancelling twice doesn't release another waiter
+    assert second.cancel() is False
+
+
+def test_new_request_after_cancel_starts_a_fresh_job():
+    group = SingleFlight()
+    job = FakeJob()
+    group.join('key', job).cancel()
+    group.join('key', job)
+    assert job.started == 2
+    assert group.coalesced == 0
+
+
+def test_late_listener_gets_the_backlog_then_live_chunks():
+    group = SingleFlight()
+    job = FakeJob()
+    early, late = [], []
+    group.join('key', job, early.append)
+    job.flight.publish(b'one')
+    job.flight.publish(b'two')
+
+    group.join('key', job, late.append)
+    job.flight.publish(b'three')
+
+    assert early == [b'one', b'two', b'three']
+    assert late == [b'one', b'two', b'three']
+
+
+def test_cancelled_listener_stops_receiving():
+    group = SingleFlight()
+    job = FakeJob()
+    kept, dropped = [], []
+    group.join('key', job, kept.append)
+    ticket = group.join('key', job, dropped.append)
+    job.flight.publish(b'one')
+    ticket.cancel()
+    job.flight.publish(b'two')
+
+    assert kept == [b'one', b'two']
+    assert dropped == [b'one']
+
+
+def test_start_error_fails_the_flight():
+    group = SingleFlight()
+
+    def start(flight):
+        raise ValueError("bad request")
+
+    ticket = group.join('key', start)
+    with pytest.raises(ValueError):
+        ticket.result(1)
+    assert group.in_flight() == 0
+
+
+def test_concurrent_streaming_requests_make_one_provider_call(tts_manager, fake_providers):
+    text = "Coalesced streaming request"
+    chunks = [[], []]
+    results = [None, None]
+
+    def request(index):
+        results[index] = tts_manager.generate_audio_streaming(
+            text, 'edge_tts', EDGE_VOICE, chunk_callback=chunks[index].append
+        )
+
+    threads = [threading.Thread(target=request, args=(index,)) for index in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+
+    assert fake_providers.counts['edge_sessions'] == 1
+    assert results[0] == results[1]
+    assert chunks[0] and b''.join(chunks[0]) == b''.join(chunks[1])
+
+
+def test_each_caller_converts_the_shared_result():
+    group = SingleFlight()
+    job = FakeJob()
+    later = Future()
+    plain = group.join('key', job)
+    doubled = group.join('key', job, convert=lambda result: result * 2)
+    deferred = group.join('key', job, convert=lambda result: later)
+
+    job.flight.resolve(21)
+    assert (plain.result(1), doubled.result(1)) == (21, 42)
+    assert not deferred.done()
+    later.set_result('written')
+    assert deferred.result(1) == 'written'
+    assert job.started == 1
+
+
+def _race(first, second, fake_providers):
+    """Run first() and, once its job is in flight, second(); returns both results"""
+    fake_providers.latency = 0.3
+    results = {}
+    thread = threading.Thread(target=lambda: results.setdefault('first', first()))
+    thread.start()
+    time.sleep(0.1)
+    results['second'] = second()
+    thread.join(10)
+    return results['first'], results['second']
+
+
+@pytest.mark.parametrize('memory_first', [True, False])
+def test_path_and_memory_requests_share_one_provider_call(tts_manager, fake_providers, memory_first):
+    text = "Shared between the path and memory APIs"
+    memory = lambda: tts_manager.generate_audio_memory(text, 'gtts', GTTS_VOICE, persist=False)
+    path = lambda: tts_manager.generate_audio(text, 'gtts', GTTS_VOICE)
+    if memory_first:
+        audio, output_path = _race(memory, path, fake_providers)
+    else:
+        output_path, audio = _race(path, memory, fake_providers)
+
+    assert fake_providers.counts['gtts_requests'] == 1
+    assert tts_manager.get_queue_stats()['jobs']['coalesced'] == 1
+    # persist=False only means the memory caller doesn't need a file; the path caller still gets one
+    with open(output_path, 'rb') as f:
+        assert f.read() == audio.data
+
+
+def test_requests_differing_only_in_persist_share_one_provider_call(tts_manager, fake_providers):
+    text = "Persisted for the second caller"
+    transient, persisted = _race(
+        lambda: tts_manager.generate_audio_memory(text, 'edge_tts', EDGE_VOICE, persist=False),
+        lambda: tts_manager.generate_audio_memory(text, 'edge_tts', EDGE_VOICE),
+        fake_providers
+    )
+    assert fake_providers.counts['edge_sessions'] == 1
+    assert transient.wait_persisted(5) is None
+    with open(persisted.wait_persisted(5), 'rb') as f:
+        assert f.read() == transient.data
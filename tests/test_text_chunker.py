@@ -0,0 +1,43 @@
+import pytest
+
+from utils.text_chunker import split_text
+
+
+@pytest.mark.parametrize('text, max_chars, expected', [
+    ("", 50, []),
+    (None, 50, []),
+    ("  \n\n  ", 50, []),
+    ("Short text.", 50, ["Short text."]),
+    # Sentences are packed greedily up to max_chars
+    ("One two. Three four. Five six.", 20, ["One two. Three four.", "Five six."]),
+    ("First one! Second one? Third; fourth.", 22, ["First one! Second one?", "Third; fourth."]),
+    # Closing quotes and brackets stay with their sentence
+    ('He said "stop." Then (he left.) Done.', 16, ['He said "stop."', "Then (he left.)", "Done."]),
+    # A chunk never spans a paragraph break, and whitespace is collapsed
+    ("Para one.\n\nPara   two\nstill two.", 100, ["Para one.", "Para two still two."]),
+    # CJK sentence ends
+    ("你好。 世界！ 再见。", 7, ["你好。 世界！", "再见。"]),
+    # A full stop not followed by whitespace doesn't end a sentence
+    ("Version 1.5 is out.", 19, ["Version 1.5 is out."]),
+])
+def test_split_at_sentence_boundaries(text, max_chars, expected):
+    assert split_text(text, max_chars) == expected
+
+
+@pytest.mark.parametrize('text, max_chars, expected', [
+    # An over-long sentence is split at clause breaks first
+    ("Alpha beta, gamma delta, epsilon.", 15, ["Alpha beta,", "gamma delta,", "epsilon."]),
+    # then at the last space before the limit
+    ("aaa bbb ccc ddd eee", 8, ["aaa bbb", "ccc ddd", "eee"]),
+    # and mid-word only when there is no space at all
+    ("abcdefghij", 4, ["abcd", "efgh", "ij"]),
+])
+def test_split_long_sentences(text, max_chars, expected):
+    assert split_text(text, max_chars) == expected
+
+
+def test_chunks_respect_the_limit_and_keep_every_word():
+    text = " ".join(f"Sentence {n} has a few words, and a clause." for n in range(200)) + " " + "x" * 900
+    chunks = split_text(text, 120)
+    assert all(0 < len(chunk) <= 120 for chunk in chunks)
+    assert "".join(" ".join(chunks).split()) == "".join(text.split())
@@ -0,0 +1,122 @@
+import asyncio
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+from tts_server import SynthesisServer
+
+GTTS_VOICE = 'en-US'
+
+
+def _run(tts_manager, scenario, **options):
+    """Run scenario(client, server) against a SynthesisServer for tts_manager"""
+    async def main():
+        server = SynthesisServer(tts_manager, **options)
+        async with TestClient(TestServer(server.make_app())) as client:
+            await scenario(client, server)
+
+    asyncio.run(main())
+
+
+async def _stop_workers(server):
+    """Keep submitted jobs queued"""
+    for task in server._workers:
+        task.cancel()
+    await asyncio.gather(*server._workers, return_exceptions=True)
+
+
+async def _wait_final(client, job_id):
+    for _ in range(500):
+        job = await (await client.get(f'/jobs/{job_id}')).json()
+        if job['status'] in ('done', 'error', 'cancelled'):
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+@pytest.mark.parametrize('body', [
+    {'text': ''},
+    {'text': 5},
+    {'text': "Hi", 'provider': 'nope'},
+    {'text': "Hi", 'provider': ['gtts']},
+    {'text': "Hi", 'priority': 'urgent'},
+    {'text': "Hi", 'voice': 5},
+    {'text': "Hi", 'rate': 'fast'},
+    {'text': "Hi", 'format': 'wma'},
+    ['not', 'an', 'object'],
+])
+def test_bad_parameters_are_rejected(tts_manager, body):
+    async def scenario(client, server):
+        response = await client.post('/jobs', json=body)
+        assert response.status == 400
+        assert 'error' in await response.json()
+        assert not server.jobs
+
+    _run(tts_manager, scenario)
+
+
+def test_job_runs_and_serves_its_audio(tts_manager):
+    async def scenario(client, server):
+        response = await client.post('/jobs', json={'text': "Served audio", 'voice': GTTS_VOICE})
+        assert response.status == 202
+        job = await _wait_final(client, (await response.json())['id'])
+        assert job['status'] == 'done'
+        audio = await client.get(f"/jobs/{job['id']}/audio")
+        assert audio.status == 200
+        assert len(await audio.read()) > 0
+
+    _run(tts_manager, scenario)
+
+
+def test_full_queue_returns_429(tts_manager):
+    async def scenario(client, server):
+        await _stop_workers(server)
+        assert (await client.post('/jobs', json={'text': "first"})).status == 202
+        response = await client.post('/jobs', json={'text': "second"})
+        assert response.status == 429
+        assert response.headers['Retry-After'] == '1'
+        assert len(server.jobs) == 1
+
+    _run(tts_manager, scenario, max_queue=1)
+
+
+def test_shutting_down_returns_503(tts_manager):
+    async def scenario(client, server):
+        await server._stop(None)
+        response = await client.post('/jobs', json={'text': "too late"})
+        assert response.status == 503
+
+    _run(tts_manager, scenario)
+
+
+def test_cancelled_job_is_skipped(tts_manager):
+    async def scenario(client, server):
+        await _stop_workers(server)
+        job_id = (await (await client.post('/jobs', json={'text': "never"})).json())['id']
+        response = await client.delete(f'/jobs/{job_id}')
+        assert response.status == 200
+        assert (await response.json())['status'] == 'cancelled'
+        assert server.jobs[job_id].cancel_token.cancelled
+        assert (await client.get(f'/jobs/{job_id}/audio')).status == 409
+        assert (await client.delete('/jobs/unknown')).status == 404
+
+    _run(tts_manager, scenario)
+
+
+def test_cancelling_a_running_job_stops_it(tts_manager, fake_providers):
+    fake_providers.latency = 2.0
+
+    async def scenario(client, server):
+        job_id = (await (await client.post('/jobs', json={'text': "slow", 'voice': GTTS_VOICE})).json())['id']
+        while server.jobs[job_id].status == 'queued':
+            await asyncio.sleep(0.01)
+        await client.delete(f'/jobs/{job_id}')
+        job = await _wait_final(client, job_id)
+        assert job['status'] == 'cancelled'
+        assert job['path'] is None
+        # The worker is free again
+        fake_providers.latency = 0.01
+        next_job = (await (await client.post('/jobs', json={'text': "next", 'voice': GTTS_VOICE})).json())['id']
+        assert (await _wait_final(client, next_job))['status'] == 'done'
+
+    _run(tts_manager, scenario, workers=1)
@@ -0,0 +1,99 @@
+import json
+import threading
+
+import pytest
+
+from utils.voice_cache import VoiceCatalogCache
+
+OLD = [{'id': 'a', 'name': "Voice A"}]
+NEW = [{'id': 'a', 'name': "Voice A"}, {'id': 'b', 'name': "Voice B"}]
+
+
+class FakeVoices:
+    """Service whose get_voices blocks until released and counts its calls"""
+
+    def __init__(self, voices):
+        self.voices = voices
+        self.calls = 0
+        self.release = threading.Event()
+        self.release.set()
+        self.fail = False
+
+    def get_voices(self, refresh=False):
+        self.calls += 1
+        assert self.release.wait(5)
+        if self.fail:
+            raise ConnectionError("catalog unavailable")
+        return self.voices
+
+
+@pytest.fixture
+def service(tts_manager):
+    fake = FakeVoices(OLD)
+    tts_manager.services['gtts'] = fake
+    return fake
+
+
+def test_catalog_round_trip_and_freshness(tmp_path):
+    cache = VoiceCatalogCache(tmp_path / "voices", ttl_seconds=60)
+    assert cache.load('gtts') == (None, None)
+    cache.save('gtts', OLD)
+    voices, fetched_at = cache.load('gtts')
+    assert voices == OLD
+    assert cache.is_fresh(fetched_at)
+    assert not cache.is_fresh(fetched_at - 61)
+    assert not cache.is_fresh(None)
+    assert list((tmp_path / "voices").iterdir()) == [tmp_path / "voices" / "gtts.json"]
+
+
+def test_unreadable_catalog_is_ignored(tmp_path, capsys):
+    cache = VoiceCatalogCache(tmp_path)
+    (tmp_path / "gtts.json").write_text("{not json")
+    assert cache.load('gtts') == (None, None)
+    assert "Ignoring unreadable voice cache" in capsys.readouterr().out
+    (tmp_path / "edge_tts.json").write_text(json.dumps({'voices': OLD}))
+    assert cache.load('edge_tts') == (None, None)
+
+
+def test_first_request_fetches_then_the_fresh_catalog_is_used(tts_manager, service):
+    assert tts_manager.get_available_voices_cached('gtts') == {'gtts': OLD}
+    assert tts_manager.get_available_voices_cached('gtts') == {'gtts': OLD}
+    assert service.calls == 1
+    assert tts_manager.get_available_voices_cached('unknown') == {'unknown': []}
+
+
+def test_stale_catalog_is_served_while_it_refreshes(tts_manager, service):
+    tts_manager.voice_cache.save('gtts', OLD)
+    tts_manager.voice_cache.ttl_seconds = 0  # Everything is stale
+    service.voices = NEW
+    service.release.clear()
+    refreshed = []
+    done = threading.Event()
+
+    def on_refresh(voices):
+        refreshed.append(voices)
+        done.set()
+
+    # Both calls return at once with the stale list; only one refresh runs
+    assert tts_manager.get_available_voices_cached('gtts', on_refresh) == {'gtts': OLD}
+    assert tts_manager.get_available_voices_cached('gtts', on_refresh) == {'gtts': OLD}
+    service.release.set()
+    assert done.wait(5)
+    assert refreshed == [{'gtts': NEW}]
+    assert service.calls == 1
+    assert tts_manager.voice_cache.load('gtts')[0] == NEW
+
+
+def test_failed_refresh_keeps_the_stale_catalog(tts_manager, service):
+    tts_manager.voice_cache.save('gtts', OLD)
+    tts_manager.voice_cache.ttl_seconds = 0
+    service.fail = True
+    refreshed = []
+
+    assert tts_manager.get_available_voices_cached('gtts', refreshed.append) == {'gtts': OLD}
+    for thread in threading.enumerate():
+        if thread.name == 'gtts-voice-refresh':
+            thread.join(5)
+    assert service.calls == 1
+    assert refreshed == []
+    assert tts_manager.voice_cache.load('gtts')[0] == OLD
@@ -0,0 +1,126 @@
+import multiprocessing as mp
+import os
+import time
+
+import pytest
+
+pytest.importorskip('pyttsx3')
+
+from services.pyttsx3_service import Pyttsx3Service
+from utils.cancellation import OperationCancelled
+from utils.worker_pool import Pyttsx3WorkerPool
+
+# Workers must inherit the fake engine below, which only forked processes do
+pytestmark = pytest.mark.skipif(mp.get_start_method() != 'fork', reason="needs the fork start method")
+
+
+def _fake_synthesize(self, text, output_path, voice=None, rate=1.0, pitch=1.0):
+    """Stand-in engine: 'crash' kills the worker, once if a marker file is named after it"""
+    if text.startswith('crash'):
+        marker = text.partition(' ')[2]
+        if not marker or not os.path.exists(marker):
+            if marker:
+                open(marker, 'w').close()
+            os._exit(3)
+    if text == 'slow':
+        time.sleep(30)
+    with open(output_path, 'wb') as f:
+        f.write(text.encode())
+    return output_path
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(Pyttsx3Service, '__init__', lambda self: None)
+    monkeypatch.setattr(Pyttsx3Service, 'synthesize', _fake_synthesize)
+    pool = Pyttsx3WorkerPool(size=2)
+    yield pool
+    pool.shutdown()
+
+
+def _pids(pool):
+    return {worker.process.pid for worker in pool._workers if not worker.retiring}
+
+
+def test_jobs_run_on_warm_workers(pool, tmp_path):
+    futures = [pool.submit(f"job {index}", str(tmp_path / f"{index}.wav")) for index in range(20)]
+    for index, future in enumerate(futures):
+        assert open(future.result(10), 'rb').read() == f"job {index}".encode()
+    assert pool.stats()['workers'] == 2
+
+
+def test_crashed_job_is_retried_on_a_replacement_worker(pool, tmp_path):
+    pool.submit('warm', str(tmp_path / 'warm.wav')).result(10)
+    before = _pids(pool)
+    path = pool.submit(f"crash {tmp_path / 'crashed-once'}", str(tmp_path / 'a.wav')).result(10)
+    assert os.path.exists(path)
+    assert _pids(pool) != before
+
+
+def test_job_fails_after_repeated_crashes(pool, tmp_path):
+    with pytest.raises(RuntimeError, match="crashed"):
+        pool.submit('crash', str(tmp_path / 'a.wav')).result(10)
+    # The pool is back at full strength and still serves jobs
+    assert os.path.exists(pool.submit('after', str(tmp_path / 'b.wav')).result(10))
+    assert pool.stats()['workers'] == 2
+
+
+def test_cancelling_a_running_job_replaces_its_worker(pool, tmp_path):
+    pool.submit('warm', str(tmp_path / 'warm.wav')).result(10)
+    future = pool.submit('slow', str(tmp_path / 'slow.wav'))
+    deadline = time.time() + 10
+    while pool.stats()['busy'] == 0 and time.time() < deadline:
+        time.sleep(0.01)
+
+    assert pool.cancel(future)
+    with pytest.raises(OperationCancelled):
+        future.result(1)
+    assert os.path.exists(pool.submit('after', str(tmp_path / 'b.wav')).result(10))
+
+
+def test_shutdown_rejects_new_jobs(pool, tmp_path):
+    pool.shutdown()
+    with pytest.raises(RuntimeError):
+        pool.submit('late', str(tmp_path / 'a.wav'))
+
+
+class _Voice:
+    def __init__(self, voice_id):
+        self.id = voice_id
+
+
+class FakeEngine:
+    """pyttsx3 engine stand-in that writes the voice and rate it would have spoken with"""
+
+    def __init__(self):
+        self.properties = {'rate': 200, 'volume': 1.0, 'voice': 'default',
+                           'voices': [_Voice('default'), _Voice('other')]}
+        self._job = None
+
+    def getProperty(self, name):
+        return self.properties[name]
+
+    def setProperty(self, name, value):
+        self.properties[name] = value
+
+    def save_to_file(self, text, path):
+        self._job = path
+
+    def runAndWait(self):
+        with open(self._job, 'w') as f:
+            f.write(f"{self.properties['voice']} {self.properties['rate']}")
+
+
+def test_reused_engine_goes_back_to_the_default_voice(monkeypatch, tmp_path):
+    import pyttsx3
+    monkeypatch.setattr(pyttsx3, 'init', FakeEngine)
+    pool = Pyttsx3WorkerPool(size=1)
+    try:
+        jobs = [('other', 2.0), ('', 1.0), ('missing', 1.0)]
+        results = [
+            open(pool.submit("text", str(tmp_path / f"{index}.wav"), voice, rate).result(10)).read()
+            for index, (voice, rate) in enumerate(jobs)
+        ]
+    finally:
+        pool.shutdown()
+    assert results == ["other 400", "default 200", "default 200"]
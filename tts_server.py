@@ -0,0 +1,352 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web
+
+from services.tts_manager import TTSManager
+from utils.config_manager import ConfigManager
+from utils.scheduler import LANES
+from utils.cancellation import CancelToken
+from utils import audio_format, tracing
+
+STREAM_BLOCK_SIZE = 64 * 1024
+
+
+class SynthesisJob:
+    """State of one queued or running synthesis request"""
+
+    def __init__(self, params):
+        self.id = uuid.uuid4().hex
+        self.params = params
+        self.status = 'queued'  # queued -> running -> done | error | cancelled
+        self.path = None
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        # Audio received from streaming providers while the job is running
+        self.buffer = bytearray()
+        self.changed = asyncio.Event()
+        # Cancelled by DELETE /jobs/{id} to stop the provider work
+        self.cancel_token = CancelToken()
+
+    @property
+    def is_final(self):
+        return self.status in ('done', 'error', 'cancelled')
+
+    def notify(self):
+        """Wake every reader waiting for new audio or a status change"""
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'path': self.path,
+            'error': self.error,
+            'created': self.created,
+            'finished': self.finished,
+        }
+
+
+class SynthesisServer:
+    """HTTP front-end for TTSManager with a bounded job queue"""
+
+    def __init__(self, tts_manager, max_queue=100, workers=4, job_ttl=600):
+        self.tts_manager = tts_manager
+        self.max_queue = max_queue
+        self.worker_count = workers
+        self.job_ttl = job_ttl
+        self.jobs = {}
+        self.queue = None
+        self.accepting = False
+        self._workers = []
+        # Provider calls are blocking, run them off the event loop
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tts-server")
+
+    def make_app(self):
+        app = web.Application()
+        app.add_routes([
+            web.get('/health', self.handle_health),
+            web.post('/jobs', self.handle_submit),
+            web.get('/jobs/{job_id}', self.handle_status),
+            web.get('/jobs/{job_id}/audio', self.handle_audio),
+            web.delete('/jobs/{job_id}', self.handle_cancel),
+            web.post('/synthesize', self.handle_synthesize),
+        ])
+        app.on_startup.append(self._start)
+        app.on_cleanup.append(self._stop)
+        return app
+
+    # --- Lifecycle ---
+
+    async def _start(self, app):
+        self.queue = asyncio.Queue(maxsize=self.max_queue)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+        self.accepting = True
+
+    async def _stop(self, app):
+        self.accepting = False
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.tts_manager.shutdown()
+
+    # --- Queue processing ---
+
+    def _prune_jobs(self):
+        cutoff = time.time() - self.job_ttl
+        for job_id in [j.id for j in self.jobs.values() if j.is_final and j.finished < cutoff]:
+            job = self.jobs.pop(job_id)
+            if job.path:
+                self.tts_manager.audio_store.unpin(job.path)
+
+    def _enqueue(self, params):
+        """Create and queue a job; raises an HTTP error when the server is saturated"""
+        if not self.accepting:
+            raise web.HTTPServiceUnavailable(
+                text='{"error": "server is shutting down"}', content_type='application/json'
+            )
+        self._prune_jobs()
+        job = SynthesisJob(params)
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull as e:
+            raise web.HTTPTooManyRequests(
+                text='{"error": "synthesis queue is full"}',
+                content_type='application/json',
+                headers={'Retry-After': '1'}
+            ) from e
+        self.jobs[job.id] = job
+        return job
+
+    def _run_job(self, job, loop):
+        """Blocking synthesis, executed on the thread pool"""
+        tracing.record('server.queue', job.created, time.time(), job=job.id)
+        with tracing.span('server.job', job=job.id, provider=job.params['provider']):
+            return self._synthesize(job, loop)
+
+    def _synthesize(self, job, loop):
+        p = job.params
+
+        def on_chunk(data):
+            loop.call_soon_threadsafe(self._append_audio, job, data)
+
+        if self.tts_manager.supports_streaming(p['provider']) and not self.tts_manager.is_long_text(p['text']):
+            return self.tts_manager.generate_audio_streaming(
+                p['text'], p['provider'], p['voice'], p['rate'], p['pitch'],
+                chunk_callback=on_chunk, priority=p['priority'], cancel_token=job.cancel_token
+            )
+        if self.tts_manager.is_long_text(p['text']):
+            return self.tts_manager.generate_long_audio(
+                p['text'], p['provider'], p['voice'], p['rate'], p['pitch'], priority=p['priority'],
+                cancel_token=job.cancel_token
+            )
+        return self.tts_manager.generate_audio(
+            p['text'], p['provider'], p['voice'], p['rate'], p['pitch'], priority=p['priority'],
+            cancel_token=job.cancel_token
+        )
+
+    def _append_audio(self, job, data):
+        if job.status == 'running':
+            job.buffer.extend(data)
+            job.notify()
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self.queue.get()
+            try:
+                if job.status == 'cancelled':
+                    continue
+                job.status = 'running'
+                job.notify()
+                try:
+                    path = await loop.run_in_executor(self._executor, self._run_job, job, loop)
+                    if job.status == 'running':
+                        job.path = path
+                        job.status = 'done'
+                        # Keep the file until the job itself is pruned
+                        self.tts_manager.audio_store.pin(path)
+                except Exception as e:
+                    if job.status == 'running':
+                        job.error = str(e)
+                        job.status = 'error'
+                job.finished = time.time()
+                # Readers continue from the finished file, the live buffer is no longer needed
+                job.buffer = bytearray()
+                job.notify()
+            finally:
+                self.queue.task_done()
+
+    # --- Handlers ---
+
+    async def _read_params(self, request):
+        try:
+            body = await request.json()
+        except ValueError as e:
+            raise web.HTTPBadRequest(text='{"error": "body must be JSON"}', content_type='application/json') from e
+        if not isinstance(body, dict):
+            raise web.HTTPBadRequest(text='{"error": "body must be a JSON object"}', content_type='application/json')
+        text = body.get('text')
+        text = text.strip() if isinstance(text, str) else ''
+        provider = body.get('provider') or 'gtts'
+        priority = body.get('priority') or 'interactive'
+        voice = body.get('voice') or ''
+        if not text:
+            raise web.HTTPBadRequest(text='{"error": "text is required"}', content_type='application/json')
+        if not isinstance(provider, str) or provider not in self.tts_manager.services:
+            raise web.HTTPBadRequest(
+                text=json.dumps({'error': f"unknown provider {provider}"}), content_type='application/json'
+            )
+        if not isinstance(priority, str) or priority not in LANES:
+            raise web.HTTPBadRequest(
+                text=f'{{"error": "priority must be one of {", ".join(LANES)}"}}', content_type='application/json'
+            )
+        if not isinstance(voice, str):
+            raise web.HTTPBadRequest(text='{"error": "voice must be a string"}', content_type='application/json')
+        self._check_format(body.get('format'))
+        try:
+            rate = float(body.get('rate', 1.0))
+            pitch = float(body.get('pitch', 1.0))
+        except (TypeError, ValueError) as e:
+            raise web.HTTPBadRequest(
+                text='{"error": "rate and pitch must be numbers"}', content_type='application/json'
+            ) from e
+        return {
+            'text': text,
+            'provider': provider,
+            'priority': priority,
+            'voice': voice,
+            'rate': rate,
+            'pitch': pitch,
+            'format': body.get('format'),
+        }
+
+    @staticmethod
+    def _check_format(fmt):
+        if fmt and (not isinstance(fmt, str) or fmt not in audio_format.FORMATS):
+            raise web.HTTPBadRequest(
+                text=f'{{"error": "format must be one of {", ".join(audio_format.FORMATS)}"}}',
+                content_type='application/json'
+            )
+
+    def _get_job(self, request):
+        job = self.jobs.get(request.match_info['job_id'])
+        if job is None:
+            raise web.HTTPNotFound(text='{"error": "unknown job"}', content_type='application/json')
+        return job
+
+    async def handle_health(self, request):
+        return web.json_response({
+            'accepting': self.accepting,
+            'queued': self.queue.qsize() if self.queue else 0,
+            'max_queue': self.max_queue,
+            'running': sum(1 for j in self.jobs.values() if j.status == 'running'),
+            'workers': self.worker_count,
+            'pools': self.tts_manager.get_queue_stats(),
+        })
+
+    async def handle_submit(self, request):
+        job = self._enqueue(await self._read_params(request))
+        return web.json_response(job.to_dict(), status=202)
+
+    async def handle_status(self, request):
+        return web.json_response(self._get_job(request).to_dict())
+
+    async def handle_cancel(self, request):
+        job = self._get_job(request)
+        if not job.is_final:
+            # Queued jobs are skipped by the workers; a running job's provider work is stopped
+            job.status = 'cancelled'
+            job.finished = time.time()
+            job.cancel_token.cancel()
+            job.notify()
+        return web.json_response(job.to_dict())
+
+    async def handle_audio(self, request):
+        return await self._stream_job(request, self._get_job(request))
+
+    async def handle_synthesize(self, request):
+        """Queue a job and stream its audio back in the same response"""
+        job = self._enqueue(await self._read_params(request))
+        return await self._stream_job(request, job)
+
+    async def _stream_job(self, request, job):
+        """Send a job's audio as it is produced, then the rest of the finished file.
+
+        When a format is requested (?format= or the job's "format") the audio
+        is sent once the job is done, transcoded if the stored file differs.
+        """
+        fmt = request.query.get('format') or job.params.get('format')
+        self._check_format(fmt)
+        response = None
+        offset = 0
+        while True:
+            changed = job.changed
+            if job.status in ('error', 'cancelled'):
+                if response is None:
+                    return web.json_response(job.to_dict(), status=409 if job.status == 'cancelled' else 500)
+                break  # Headers already sent, all we can do is end the stream
+
+            if job.status == 'running' and not fmt and len(job.buffer) > offset:
+                if response is None:
+                    response = await self._prepare_stream(request, job)
+                data = bytes(job.buffer[offset:])
+                offset += len(data)
+                await response.write(data)
+
+            if job.status == 'done':
+                path = job.path
+                if fmt:
+                    try:
+                        path = await asyncio.wrap_future(self.tts_manager.convert_audio(path, fmt))
+                    except Exception as e:
+                        return web.json_response({'id': job.id, 'error': f"conversion failed: {e}"}, status=500)
+                if response is None:
+                    response = await self._prepare_stream(request, job, path)
+                # Read whatever the live buffer didn't cover straight from the file
+                with open(path, 'rb') as f:
+                    f.seek(offset)
+                    for block in iter(lambda: f.read(STREAM_BLOCK_SIZE), b''):
+                        await response.write(block)
+                break
+
+            await changed.wait()
+
+        await response.write_eof()
+        return response
+
+    async def _prepare_stream(self, request, job, path=None):
+        # Audio streamed live comes straight from gTTS/Edge TTS, which send MP3
+        fmt = audio_format.detect_format(path) if path else 'mp3'
+        content_type = audio_format.mime_type(fmt)
+        response = web.StreamResponse(headers={'Content-Type': content_type, 'X-Job-Id': job.id})
+        await response.prepare(request)
+        return response
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run ChunTTS as a local HTTP synthesis service")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--config', default='config.json')
+    parser.add_argument('--workers', type=int, default=4, help="Jobs synthesized at the same time")
+    parser.add_argument('--max-queue', type=int, default=100, help="Queued jobs before returning 429")
+    parser.add_argument('--job-ttl', type=int, default=600, help="Seconds finished jobs stay queryable")
+    args = parser.parse_args()
+
+    tts_manager = TTSManager(ConfigManager(args.config))
+    server = SynthesisServer(tts_manager, max_queue=args.max_queue, workers=args.workers, job_ttl=args.job_ttl)
+    web.run_app(server.make_app(), host=args.host, port=args.port)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -21,10 +21,14 @@ class MainWindow(QMainWindow):
         self.tts_manager = tts_manager
         self.asset_manager = asset_manager
         self.current_audio_path = None
+        self.playing_path = None  # File pinned in the audio store while it is loaded in the player
         self.tts_worker = None
         self.voices_worker = None
         self.audio_worker = None
         self.theme_worker = None
+        self.playing_chunks = False  # Long-text chunks are already playing
+        self.playing_stream = False  # Streamed audio is already playing
+        self.playing_memory = False  # Audio is already playing from memory
         
         # Use theme from config or default to dark
         if hasattr(tts_manager, 'config'):
@@ -308,9 +312,13 @@ class MainWindow(QMainWindow):
             self.voices_worker.quit()
             self.voices_worker.wait()
 
+        # Start background engines early so the first generation doesn't pay for it
+        self.tts_manager.warm_up(provider)
+
         # Create and start new worker
         self.voices_worker = VoicesWorker(self.tts_manager, provider)
         self.voices_worker.finished.connect(self.on_voices_loaded)
+        self.voices_worker.refreshed.connect(self.on_voices_refreshed)
         self.voices_worker.error.connect(self.on_voices_error)
         self.voices_worker.start()
 
@@ -333,6 +341,21 @@ class MainWindow(QMainWindow):
             self.voice_combo.addItem("Error loading voices")
             self.voice_combo.setEnabled(False)
 
+    @pyqtSlot(dict)
+    def on_voices_refreshed(self, voices_data):
+        """Apply a background catalog refresh, keeping the selected voice"""
+        provider = self.provider_combo.currentText()
+        if provider not in voices_data:
+            # Refresh for a provider that is no longer selected
+            return
+        selected = self.voice_combo.currentData()
+        self.voice_combo.blockSignals(True)
+        self.on_voices_loaded(voices_data)
+        index = self.voice_combo.findData(selected)
+        if index >= 0:
+            self.voice_combo.setCurrentIndex(index)
+        self.voice_combo.blockSignals(False)
+
     @pyqtSlot(str)
     def on_voices_error(self, error_message):
         """Handle error in voice loading"""
@@ -436,8 +459,60 @@ class MainWindow(QMainWindow):
         )
         self.tts_worker.finished.connect(self.on_tts_finished)
         self.tts_worker.error.connect(self.on_tts_error)
+        self.tts_worker.progress.connect(self.on_tts_progress)
+        self.tts_worker.chunk_ready.connect(self.on_tts_chunk_ready)
+        self.tts_worker.audio_chunk.connect(self.on_tts_audio_chunk)
+        self.tts_worker.audio_ready.connect(self.on_tts_audio_ready)
+        self.tts_worker.persist_failed.connect(self.on_tts_persist_failed)
+        self.playing_chunks = False
+        self.playing_stream = False
+        self.playing_memory = False
         self.tts_worker.start()
 
+    @pyqtSlot(int)
+    def on_tts_progress(self, percent):
+        if self.sender() != self.tts_worker:
+            return
+        self.generate_button.setText(f"Generating... {percent}%")
+
+    @pyqtSlot(int, str)
+    def on_tts_chunk_ready(self, index, chunk_path):
+        """Start playing long texts as soon as their first chunk is rendered"""
+        if self.sender() != self.tts_worker:
+            return
+        if index == 0:
+            self.audio_player.stop()
+            self.audio_player.set_media(chunk_path)
+            self.audio_player.toggle_playback()
+            self.playing_chunks = True
+        elif self.playing_chunks:
+            self.audio_player.enqueue(chunk_path)
+
+    @pyqtSlot(bytes)
+    def on_tts_audio_chunk(self, data):
+        """Feed streamed audio to the player, starting playback on the first chunk"""
+        if self.sender() != self.tts_worker:
+            return
+        if not self.playing_stream:
+            self.audio_player.start_stream()
+            self.playing_stream = True
+        self.audio_player.append_stream(data)
+
+    @pyqtSlot(object)
+    def on_tts_audio_ready(self, audio):
+        """Play in-memory audio right away; on_tts_finished follows once it is on disk"""
+        if self.sender() != self.tts_worker:
+            return
+        if self.playing_stream:
+            # Already playing from the stream, which now has all of the audio
+            self.audio_player.finish_stream()
+            self.playing_stream = False
+        else:
+            self.audio_player.stop()
+            self.audio_player.set_media_data(audio.data, audio.format or "mp3")
+            self.audio_player.toggle_playback()
+        self.playing_memory = True
+
     @pyqtSlot(str)
     def on_tts_finished(self, audio_path):
         # Ensure the worker that finished is the current one
@@ -447,9 +522,21 @@ class MainWindow(QMainWindow):
 
         print(f"TTS finished successfully: {audio_path}")
         self.current_audio_path = audio_path
-        self.audio_player.stop() # Stop any previous playback just in case
-        self.audio_player.set_media(audio_path)
-        self.audio_player.toggle_playback() # Start new playback
+        self._set_playing(audio_path)
+        if self.playing_chunks:
+            # Chunks are already playing back to back, don't restart from the joined file
+            self.playing_chunks = False
+        elif self.playing_stream:
+            # Playback started from the stream, just let the player know it is complete
+            self.audio_player.finish_stream()
+            self.playing_stream = False
+        elif self.playing_memory:
+            # Playback already started from the in-memory audio
+            self.playing_memory = False
+        else:
+            self.audio_player.stop() # Stop any previous playback just in case
+            self.audio_player.set_media(audio_path)
+            self.audio_player.toggle_playback() # Start new playback
         self.download_button.setEnabled(True)
 
         # Add to history
@@ -459,11 +546,35 @@ class MainWindow(QMainWindow):
         if not hasattr(self.history_list, 'asset_manager') or self.history_list.asset_manager is None:
              self.history_list.asset_manager = self.asset_manager
         self.history_list.add_item(text_preview, audio_path, provider)
+        # History entries must stay playable, keep the sweeper away from them
+        self.tts_manager.audio_store.pin(audio_path)
 
         self.generate_button.setEnabled(True)
         self.generate_button.setText("Generate Speech")
         self.tts_worker = None # Clear worker reference
 
+    @pyqtSlot(str)
+    def on_tts_persist_failed(self, reason):
+        """In-memory audio is playing but has no file, so it can't be saved or added to the history"""
+        if self.sender() != self.tts_worker:
+            return
+        print(f"Generated audio could not be saved: {reason}")
+        self.playing_memory = False
+        self.current_audio_path = None
+        self.download_button.setEnabled(False)
+        self.generate_button.setEnabled(True)
+        self.generate_button.setText("Generate Speech")
+        self.tts_worker = None
+
+    def _set_playing(self, audio_path):
+        """Move the audio store pin for the player to audio_path"""
+        store = self.tts_manager.audio_store
+        if self.playing_path:
+            store.unpin(self.playing_path)
+        self.playing_path = audio_path
+        if audio_path:
+            store.pin(audio_path)
+
     @pyqtSlot(str)
     def on_tts_error(self, error_message):
         # Ensure the worker that errored is the current one
@@ -472,6 +583,12 @@ class MainWindow(QMainWindow):
              return
 
         print(f"TTS Error: {error_message}")
+        if self.playing_stream:
+            # Let the player drain whatever audio arrived before the failure
+            self.audio_player.finish_stream()
+            self.playing_stream = False
+        self.playing_chunks = False
+        self.playing_memory = False
         QMessageBox.critical(self, "TTS Error", f"Error generating speech: {error_message}")
         self.generate_button.setEnabled(True)
         self.generate_button.setText("Generate Speech")
@@ -492,7 +609,7 @@ class MainWindow(QMainWindow):
             self,
             "Save Audio File",
             default_filename,
-            "Audio Files (*.mp3 *.wav *.ogg);;All Files (*)"
+            "Audio Files (*.mp3 *.wav *.ogg *.opus *.flac);;All Files (*)"
         )
 
         if save_path:
@@ -504,7 +621,8 @@ class MainWindow(QMainWindow):
             self.audio_worker = AudioProcessorWorker(
                 "save",
                 source=self.current_audio_path,
-                destination=save_path
+                destination=save_path,
+                convert=self.tts_manager.convert_audio
             )
             self.audio_worker.finished.connect(self.on_download_finished)
             self.audio_worker.error.connect(self.on_download_error)
@@ -531,6 +649,7 @@ class MainWindow(QMainWindow):
         if audio_path and os.path.exists(audio_path):
             print(f"Playing from history: {audio_path}")
             self.current_audio_path = audio_path
+            self._set_playing(audio_path)
             self.audio_player.stop() # Stop any previous playback
             self.audio_player.set_media(audio_path)
             self.audio_player.toggle_playback() # Start playback
@@ -557,5 +676,6 @@ class MainWindow(QMainWindow):
                     print(f"Warning: Worker {type(worker).__name__} did not terminate gracefully.")
 
         self.audio_player.stop()
+        self.tts_manager.shutdown()
         print("Cleanup complete. Exiting.")
         event.accept()
@@ -3,12 +3,18 @@ import time
 import os
 import sys
 from pathlib import Path
+from utils import audio_format, tracing
+from utils.cancellation import CancelToken, OperationCancelled
 
 class TTSWorker(QThread):
     # Signals to communicate back to the main UI thread
     finished = pyqtSignal(str)  # Emits the path to the generated audio file
     error = pyqtSignal(str)     # Emits error message string
-    progress = pyqtSignal(int)  # Optional: for progress updates
+    progress = pyqtSignal(int)  # Percentage of long-text chunks completed
+    chunk_ready = pyqtSignal(int, str)  # (index, path) of long-text chunks, in text order
+    audio_chunk = pyqtSignal(bytes)  # Raw audio bytes from streaming providers
+    audio_ready = pyqtSignal(object)  # AudioBuffer to play before it has been written to disk
+    persist_failed = pyqtSignal(str)  # In-memory audio played but could not be saved, with the reason
 
     def __init__(self, tts_manager, text, provider, voice, rate, pitch):
         super().__init__()
@@ -20,48 +26,115 @@ class TTSWorker(QThread):
         self.pitch = pitch
         self.process_id = None
         self.cancelled = False
+        # Stops the provider work behind generate_audio*/generate_long_audio on cancel()
+        self.cancel_token = CancelToken()
 
     def run(self):
         """Execute the TTS generation using multiprocessing"""
+        with tracing.span('ui.tts_worker', provider=self.provider, chars=len(self.text)):
+            self._generate()
+
+    def _generate(self):
         try:
+            # Long texts are split into chunks that render in parallel
+            if self.tts_manager.is_long_text(self.text):
+                output_path = self.tts_manager.generate_long_audio(
+                    self.text, self.provider, self.voice, self.rate, self.pitch,
+                    progress_callback=self._on_chunk_progress,
+                    chunk_callback=self._on_chunk_ready,
+                    cancel_token=self.cancel_token
+                )
+                if not self.cancelled:
+                    self.finished.emit(output_path)
+            # Providers that synthesize into memory are played from the buffer, the file is written afterwards
+            elif self.tts_manager.supports_in_memory(self.provider):
+                audio = self.tts_manager.generate_audio_memory(
+                    self.text, self.provider, self.voice, self.rate, self.pitch,
+                    chunk_callback=self._on_audio_chunk,
+                    cancel_token=self.cancel_token
+                )
+                if self.cancelled:
+                    return
+                self.audio_ready.emit(audio)
+                # History and saving need the file; failing to write it doesn't undo the playback
+                try:
+                    output_path = audio.wait_persisted()
+                    reason = "the audio was not written to disk"
+                except Exception as e:
+                    output_path = None
+                    reason = str(e)
+                if self.cancelled:
+                    return
+                if isinstance(output_path, str):
+                    self.finished.emit(output_path)
+                else:
+                    self.persist_failed.emit(reason)
+            # Streaming providers hand over audio while it is still being synthesized
+            elif self.tts_manager.supports_streaming(self.provider):
+                output_path = self.tts_manager.generate_audio_streaming(
+                    self.text, self.provider, self.voice, self.rate, self.pitch,
+                    chunk_callback=self._on_audio_chunk,
+                    cancel_token=self.cancel_token
+                )
+                if not self.cancelled:
+                    self.finished.emit(output_path)
             # For CPU-intensive providers like pyttsx3, use multiprocessing
-            if self.provider == 'pyttsx3':
+            elif self.provider == 'pyttsx3':
                 # Start the process
                 self.process_id = self.tts_manager.generate_audio_mp(
                     self.text, self.provider, self.voice, self.rate, self.pitch
                 )
-                
-                # Poll for completion
-                while not self.cancelled:
-                    result = self.tts_manager.check_generation_status(self.process_id)
-                    
-                    if result['status'] == 'complete':
-                        self.finished.emit(result['path'])
-                        break
-                    elif result['status'] == 'error':
-                        self.error.emit(result['message'])
-                        break
-                    
-                    # Wait before checking again
-                    self.msleep(100)
+                if self.cancelled:
+                    # cancel() ran before the process id was set
+                    self.tts_manager.cancel_generation(self.process_id)
+                    return
+
+                # Wakes as soon as the job finishes, or when cancel() releases it
+                result = self.tts_manager.wait_for_generation(self.process_id)
+                if self.cancelled:
+                    return
+                if result['status'] == 'complete':
+                    self.finished.emit(result['path'])
+                elif result['status'] == 'error':
+                    self.error.emit(result['message'])
             else:
                 # For other providers, use the synchronous method
                 output_path = self.tts_manager.generate_audio(
-                    self.text, self.provider, self.voice, self.rate, self.pitch
+                    self.text, self.provider, self.voice, self.rate, self.pitch,
+                    cancel_token=self.cancel_token
                 )
-                self.finished.emit(output_path)
+                if not self.cancelled:
+                    self.finished.emit(output_path)
                 
+        except OperationCancelled:
+            print("TTS generation cancelled")
         except Exception as e:
             self.error.emit(f"Error generating audio: {str(e)}")
     
+    def _on_chunk_progress(self, done, total):
+        self.progress.emit(int(done * 100 / total))
+
+    def _on_chunk_ready(self, index, path):
+        if not self.cancelled:
+            self.chunk_ready.emit(index, path)
+
+    def _on_audio_chunk(self, data):
+        if not self.cancelled:
+            self.audio_chunk.emit(data)
+
     def cancel(self):
         """Cancel the operation if running"""
         self.cancelled = True
+        # Other requests for the same audio keep the job alive
+        self.cancel_token.cancel()
+        if self.process_id:
+            self.tts_manager.cancel_generation(self.process_id)
 
 
 class VoicesWorker(QThread):
     """Worker thread for loading voices asynchronously"""
     finished = pyqtSignal(dict)  # Emits dictionary of voices
+    refreshed = pyqtSignal(dict)  # Emits an updated dictionary after a background refresh
     error = pyqtSignal(str)      # Emits error message string
 
     def __init__(self, tts_manager, provider=None):
@@ -70,17 +143,22 @@ class VoicesWorker(QThread):
         self.provider = provider
 
     def run(self):
-        """Fetch voices using multiprocessing for slower providers"""
+        """Fetch voices, served from the on-disk catalog when possible"""
         try:
-            # Edge TTS is network-bound and can benefit from multiprocessing
-            if self.provider == 'edge_tts':
-                voices = self.tts_manager.get_available_voices_mp(self.provider)
-            else:
-                voices = self.tts_manager.get_available_voices(self.provider)
+            voices = self.tts_manager.get_available_voices_cached(
+                self.provider, on_refresh=self._on_refresh
+            )
             self.finished.emit(voices)
         except Exception as e:
             self.error.emit(f"Error loading voices: {str(e)}")
 
+    def _on_refresh(self, voices):
+        # Called from the manager's refresh thread, possibly after this worker finished
+        try:
+            self.refreshed.emit(voices)
+        except RuntimeError:
+            pass
+
 
 class AudioProcessorWorker(QThread):
     """Worker thread for audio file operations"""
@@ -101,8 +179,15 @@ class AudioProcessorWorker(QThread):
                 import shutil
                 source = self.kwargs.get("source")
                 destination = self.kwargs.get("destination")
-                shutil.copyfile(source, destination)
-                result = destination
+                # convert(source, fmt, destination) -> Future, e.g. TTSManager.convert_audio
+                convert = self.kwargs.get("convert")
+                wanted = audio_format.format_for_path(destination)
+                if convert and wanted and wanted != audio_format.detect_format(source):
+                    # Stored audio is often Opus; transcode to what the file name asks for
+                    result = convert(source, wanted, destination).result()
+                else:
+                    shutil.copyfile(source, destination)
+                    result = destination
             
             # Add more operations as needed
             
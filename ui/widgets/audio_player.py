@@ -2,10 +2,13 @@ from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
     QSlider, QLabel, QFrame
 )
-from PyQt6.QtCore import Qt, QUrl, pyqtSignal, pyqtSlot, QTimer
+from PyQt6.QtCore import Qt, QUrl, pyqtSignal, pyqtSlot, QTimer, QIODevice, QBuffer, QByteArray
 from PyQt6.QtMultimedia import QMediaPlayer, QAudioOutput
 from PyQt6.QtGui import QPainter, QColor, QPainterPath
 import numpy as np
+import time
+from collections import deque
+from utils import tracing
 
 class AudioVisualizerWidget(QWidget):
     def __init__(self, parent=None):
@@ -64,9 +67,50 @@ class AudioVisualizerWidget(QWidget):
             )
             painter.drawPath(path)
 
+class StreamingAudioBuffer(QIODevice):
+    """Sequential read-only device that grows as audio chunks arrive"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._data = bytearray()
+        self._pos = 0
+        self._finished = False
+        self.open(QIODevice.OpenModeFlag.ReadOnly)
+
+    def append(self, data):
+        self._data.extend(data)
+        self.readyRead.emit()
+
+    def finish(self):
+        """Mark the stream complete so the player sees the end of the media"""
+        self._finished = True
+        self.readyRead.emit()
+
+    def isSequential(self):
+        return True
+
+    def bytesAvailable(self):
+        return len(self._data) - self._pos + super().bytesAvailable()
+
+    def atEnd(self):
+        return self._finished and self._pos >= len(self._data)
+
+    def readData(self, maxlen):
+        chunk = bytes(self._data[self._pos:self._pos + maxlen])
+        self._pos += len(chunk)
+        return chunk
+
+    def writeData(self, data):
+        return -1
+
+
 class AudioPlayerWidget(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
+        self._queue = deque()  # Files to play back to back (long-text chunks)
+        self._load_started = None
+        self.stream_buffer = None  # Active StreamingAudioBuffer, if any
+        self.media_buffer = None  # QBuffer holding in-memory audio, if any
         self.setup_ui()
         self.setup_player()
 
@@ -126,17 +170,70 @@ class AudioPlayerWidget(QWidget):
         self.volume_slider.valueChanged.connect(self.set_volume)
         self.player.positionChanged.connect(self.position_changed)
         self.player.durationChanged.connect(self.duration_changed)
+        self.player.mediaStatusChanged.connect(self.media_status_changed)
 
         # Setup visualization update timer
         self.viz_timer = QTimer()
         self.viz_timer.timeout.connect(self.update_visualization)
         self.viz_timer.start(16)  # ~60 FPS
 
+    def start_stream(self, content_type="mp3"):
+        """Start playing from a buffer that is filled with append_stream()"""
+        self.stop()
+        self.media_buffer = None
+        self.stream_buffer = StreamingAudioBuffer(self)
+        # The URL only hints the container format to the backend
+        self.player.setSourceDevice(self.stream_buffer, QUrl(f"stream.{content_type}"))
+        self.audio_output.setVolume(self.volume_slider.value() / 100)
+        self.player.play()
+        self.play_button.setText("⏸")
+
+    def append_stream(self, data):
+        if self.stream_buffer is not None:
+            self.stream_buffer.append(data)
+
+    def finish_stream(self):
+        if self.stream_buffer is not None:
+            self.stream_buffer.finish()
+
+    def set_media_data(self, data, content_type="mp3"):
+        """Load encoded audio held in memory, without going through a file"""
+        self.stream_buffer = None
+        self._load_started = time.time() if tracing.enabled() else None
+        buffer = QBuffer()
+        buffer.setData(QByteArray(data))
+        buffer.open(QIODevice.OpenModeFlag.ReadOnly)
+        # The URL only hints the container format to the backend
+        self.player.setSourceDevice(buffer, QUrl(f"memory.{content_type}"))
+        self.media_buffer = buffer  # The player doesn't own the device, keep it alive
+        self.play_button.setText("▶")
+        self.audio_output.setVolume(self.volume_slider.value() / 100)
+
     def set_media(self, file_path):
+        self.stream_buffer = None
+        self.media_buffer = None
+        # Time until QMediaPlayer reports the file as loaded
+        self._load_started = time.time() if tracing.enabled() else None
         self.player.setSource(QUrl.fromLocalFile(file_path))
         self.play_button.setText("▶")
         self.audio_output.setVolume(self.volume_slider.value() / 100)
 
+    def enqueue(self, file_path):
+        """Play file_path after the current media, or right away if playback already ran dry"""
+        if self.player.mediaStatus() == QMediaPlayer.MediaStatus.EndOfMedia and not self._queue:
+            self.set_media(file_path)
+            self.toggle_playback()
+        else:
+            self._queue.append(file_path)
+
+    def media_status_changed(self, status):
+        if status == QMediaPlayer.MediaStatus.LoadedMedia and self._load_started is not None:
+            tracing.record('player.load', self._load_started, time.time())
+            self._load_started = None
+        if status == QMediaPlayer.MediaStatus.EndOfMedia and self._queue:
+            self.set_media(self._queue.popleft())
+            self.toggle_playback()
+
     def toggle_playback(self):
         if self.player.playbackState() == QMediaPlayer.PlaybackState.PlayingState:
             self.player.pause()
@@ -173,5 +270,6 @@ class AudioPlayerWidget(QWidget):
             self.visualizer.update_values(0)
 
     def stop(self):
+        self._queue.clear()
         self.player.stop()
         self.play_button.setText("▶")
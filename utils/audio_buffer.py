@@ -0,0 +1,39 @@
+import io
+from concurrent.futures import Future
+
+from utils.audio_format import sniff_format
+
+
+class AudioBuffer:
+    """Synthesized audio held in memory.
+
+    data is the encoded audio as produced by the provider and format its
+    container (see audio_format.sniff_format). path is where the audio lives
+    on disk: set right away for audio read from the cache, otherwise once the
+    background write tracked by ``persisted`` has finished. ``persisted``
+    resolves to the path, or to None when the audio is never written.
+    """
+
+    def __init__(self, data, fmt=None, path=None):
+        self.data = bytes(data)
+        self.format = fmt or sniff_format(self.data[:64])
+        self.path = path
+        self.persisted = Future()
+        if path is not None:
+            self.persisted.set_result(path)
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, 'rb') as f:
+            return cls(f.read(), path=str(path))
+
+    def __len__(self):
+        return len(self.data)
+
+    def open(self):
+        """Readable file object over the audio, for decoders that take one"""
+        return io.BytesIO(self.data)
+
+    def wait_persisted(self, timeout=None):
+        """Block until the background write finishes; returns the path or None"""
+        return self.persisted.result(timeout)
@@ -0,0 +1,216 @@
+import hashlib
+import json
+import os
+import time
+import uuid
+from pathlib import Path
+
+
+class AudioCache:
+    """Content-addressed cache of synthesized audio with size-bounded LRU eviction.
+
+    Entries live as plain files named after the hash of the synthesis
+    parameters, so the cache survives restarts and can be shared by several
+    processes pointing at the same directory. Writes go through a temporary
+    ``.part`` file and an atomic rename; recency is tracked through the file
+    mtime, which is bumped on every hit.
+
+    An entry keeps the extension of its container. When a key has files in
+    several formats (e.g. after being transcoded to the storage codec) the
+    one earliest in ``extensions`` is used and the others are removed.
+
+    With a ``store`` (utils.audio_store.AudioStore) entries are registered
+    in its index and the store's sweeper enforces the budgets instead of
+    the directory scans done here.
+    """
+
+    PART_MARKER = ".part"
+    # Entries touched this recently are never evicted (another process may be about to play them)
+    MIN_EVICT_AGE = 60
+    # Leftover partial files older than this are considered abandoned
+    STALE_PART_AGE = 3600
+    # Force a full directory rescan after this many puts to pick up other processes' writes
+    RESCAN_EVERY = 100
+
+    # Extensions an entry may have, in order of preference
+    EXTENSIONS = ("opus", "mp3", "ogg", "m4a", "aac", "flac", "wav", "aiff")
+
+    def __init__(self, cache_dir, max_bytes=500 * 1024 * 1024, extension="mp3", extensions=None, store=None):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.extension = extension  # Used for temporary files until the real format is known
+        self.extensions = tuple(extensions or self.EXTENSIONS)
+        self._approx_bytes = None  # Lazily computed on the first eviction pass
+        self._puts_since_scan = 0
+        self.store = store
+
+    @staticmethod
+    def normalize_text(text):
+        """Collapse whitespace so cosmetic edits still hit the cache"""
+        return " ".join((text or "").split())
+
+    @classmethod
+    def text_hash(cls, text):
+        """Hash of the normalized text, recorded in the store's index"""
+        return hashlib.sha256(cls.normalize_text(text).encode("utf-8")).hexdigest()
+
+    @classmethod
+    def make_key(cls, provider, voice, rate, pitch, text):
+        """Build the cache key for a synthesis request"""
+        payload = json.dumps(
+            [provider, voice or "", round(float(rate), 3), round(float(pitch), 3), cls.normalize_text(text)],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def path_for(self, key, extension=None):
+        """Final location of the entry for a key"""
+        return self.cache_dir / f"{key}.{extension or self.extension}"
+
+    def get(self, key):
+        """Return the cached file path for a key, or None on a miss"""
+        for extension in self.extensions:
+            path = self.path_for(key, extension)
+            if self.store is not None:
+                # The store's index tracks use, the mtime stays that of the content (sidecars depend on it)
+                if path.is_file():
+                    self.store.touch(path)
+                    return str(path)
+                continue
+            try:
+                # Bump the mtime so LRU eviction sees this entry as recently used
+                os.utime(path)
+            except (FileNotFoundError, PermissionError):
+                continue
+            return str(path)
+        return None
+
+    def temp_path(self, key, extension=None):
+        """Unique path a provider can write to before the entry is published"""
+        return str(self.cache_dir / f"{key}.{uuid.uuid4().hex}{self.PART_MARKER}.{extension or self.extension}")
+
+    def put(self, key, temp_path, provider=None, text_hash=None):
+        """Publish a finished temporary file as the cache entry for key.
+
+        The entry takes the temporary file's extension. provider and
+        text_hash are recorded in the store's index.
+        """
+        final_path = self.path_for(key, Path(temp_path).suffix.lstrip(".") or None)
+        os.replace(temp_path, final_path)  # Atomic, last writer wins with identical content
+        if self.store is not None:
+            self.store.add(final_path, provider, text_hash)
+            self._retire_superseded(key)
+            return str(final_path)
+
+        try:
+            size = final_path.stat().st_size
+        except FileNotFoundError:
+            size = 0
+        if self._approx_bytes is not None:
+            self._approx_bytes += size
+        self._puts_since_scan += 1
+
+        if (self._approx_bytes is None or self._approx_bytes > self.max_bytes
+                or self._puts_since_scan >= self.RESCAN_EVERY):
+            self.evict()
+        return str(final_path)
+
+    def discard(self, temp_path):
+        """Remove a temporary file after a failed synthesis"""
+        try:
+            os.remove(temp_path)
+        except OSError:
+            return
+        if self.store is not None:
+            self.store.forget(temp_path)
+
+    def _retire_superseded(self, key):
+        """Let the store remove files of key that exist in a preferred format too"""
+        present = [path for path in (self.path_for(key, extension) for extension in self.extensions) if path.exists()]
+        for path in present[1:]:
+            self.store.expire(path)
+
+    def _scan(self):
+        """Return (entries, total_bytes) for published entries, removing stale partial files"""
+        now = time.time()
+        entries = []
+        total = 0
+        try:
+            iterator = os.scandir(self.cache_dir)
+        except FileNotFoundError:
+            return entries, total
+        with iterator:
+            for entry in iterator:
+                try:
+                    if not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                if self.PART_MARKER in entry.name:
+                    if now - stat.st_mtime > self.STALE_PART_AGE:
+                        self.discard(entry.path)
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        return self._drop_superseded(entries, total, now)
+
+    def _rank(self, path):
+        extension = Path(path).suffix.lstrip(".")
+        return self.extensions.index(extension) if extension in self.extensions else len(self.extensions)
+
+    def _drop_superseded(self, entries, total, now):
+        """Remove files of a key that also exists in a preferred format.
+
+        Recently used ones stay until a later pass, they may still be playing.
+        """
+        best = {}
+        for entry in entries:
+            key = Path(entry[2]).stem
+            if key not in best or self._rank(entry[2]) < self._rank(best[key][2]):
+                best[key] = entry
+        kept = []
+        for entry in entries:
+            mtime, size, path = entry
+            if best[Path(path).stem] is not entry and now - mtime > self.MIN_EVICT_AGE:
+                try:
+                    os.remove(path)
+                    total -= size
+                    continue
+                except FileNotFoundError:
+                    total -= size
+                    continue
+                except PermissionError:
+                    pass
+            kept.append(entry)
+        return kept, total
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits its budget"""
+        entries, total = self._scan()
+        self._puts_since_scan = 0
+        if total > self.max_bytes:
+            cutoff = time.time() - self.MIN_EVICT_AGE
+            entries.sort()  # Oldest mtime first
+            for mtime, size, path in entries:
+                if total <= self.max_bytes or mtime > cutoff:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except FileNotFoundError:
+                    # Another process evicted it first
+                    total -= size
+                except PermissionError:
+                    # Still open elsewhere (Windows); try again on the next pass
+                    continue
+        self._approx_bytes = total
+        return total
+
+    def clear(self):
+        """Remove every entry from the cache"""
+        entries, _ = self._scan()
+        for _, _, path in entries:
+            self.discard(path)
+        self._approx_bytes = 0
@@ -0,0 +1,129 @@
+"""Audio container detection and ffmpeg transcoding.
+
+Providers don't agree on what they write (pyttsx3 usually produces WAV,
+the online services MP3), so outputs are identified by their magic bytes
+rather than by file name. ``transcode`` is a plain module-level function so
+it can run in a ProcessPoolExecutor.
+"""
+import contextlib
+import os
+import shutil
+import subprocess
+import uuid
+
+# Format name -> (file extension, MIME type, ffmpeg output arguments)
+FORMATS = {
+    'opus': ('opus', 'audio/ogg', ['-c:a', 'libopus', '-b:a', '24k', '-application', 'voip', '-f', 'ogg']),
+    'mp3': ('mp3', 'audio/mpeg', ['-c:a', 'libmp3lame', '-q:a', '4', '-f', 'mp3']),
+    'wav': ('wav', 'audio/wav', ['-c:a', 'pcm_s16le', '-f', 'wav']),
+    'ogg': ('ogg', 'audio/ogg', ['-c:a', 'libvorbis', '-q:a', '4', '-f', 'ogg']),
+    'flac': ('flac', 'audio/flac', ['-c:a', 'flac', '-f', 'flac']),
+    'm4a': ('m4a', 'audio/mp4', ['-c:a', 'aac', '-b:a', '64k', '-f', 'ipod']),
+    'aac': ('aac', 'audio/aac', ['-c:a', 'aac', '-b:a', '64k', '-f', 'adts']),
+    'aiff': ('aiff', 'audio/aiff', ['-c:a', 'pcm_s16be', '-f', 'aiff']),
+}
+
+# Seconds a single transcode may take before it is abandoned
+TRANSCODE_TIMEOUT = 300
+
+
+def sniff_format(header):
+    """Identify an audio container from the first bytes of a file; None if unknown"""
+    if header[:4] == b'RIFF' and header[8:12] == b'WAVE':
+        return 'wav'
+    if header[:4] == b'OggS':
+        return 'opus' if b'OpusHead' in header[:64] else 'ogg'
+    if header[:4] == b'fLaC':
+        return 'flac'
+    if header[:4] == b'FORM' and header[8:12] in (b'AIFF', b'AIFC'):
+        return 'aiff'
+    if header[4:8] == b'ftyp':
+        return 'm4a'
+    if header[:3] == b'ID3':
+        return 'mp3'
+    if len(header) >= 2 and header[0] == 0xFF and header[1] & 0xE0 == 0xE0:
+        # MPEG frame sync; layer bits 00 mean an AAC ADTS stream instead
+        return 'aac' if (header[1] >> 1) & 0x3 == 0 else 'mp3'
+    return None
+
+
+def detect_format(path):
+    """Container format of an audio file, or None if it can't be read or recognized"""
+    try:
+        with open(path, 'rb') as f:
+            return sniff_format(f.read(64))
+    except OSError:
+        return None
+
+
+def extension_for(fmt):
+    return FORMATS[fmt][0] if fmt in FORMATS else fmt
+
+
+def format_for_path(path):
+    """Format implied by a file name's extension, or None"""
+    extension = os.path.splitext(str(path))[1].lower().lstrip('.')
+    for fmt, (ext, _, _) in FORMATS.items():
+        if ext == extension:
+            return fmt
+    return None
+
+
+def mime_type(fmt):
+    return FORMATS[fmt][1] if fmt in FORMATS else 'application/octet-stream'
+
+
+def with_extension(path, fmt):
+    """path with its extension replaced by the one for fmt"""
+    return f"{os.path.splitext(str(path))[0]}.{extension_for(fmt)}"
+
+
+def match_extension(path):
+    """Rename a file so its extension matches its actual container; returns the (new) path"""
+    fmt = detect_format(path)
+    if fmt is None or format_for_path(path) == fmt:
+        return str(path)
+    target = with_extension(path, fmt)
+    os.replace(path, target)
+    return target
+
+
+def open_output(output):
+    """Open an output path for binary writing; a file object passed instead is used as is and left open"""
+    if hasattr(output, 'write'):
+        return contextlib.nullcontext(output)
+    return open(output, 'wb')
+
+
+def ffmpeg_path():
+    """ffmpeg executable (FFMPEG_BINARY overrides the PATH lookup), or None"""
+    return os.environ.get('FFMPEG_BINARY') or shutil.which('ffmpeg')
+
+
+def ffprobe_path():
+    """ffprobe executable (FFPROBE_BINARY overrides the PATH lookup), or None"""
+    return os.environ.get('FFPROBE_BINARY') or shutil.which('ffprobe')
+
+
+def transcode(source, destination, fmt):
+    """Convert source to fmt at destination with ffmpeg; returns destination.
+
+    Output goes to a temporary file first, so destination never holds a
+    half-written file.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported audio format: {fmt}")
+    ffmpeg = ffmpeg_path()
+    if ffmpeg is None:
+        raise RuntimeError("ffmpeg is required to convert audio but was not found")
+    temp_path = f"{destination}.{uuid.uuid4().hex}.tmp"
+    command = [ffmpeg, '-nostdin', '-loglevel', 'error', '-y', '-i', str(source), '-vn'] + FORMATS[fmt][2] + [temp_path]
+    try:
+        result = subprocess.run(command, capture_output=True, timeout=TRANSCODE_TIMEOUT)
+        if result.returncode != 0:
+            raise RuntimeError(f"ffmpeg failed: {result.stderr.decode('utf-8', 'replace').strip()}")
+        os.replace(temp_path, destination)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return str(destination)
@@ -1,39 +1,144 @@
 import numpy as np
 from pydub import AudioSegment
 import os
+import wave
+from pathlib import Path
+from utils import tracing
+from utils.audio_buffer import AudioBuffer
+from utils.audio_format import detect_format
+from utils.decoded_audio import DecodeCache, DecodedAudio, probe_duration, source_key
+from utils.pcm_cache import PcmCache
+from utils.pcm_stream import BLOCK_FRAMES, LevelMeter, analyze
+from utils.peaks import PeakBuilder, PeakPyramid, sidecar_path
 
 class AudioProcessor:
+    """Audio helpers; sources may be file paths, AudioBuffers or raw encoded bytes"""
+
+    # Decoded clips shared by duration, sample and waveform queries
+    decode_cache = DecodeCache()
+    # Peak pyramids of recent clips, including in-memory ones that have no sidecar file
+    peak_cache = DecodeCache(max_bytes=32 * 1024 * 1024)
+    # Files are decoded once to raw PCM on disk and memory-mapped from there; None decodes into memory instead
+    pcm_cache = PcmCache(Path(__file__).parent.parent / "cache" / "pcm")
+
+    @staticmethod
+    def load(source):
+        """Decode a file path, AudioBuffer or bytes into an AudioSegment"""
+        if isinstance(source, (bytes, bytearray)):
+            source = AudioBuffer(source)
+        if isinstance(source, AudioBuffer):
+            # WAV is parsed in Python; anything else is piped to ffmpeg, which probes the container
+            return AudioSegment.from_file(source.open(), format='wav' if source.format == 'wav' else None)
+        return AudioSegment.from_file(source)
+
+    @staticmethod
+    def _pcm_path(source):
+        """File whose decoded samples go to the PCM cache, or None (no cache, in-memory audio)"""
+        if AudioProcessor.pcm_cache is None:
+            return None
+        if isinstance(source, (str, os.PathLike)):
+            return source
+        return getattr(source, 'path', None)
+
+    @staticmethod
+    def decode(source):
+        """DecodedAudio for source, decoded only if no current copy is cached.
+
+        With a PCM cache, files are decoded into it once and their samples
+        are a memory-mapped view of the cache file.
+        """
+        pcm_path = AudioProcessor._pcm_path(source)
+        if pcm_path is not None:
+            decoded = AudioProcessor.pcm_cache.peek(pcm_path)
+            if decoded is None:
+                with tracing.span('audio.decode', path=str(pcm_path), pcm_cache=True):
+                    decoded = AudioProcessor.pcm_cache.get(pcm_path)
+            return decoded
+
+        def load():
+            path = str(source) if isinstance(source, (str, os.PathLike)) else None
+            with tracing.span('audio.decode', path=path):
+                return DecodedAudio.from_segment(AudioProcessor.load(source))
+
+        return AudioProcessor.decode_cache.get(source_key(source), load)
+
     @staticmethod
-    def get_audio_duration(file_path):
-        """Get the duration of an audio file in milliseconds"""
+    def _decoded_copy(source):
+        """Already decoded samples of source (in memory or in the PCM cache), or None; never decodes"""
+        pcm_path = AudioProcessor._pcm_path(source)
+        if pcm_path is not None:
+            decoded = AudioProcessor.pcm_cache.peek(pcm_path)
+            if decoded is not None:
+                return decoded
+        return AudioProcessor.decode_cache.peek(source_key(source))
+
+    @staticmethod
+    def get_audio_duration(source):
+        """Get the duration of an audio file in milliseconds.
+
+        Read from the container header when possible; a clip is only decoded
+        if its header doesn't say.
+        """
         try:
-            audio = AudioSegment.from_file(file_path)
-            return len(audio)
+            decoded = AudioProcessor._decoded_copy(source)
+            if decoded is not None:
+                return decoded.duration_ms
+            path = str(source) if isinstance(source, (str, os.PathLike)) else None
+            with tracing.span('audio.probe_duration', path=path):
+                duration = probe_duration(source)
+            if duration is not None:
+                return duration
+            return AudioProcessor.decode(source).duration_ms
         except Exception as e:
             print(f"Error getting audio duration: {e}")
             return 0
 
     @staticmethod
-    def get_audio_data(file_path):
+    def get_audio_data(source):
         """Get audio data as numpy array for visualization"""
         try:
-            audio = AudioSegment.from_file(file_path)
-            samples = np.array(audio.get_array_of_samples())
-            
-            # Convert to float32 and normalize
-            samples = samples.astype(np.float32)
-            samples = samples / np.iinfo(np.int16).max
-            
-            return samples
+            # Interleaved channels, normalized to [-1, 1]
+            return AudioProcessor.decode(source).as_float().ravel()
         except Exception as e:
             print(f"Error processing audio data: {e}")
             return np.array([])
 
     @staticmethod
-    def adjust_audio(file_path, output_path, speed=1.0, pitch=1.0):
+    def get_samples(source, start_ms=0, end_ms=None):
+        """(frames, channels) integer samples of start_ms..end_ms.
+
+        A view, not a copy: with the PCM cache it reads straight from the
+        mapped cache file, so seeking into a long clip costs no decode.
+        """
+        return AudioProcessor._slice(AudioProcessor.decode(source), start_ms, end_ms)
+
+    @staticmethod
+    def _slice(decoded, start_ms, end_ms):
+        start = max(0, start_ms * decoded.frame_rate // 1000)
+        end = decoded.frames if end_ms is None else end_ms * decoded.frame_rate // 1000
+        return decoded.samples[start:end]
+
+    @staticmethod
+    def extract(source, output_path, start_ms=0, end_ms=None):
+        """Write start_ms..end_ms of a clip to output_path as WAV"""
+        try:
+            decoded = AudioProcessor.decode(source)
+            samples = AudioProcessor._slice(decoded, start_ms, end_ms)
+            with wave.open(str(output_path), 'wb') as f:
+                f.setnchannels(decoded.channels)
+                f.setsampwidth(decoded.sample_width)
+                f.setframerate(decoded.frame_rate)
+                f.writeframes(samples.tobytes())
+            return output_path
+        except Exception as e:
+            print(f"Error extracting audio: {e}")
+            return None
+
+    @staticmethod
+    def adjust_audio(source, output_path, speed=1.0, pitch=1.0):
         """Adjust audio speed and pitch"""
         try:
-            audio = AudioSegment.from_file(file_path)
+            audio = AudioProcessor.load(source)
             
             # Apply speed change if needed
             if speed != 1.0:
@@ -50,28 +155,99 @@ class AudioProcessor:
             return None
 
     @staticmethod
-    def get_waveform_data(file_path, num_points=100):
-        """Get waveform data for visualization"""
+    def concatenate(file_paths, output_path):
+        """Join audio files in order into output_path"""
+        if all(detect_format(path) == 'mp3' for path in file_paths):
+            # MP3 streams are frame-based, so parts can be joined byte for byte
+            with open(output_path, 'wb') as out:
+                for path in file_paths:
+                    with open(path, 'rb') as f:
+                        out.write(f.read())
+            return output_path
+
+        # Containers with headers (WAV from local engines, Opus from the cache) need a proper re-encode
+        combined = AudioSegment.empty()
+        for path in file_paths:
+            combined += AudioSegment.from_file(path)
+        combined.export(output_path, format="wav")
+        return output_path
+
+    @staticmethod
+    def get_peaks(source):
+        """PeakPyramid for source, read from its sidecar file or built in one streaming pass.
+
+        A clip already decoded in memory is summarized from that copy; files
+        go through the PCM cache, read back block by block or decoded into it
+        in the same pass, so memory stays flat however long the clip is.
+        """
+        def load():
+            path = source if isinstance(source, (str, os.PathLike)) else getattr(source, 'path', None)
+            stat = os.stat(path) if path else None
+            if path:
+                pyramid = PeakPyramid.load(sidecar_path(path), stat)
+                if pyramid is not None:
+                    return pyramid
+            decoded = AudioProcessor.decode_cache.peek(source_key(source))
+            pcm_path = AudioProcessor._pcm_path(source)
+            if decoded is not None:
+                with tracing.span('audio.peaks', frames=decoded.frames):
+                    pyramid = PeakPyramid.from_samples(decoded.samples, decoded.frame_rate, decoded.sample_width)
+            elif pcm_path is not None:
+                # Decoded into the PCM cache in the same pass, so later seeks and snippets are free too
+                builder = PeakBuilder()
+                with tracing.span('audio.peaks', pcm_cache=True):
+                    frame_rate, _ = AudioProcessor.pcm_cache.analyze(pcm_path, builder)
+                pyramid = builder.result(frame_rate)
+            else:
+                builder = PeakBuilder()
+                with tracing.span('audio.peaks', streamed=True):
+                    pyramid = builder.result(analyze(source, builder).frame_rate)
+            if path:
+                try:
+                    pyramid.save(sidecar_path(path), stat)
+                except OSError as e:
+                    print(f"Could not write peak file for {path}: {e}")
+            return pyramid
+
+        return AudioProcessor.peak_cache.get(source_key(source), load)
+
+    @staticmethod
+    def get_levels(source):
+        """Duration, RMS and peak level (dBFS) of a clip, measured block by block in constant memory"""
+        meter = LevelMeter()
+        decoded = AudioProcessor.decode_cache.peek(source_key(source))
+        if decoded is not None and decoded.sample_width == 2:
+            for start in range(0, decoded.frames, BLOCK_FRAMES):
+                meter.feed(decoded.samples[start:start + BLOCK_FRAMES])
+            return meter.result(decoded.frame_rate, decoded.channels)
+        pcm_path = AudioProcessor._pcm_path(source)
+        if pcm_path is not None:
+            # Read back with plain reads rather than through the mapping, which would keep every page resident
+            info = AudioProcessor.pcm_cache.feed(pcm_path, meter)
+            if info is not None:
+                return meter.result(*info)
+        with tracing.span('audio.levels'):
+            stream = analyze(source, meter)
+        return meter.result(stream.frame_rate, stream.channels)
+
+    @staticmethod
+    def get_waveform_minmax(source, width, start_ms=0, end_ms=None):
+        """(width, 2) min/max in [-1, 1] for drawing start_ms..end_ms of a clip in width columns"""
         try:
-            audio = AudioSegment.from_file(file_path)
-            samples = np.array(audio.get_array_of_samples())
-            
-            # Resample to desired number of points
-            samples = samples.astype(np.float32)
-            samples = samples / np.iinfo(np.int16).max
-            
-            # Calculate points for visualization
-            chunk_size = len(samples) // num_points
-            if chunk_size < 1:
-                return samples
-            
-            points = []
-            for i in range(0, len(samples), chunk_size):
-                chunk = samples[i:i + chunk_size]
-                if len(chunk) > 0:
-                    points.append(np.max(np.abs(chunk)))
-            
-            return np.array(points)
+            peaks = AudioProcessor.get_peaks(source)
+            start = start_ms * peaks.frame_rate // 1000
+            end = None if end_ms is None else end_ms * peaks.frame_rate // 1000
+            return peaks.minmax(width, start, end)
+        except Exception as e:
+            print(f"Error getting waveform data: {e}")
+            return np.zeros((width, 2), np.float32)
+
+    @staticmethod
+    def get_waveform_data(source, num_points=100):
+        """Get waveform data for visualization: peak amplitude of num_points equal slices"""
+        try:
+            peaks = AudioProcessor.get_peaks(source).minmax(num_points)
+            return np.maximum(-peaks[:, 0], peaks[:, 1])
         except Exception as e:
             print(f"Error getting waveform data: {e}")
             return np.zeros(num_points)
@@ -0,0 +1,267 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+
+class AudioStore:
+    """SQLite index of the audio files under a directory, kept within age and size budgets.
+
+    Files are registered when they are written (``add``) and their use is
+    recorded with ``touch``, so a sweep only queries the index instead of
+    listing the directory. ``start`` runs a background thread that
+    reconciles the index with the directory once, then sweeps every
+    sweep_interval seconds: files unused for longer than max_age go first,
+    then the least recently used ones until the total fits max_bytes.
+    Pinned files (history entries, the clip that is playing) and files used
+    in the last MIN_EVICT_AGE seconds are never removed.
+
+    The index is shared by every process using the directory; pins only
+    protect files in the process that made them.
+    """
+
+    INDEX_NAME = "audio_index.db"
+    # Files used this recently are never removed (another process may be about to play them)
+    MIN_EVICT_AGE = 60
+    # Temporary files older than this are considered abandoned
+    STALE_TEMP_AGE = 3600
+    TEMP_MARKERS = (".part", ".tmp")
+    # Files derived from an audio file and stored next to it (peak pyramids), removed along with it
+    COMPANION_SUFFIXES = (".peaks",)
+
+    def __init__(self, root_dir, max_bytes=500 * 1024 * 1024, max_age=30 * 24 * 3600, sweep_interval=600):
+        self.root_dir = Path(root_dir).absolute()
+        self.root_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.sweep_interval = sweep_interval
+        self._pins = Counter()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._stop = threading.Event()
+        self._thread = None
+        self._db = sqlite3.connect(str(self.root_dir / self.INDEX_NAME), timeout=10, check_same_thread=False)
+        # WAL lets a GUI and a server process read and write the index at the same time
+        self._db.execute("PRAGMA journal_mode=WAL")
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "path TEXT PRIMARY KEY, size INTEGER NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL, "
+                "provider TEXT, text_hash TEXT)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS files_accessed ON files (accessed)")
+
+    def _key(self, path):
+        """Index key of a path (relative to the root), or None if it lies outside the store"""
+        try:
+            relative = os.path.relpath(os.path.abspath(path), self.root_dir)
+        except ValueError:
+            return None  # Different drive on Windows
+        if relative.startswith(os.pardir):
+            return None
+        return Path(relative).as_posix()
+
+    def _execute(self, sql, params=(), many=False):
+        """Run one statement (or executemany) in its own transaction and return the number of rows
+        changed, or None if it failed; index errors are reported, not raised
+        """
+        with self._lock:
+            if self._closed:
+                return None
+            try:
+                with self._db:
+                    return (self._db.executemany if many else self._db.execute)(sql, params).rowcount
+            except sqlite3.Error as e:
+                print(f"Audio index error: {e}")
+                return None
+
+    def _query(self, sql, params=()):
+        """All rows of a SELECT, fetched before the connection is released; None if it failed"""
+        with self._lock:
+            if self._closed:
+                return None
+            try:
+                return self._db.execute(sql, params).fetchall()
+            except sqlite3.Error as e:
+                print(f"Audio index error: {e}")
+                return None
+
+    def add(self, path, provider=None, text_hash=None):
+        """Register a finished file (or refresh its entry) as just used"""
+        key = self._key(path)
+        if key is None:
+            return
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return
+        now = time.time()
+        self._execute(
+            "INSERT INTO files (path, size, created, accessed, provider, text_hash) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(path) DO UPDATE SET size = excluded.size, accessed = excluded.accessed, "
+            "provider = coalesce(excluded.provider, provider), text_hash = coalesce(excluded.text_hash, text_hash)",
+            (key, size, now, now, provider, text_hash)
+        )
+
+    def touch(self, path):
+        """Record a use of path for LRU eviction"""
+        key = self._key(path)
+        if key is not None:
+            self._execute("UPDATE files SET accessed = ? WHERE path = ?", (time.time(), key))
+
+    def expire(self, path):
+        """Make path the first candidate for removal, e.g. once a smaller copy replaces it"""
+        key = self._key(path)
+        if key is not None:
+            self._execute("UPDATE files SET accessed = 0 WHERE path = ?", (key,))
+
+    def forget(self, path):
+        """Drop path from the index after it was deleted elsewhere"""
+        key = self._key(path)
+        if key is not None:
+            self._execute("DELETE FROM files WHERE path = ?", (key,))
+
+    def pin(self, path):
+        """Keep path from being removed until a matching unpin"""
+        key = self._key(path)
+        if key is not None:
+            with self._lock:
+                self._pins[key] += 1
+
+    def unpin(self, path):
+        key = self._key(path)
+        with self._lock:
+            if self._pins.get(key, 0) > 1:
+                self._pins[key] -= 1
+            else:
+                self._pins.pop(key, None)
+
+    def stats(self):
+        """Number and total size of indexed files, and how many are pinned"""
+        rows = self._query("SELECT count(*), coalesce(sum(size), 0) FROM files")
+        count, total = rows[0] if rows else (0, 0)
+        with self._lock:
+            pinned = len(self._pins)
+        return {'files': count, 'bytes': total, 'pinned': pinned, 'max_bytes': self.max_bytes}
+
+    def sweep(self, max_age=None):
+        """Remove files unused for max_age seconds (default: the store's), then the least
+        recently used ones while the total exceeds max_bytes. Returns how many were removed.
+        """
+        max_age = self.max_age if max_age is None else max_age
+        now = time.time()
+        rows = self._query("SELECT path, size, accessed FROM files ORDER BY accessed")
+        if rows is None:
+            return 0
+        total = sum(size for _, size, _ in rows)
+        removed = 0
+        for key, size, accessed in rows:
+            expired = max_age is not None and accessed < now - max_age
+            if not expired and (self.max_bytes is None or total <= self.max_bytes):
+                break  # Rows are oldest first, nothing later qualifies either
+            if accessed > now - self.MIN_EVICT_AGE:
+                break
+            with self._lock:
+                if self._pins.get(key):
+                    continue
+            # Only if nobody used it since the query above
+            if not self._execute("DELETE FROM files WHERE path = ? AND accessed = ?", (key, accessed)):
+                continue
+            try:
+                os.remove(self.root_dir / key)
+            except FileNotFoundError:
+                pass
+            except PermissionError:
+                # Still open elsewhere (Windows); keep it for a later sweep
+                self._execute(
+                    "INSERT OR IGNORE INTO files (path, size, created, accessed) VALUES (?, ?, ?, ?)",
+                    (key, size, accessed, accessed)
+                )
+                continue
+            self._remove_companions(self.root_dir / key)
+            total -= size
+            removed += 1
+        if removed:
+            print(f"Audio store: removed {removed} files, {total / (1024 * 1024):.1f} MB kept")
+        return removed
+
+    def _remove_companions(self, path):
+        for suffix in self.COMPANION_SUFFIXES:
+            try:
+                os.remove(f"{path}{suffix}")
+            except OSError:
+                pass
+
+    def reconcile(self):
+        """Bring the index in line with the directory.
+
+        Adopts files the index doesn't know (e.g. written before it existed),
+        forgets entries whose file is gone and removes abandoned temporary
+        files and companions of deleted audio. This lists the whole
+        directory, so it only runs at start-up.
+        """
+        now = time.time()
+        found = {}
+        for dirpath, _, filenames in os.walk(self.root_dir):
+            for name in filenames:
+                if name.startswith(self.INDEX_NAME):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                if any(marker in name for marker in self.TEMP_MARKERS):
+                    if now - stat.st_mtime > self.STALE_TEMP_AGE:
+                        try:
+                            os.remove(path)
+                        except OSError:
+                            pass
+                    continue
+                if name.endswith(self.COMPANION_SUFFIXES):
+                    # Not indexed, they go with their audio file
+                    if not os.path.exists(path[:path.rindex('.')]):
+                        try:
+                            os.remove(path)
+                        except OSError:
+                            pass
+                    continue
+                found[self._key(path)] = stat
+
+        known = {row[0] for row in self._query("SELECT path FROM files") or ()}
+        self._execute("DELETE FROM files WHERE path = ?", [(key,) for key in known - found.keys()], many=True)
+        self._execute(
+            "INSERT OR IGNORE INTO files (path, size, created, accessed) VALUES (?, ?, ?, ?)",
+            [(key, stat.st_size, stat.st_mtime, stat.st_mtime) for key, stat in found.items() if key not in known],
+            many=True
+        )
+
+    def start(self):
+        """Start the background sweeper thread; a sweep_interval of 0 leaves it off"""
+        if self._thread is None and self.sweep_interval:
+            self._thread = threading.Thread(target=self._run, name="audio-store-sweeper", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        try:
+            self.reconcile()
+        except Exception as e:
+            print(f"Error reconciling audio store: {e}")
+        while not self._stop.is_set():
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"Error sweeping audio store: {e}")
+            self._stop.wait(self.sweep_interval)
+
+    def close(self):
+        """Stop the sweeper and close the index"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(2.0)
+        with self._lock:
+            if not self._closed:
+                self._closed = True
+                self._db.close()
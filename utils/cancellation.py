@@ -0,0 +1,72 @@
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, InvalidStateError, wait
+
+# Serializes cancel_future; reentrant because cancelling runs done-callbacks that may cancel more
+_cancel_lock = threading.RLock()
+
+
+class OperationCancelled(Exception):
+    """Raised by work that stopped because its CancelToken was cancelled"""
+
+
+def cancel_future(future):
+    """Cancel a future that has not started and wake every caller waiting on it.
+
+    Future.cancel() alone wakes result() callers, but concurrent.futures.wait()
+    keeps blocking until set_running_or_notify_cancel() is called.
+    """
+    with _cancel_lock:
+        if future.done():
+            return future.cancelled()
+        if not future.cancel():
+            return False
+        try:
+            future.set_running_or_notify_cancel()
+        except RuntimeError:
+            pass  # An executor notified it first
+        return True
+
+
+class CancelToken:
+    """Shared flag telling a running job to stop.
+
+    Work checks ``cancelled``/``raise_if_cancelled`` at convenient points and
+    registers callbacks (close a stream, terminate a process) for anything
+    that blocks. A token created with a parent is cancelled along with it.
+    """
+
+    def __init__(self, parent=None):
+        # Resolved on cancel, so waits can include it (see wait_any)
+        self.future = Future()
+        if parent is not None:
+            parent.add_callback(self.cancel)
+
+    @property
+    def cancelled(self):
+        return self.future.done()
+
+    def cancel(self):
+        """Cancel the token and run its callbacks; returns False if it was already cancelled"""
+        try:
+            self.future.set_result(True)
+            return True
+        except InvalidStateError:
+            return False
+
+    def add_callback(self, callback):
+        """Call callback() on cancel, or right away if the token is already cancelled"""
+        self.future.add_done_callback(lambda _: callback())
+
+    def raise_if_cancelled(self):
+        if self.cancelled:
+            raise OperationCancelled("Operation was cancelled")
+
+    def sleep(self, seconds):
+        """Sleep, waking early and raising OperationCancelled if the token is cancelled"""
+        wait([self.future], timeout=seconds)
+        self.raise_if_cancelled()
+
+    def wait_any(self, future):
+        """Wait for future to finish unless the token is cancelled first"""
+        wait([future, self.future], return_when=FIRST_COMPLETED)
+        self.raise_if_cancelled()
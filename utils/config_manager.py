@@ -17,11 +17,36 @@ class ConfigManager:
                 return {
                     "default_provider": "gtts",
                     "output_dir": "output",
+                    "audio_dir": "audios",
+                    "cache_dir": "cache",
                     "history_limit": 50,
                     "default_voice": "",
                     "default_rate": 1.0,
                     "default_pitch": 1.0,
-                    "theme": "dark"
+                    "theme": "dark",
+                    "cache_enabled": True,
+                    "cache_max_mb": 500,
+                    "storage_format": "opus",
+                    "audio_store": {"max_mb": 500, "max_age_days": 30, "sweep_interval_sec": 600},
+                    "pyttsx3_workers": 1,
+                    "process_workers": 2,
+                    "synthesis_threads": 16,
+                    "provider_limits": {
+                        "gtts": {"max_concurrency": 4, "rate_per_sec": 5, "burst": 10},
+                        "edge_tts": {"max_concurrency": 8, "rate_per_sec": 20, "burst": 20}
+                    },
+                    "retry": {"max_attempts": 3, "base_delay": 0.5, "max_delay": 8.0, "rate_limit_delay": 2.0},
+                    "hedging_enabled": False,
+                    "extra_providers": {},
+                    "tracing": {"enabled": False, "path": "traces/trace.jsonl", "format": "jsonl"},
+                    "streaming_enabled": True,
+                    "in_memory_enabled": True,
+                    "edge_max_concurrency": 8,
+                    "gtts_segment_concurrency": 4,
+                    "voice_cache_ttl_hours": 24,
+                    "long_text_threshold": 1000,
+                    "chunk_max_chars": 400,
+                    "chunk_fanout": {"gtts": 4, "edge_tts": 4, "pyttsx3": 1}
                 }
         except Exception as e:
             print(f"Error loading config: {e}")
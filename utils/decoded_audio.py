@@ -0,0 +1,166 @@
+"""Decoded audio shared by every analysis of a clip.
+
+Decoding compressed audio runs ffmpeg over the whole file, so
+AudioProcessor decodes a clip once into a DecodedAudio and keeps it in a
+DecodeCache until the cache's memory budget pushes it out. Entries are
+keyed by path, mtime and size, so a rewritten file is decoded again;
+in-memory audio is keyed by a hash of its bytes.
+"""
+import hashlib
+import io
+import os
+import subprocess
+import threading
+import wave
+from collections import OrderedDict
+
+import numpy as np
+
+from utils import audio_format
+from utils.audio_buffer import AudioBuffer
+
+# Total size of the decoded samples kept in memory
+DECODE_CACHE_BYTES = 256 * 1024 * 1024
+# Seconds an ffprobe call may take
+PROBE_TIMEOUT = 30
+
+
+class DecodedAudio:
+    """PCM samples of a clip as a (frames, channels) integer array"""
+
+    def __init__(self, samples, frame_rate, sample_width):
+        self.samples = samples
+        self.frame_rate = frame_rate
+        self.sample_width = sample_width
+
+    @classmethod
+    def from_segment(cls, segment):
+        """Wrap a pydub AudioSegment's raw data without copying it"""
+        dtype = {1: np.int8, 2: np.int16, 4: np.int32}[segment.sample_width]
+        samples = np.frombuffer(segment.raw_data, dtype=dtype).reshape(-1, segment.channels)
+        return cls(samples, segment.frame_rate, segment.sample_width)
+
+    @property
+    def channels(self):
+        return self.samples.shape[1]
+
+    @property
+    def frames(self):
+        return self.samples.shape[0]
+
+    @property
+    def duration_ms(self):
+        # Rounded the way len(AudioSegment) is
+        return round(1000 * self.frames / self.frame_rate) if self.frame_rate else 0
+
+    @property
+    def nbytes(self):
+        return self.samples.nbytes
+
+    @property
+    def full_scale(self):
+        return float(2 ** (8 * self.sample_width - 1))
+
+    def as_float(self):
+        """Samples scaled to [-1, 1], as a new float32 array"""
+        return self.samples.astype(np.float32) / self.full_scale
+
+
+class DecodeCache:
+    """LRU of decoded data (DecodedAudio, peak pyramids: anything with nbytes) bounded by total size"""
+
+    def __init__(self, max_bytes=DECODE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._loading = {}  # key -> lock held while that key is being decoded
+
+    def peek(self, key):
+        """Cached entry for key, or None; never decodes"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def get(self, key, load):
+        """Cached entry for key, calling load() to create it on a miss.
+
+        Concurrent requests for the same key share a single load.
+        """
+        entry = self.peek(key)
+        if entry is not None:
+            return entry
+        with self._lock:
+            lock = self._loading.setdefault(key, threading.Lock())
+        try:
+            with lock:
+                entry = self.peek(key)
+                if entry is None:
+                    entry = load()
+                    self._store(key, entry)
+        finally:
+            with self._lock:
+                self._loading.pop(key, None)
+        return entry
+
+    def _store(self, key, entry):
+        if entry.nbytes > self.max_bytes:
+            return  # Larger than the whole budget, the caller uses it once
+        with self._lock:
+            self._entries[key] = entry
+            self._bytes += entry.nbytes
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._bytes, 'max_bytes': self.max_bytes}
+
+
+def source_bytes(source):
+    """Encoded bytes of in-memory audio, or None for a file path"""
+    if isinstance(source, AudioBuffer):
+        return source.data
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source)
+    return None
+
+
+def source_key(source):
+    """Cache key: path, mtime and size for files, a content hash for in-memory audio"""
+    data = source_bytes(source)
+    if data is not None:
+        return ('data', hashlib.sha1(data).hexdigest())
+    stat = os.stat(source)
+    return (os.path.abspath(source), stat.st_mtime_ns, stat.st_size)
+
+
+def probe_duration(source):
+    """Duration in milliseconds read from the container header without decoding, or None.
+
+    WAV headers are read directly; other formats go through ffprobe.
+    """
+    data = source_bytes(source)
+    try:
+        with wave.open(io.BytesIO(data) if data is not None else str(source), 'rb') as f:
+            return round(1000 * f.getnframes() / f.getframerate())
+    except (wave.Error, EOFError, OSError, ZeroDivisionError):
+        pass
+    ffprobe = audio_format.ffprobe_path()
+    if ffprobe is None:
+        return None
+    command = [ffprobe, '-v', 'error', '-show_entries', 'format=duration',
+               '-of', 'default=noprint_wrappers=1:nokey=1', 'pipe:0' if data is not None else str(source)]
+    try:
+        result = subprocess.run(command, input=data, capture_output=True, timeout=PROBE_TIMEOUT)
+        return round(float(result.stdout.strip()) * 1000)
+    except (OSError, subprocess.SubprocessError, ValueError):
+        return None  # No duration in the header (e.g. "N/A"), the caller decodes instead
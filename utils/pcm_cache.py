@@ -0,0 +1,298 @@
+"""Decoded audio kept on disk as raw PCM and memory-mapped for random access.
+
+A clip is decoded once (block by block, see pcm_stream) into
+``<path hash>-<version hash>.pcm``: a HEADER_SIZE-byte header with the
+frame rate, channel count and sample width, then interleaved samples.
+Opening an entry maps the file instead of reading it, so any time range is
+a zero-copy view and only the pages actually touched are loaded. The
+version hash covers the source's size and mtime, so a rewritten source
+gets a new entry and the old one is removed. Entries are evicted least
+recently used first (by mtime, bumped on every use) once the directory
+exceeds max_bytes.
+
+Whole-clip passes (peaks, levels) go through ``analyze`` instead of the
+mapping: it feeds the blocks being decoded, or reads an existing entry
+with plain file reads, so they run in one block of memory.
+"""
+import hashlib
+import os
+import struct
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+from utils.decoded_audio import DecodedAudio
+from utils.pcm_stream import BLOCK_FRAMES, PcmStream
+
+_MAGIC = b"CHPC"
+_VERSION = 1
+# magic, version, frame rate, channels, sample width, frames
+_HEADER = struct.Struct("<4sBIHBQ")
+# Samples start here, leaving the header room to grow and keeping them aligned
+HEADER_SIZE = 64
+# Total size of the cache directory
+PCM_CACHE_BYTES = 1024 * 1024 * 1024
+_DTYPES = {1: 'u1', 2: '<i2', 4: '<i4'}
+
+
+class PcmCache:
+    """Directory of memory-mapped decoded clips bounded by total size"""
+
+    SUFFIX = ".pcm"
+    TEMP_MARKER = ".tmp"
+    # Entries used this recently are never evicted (another process may be reading them)
+    MIN_EVICT_AGE = 60
+    # Leftover temporary files older than this are considered abandoned
+    STALE_TEMP_AGE = 3600
+    # Mapped entries kept open in this process
+    MAX_OPEN = 16
+
+    def __init__(self, cache_dir, max_bytes=PCM_CACHE_BYTES):
+        self.cache_dir = Path(cache_dir)  # Created with the first entry
+        self.max_bytes = max_bytes
+        self._open = OrderedDict()  # entry path -> DecodedAudio over its mapping
+        self._lock = threading.Lock()
+        self._building = {}  # entry path -> lock held while it is being written
+        self._approx_bytes = None  # Lazily computed on the first eviction pass
+
+    def entry_path(self, source):
+        """Cache file for the current version of a source file"""
+        stat = os.stat(source)
+        name = hashlib.sha1(os.path.abspath(source).encode('utf-8')).hexdigest()[:24]
+        version = hashlib.sha1(f"{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()[:8]
+        return self.cache_dir / f"{name}-{version}{self.SUFFIX}"
+
+    def peek(self, source):
+        """DecodedAudio mapped from the entry for source, or None if there is none; never decodes"""
+        return self._open_entry(self.entry_path(source))
+
+    def get(self, source):
+        """DecodedAudio for source, decoding it into the cache on a miss.
+
+        Concurrent requests for the same source share a single decode.
+        """
+        path = self.entry_path(source)
+        entry = self._open_entry(path)
+        if entry is not None:
+            return entry
+        with self._lock:
+            lock = self._building.setdefault(path, threading.Lock())
+        try:
+            with lock:
+                entry = self._open_entry(path)
+                if entry is None:
+                    self._write(source, path)
+                    entry = self._open_entry(path)
+        finally:
+            with self._lock:
+                self._building.pop(path, None)
+        if entry is None:
+            raise RuntimeError(f"Could not map decoded audio for {source}")
+        return entry
+
+    def feed(self, source, *passes):
+        """Run passes over the cached samples of source, block by block; never decodes.
+
+        Returns (frame_rate, channels), or None if source has no entry.
+        """
+        return self._read_entry(self.entry_path(source), passes)
+
+    def analyze(self, source, *passes):
+        """Run passes over the samples of source block by block, decoding it into the cache on a miss.
+
+        Each pass's feed(block) gets (frames, channels) int16 blocks, as with
+        pcm_stream.analyze. Returns (frame_rate, channels).
+        """
+        path = self.entry_path(source)
+        info = self._read_entry(path, passes)
+        if info is not None:
+            return info
+        with self._lock:
+            lock = self._building.setdefault(path, threading.Lock())
+        try:
+            with lock:
+                info = self._read_entry(path, passes)
+                if info is None:
+                    info = self._write(source, path, passes)
+        finally:
+            with self._lock:
+                self._building.pop(path, None)
+        return info
+
+    def _read_entry(self, path, passes):
+        """Feed an entry to passes with plain reads, so no mapped pages accumulate; None if it is missing or damaged"""
+        try:
+            f = open(path, 'rb')
+        except FileNotFoundError:
+            return None
+        with f:
+            try:
+                magic, version, frame_rate, channels, sample_width, frames = _HEADER.unpack(f.read(_HEADER.size))
+            except struct.error:
+                return None
+            # Entries are always written as 16-bit; anything else is damaged
+            if magic != _MAGIC or version != _VERSION or sample_width != 2 or not channels:
+                return None
+            if os.fstat(f.fileno()).st_size < HEADER_SIZE + frames * channels * 2:
+                return None
+            try:
+                os.utime(path)
+            except PermissionError:
+                pass
+            f.seek(HEADER_SIZE)
+            for start in range(0, frames, BLOCK_FRAMES):
+                count = min(BLOCK_FRAMES, frames - start)
+                block = np.frombuffer(f.read(count * channels * 2), '<i2').reshape(count, channels)
+                for analysis in passes:
+                    analysis.feed(block)
+        return frame_rate, channels
+
+    def _open_entry(self, path):
+        with self._lock:
+            entry = self._open.get(path)
+            if entry is not None:
+                self._open.move_to_end(path)
+        try:
+            # Bump the mtime so LRU eviction sees this entry as recently used
+            os.utime(path)
+        except (FileNotFoundError, PermissionError):
+            if entry is None:
+                return None
+        if entry is not None:
+            return entry  # Still readable through the mapping even if another process evicted the file
+        entry = self._map(path)
+        if entry is not None:
+            with self._lock:
+                self._open[path] = entry
+                while len(self._open) > self.MAX_OPEN:
+                    self._open.popitem(last=False)
+        return entry
+
+    @staticmethod
+    def _map(path):
+        """DecodedAudio over a read-only mapping of an entry; None if it is damaged"""
+        try:
+            with open(path, 'rb') as f:
+                magic, version, frame_rate, channels, sample_width, frames = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != _MAGIC or version != _VERSION or sample_width not in _DTYPES or not channels:
+                return None
+            if frames == 0:
+                samples = np.zeros((0, channels), _DTYPES[sample_width])
+            else:
+                samples = np.memmap(path, dtype=_DTYPES[sample_width], mode='r', offset=HEADER_SIZE,
+                                    shape=(frames, channels))
+        except (OSError, struct.error, ValueError):
+            return None
+        return DecodedAudio(samples, frame_rate, sample_width)
+
+    def _write(self, source, path, passes=()):
+        """Decode source into a temporary file and publish it as the entry at path.
+
+        Each decoded block is also fed to passes; returns (frame_rate, channels).
+        """
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        temp_path = f"{path}.{uuid.uuid4().hex}{self.TEMP_MARKER}"
+        try:
+            with PcmStream(source) as stream, open(temp_path, 'wb') as f:
+                f.write(bytes(HEADER_SIZE))
+                frames = 0
+                for block in stream:
+                    f.write(block.astype('<i2', copy=False).tobytes())
+                    frames += len(block)
+                    for analysis in passes:
+                        analysis.feed(block)
+                f.seek(0)
+                f.write(_HEADER.pack(_MAGIC, _VERSION, stream.frame_rate, stream.channels, 2, frames))
+            try:
+                os.replace(temp_path, path)
+            except PermissionError:
+                pass  # Another process published the same entry and has it open (Windows)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        self._remove_old_versions(path)
+
+        try:
+            size = path.stat().st_size
+        except FileNotFoundError:
+            size = 0
+        if self._approx_bytes is not None:
+            self._approx_bytes += size
+        if self._approx_bytes is None or self._approx_bytes > self.max_bytes:
+            self.evict()
+        return stream.frame_rate, stream.channels
+
+    def _remove_old_versions(self, path):
+        """Delete entries made from earlier versions of the same source"""
+        prefix = path.name.split('-')[0]
+        for other in self.cache_dir.glob(f"{prefix}-*{self.SUFFIX}"):
+            if other != path:
+                self._discard(other)
+
+    def _discard(self, path):
+        with self._lock:
+            self._open.pop(Path(path), None)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return True
+        except PermissionError:
+            return False  # Still mapped (Windows); a later pass removes it
+        return True
+
+    def _scan(self):
+        """Return (entries, total_bytes) for published entries, removing stale temporary files"""
+        now = time.time()
+        entries = []
+        total = 0
+        try:
+            iterator = os.scandir(self.cache_dir)
+        except FileNotFoundError:
+            return entries, total
+        with iterator:
+            for entry in iterator:
+                try:
+                    if not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                if self.TEMP_MARKER in entry.name:
+                    if now - stat.st_mtime > self.STALE_TEMP_AGE:
+                        self._discard(entry.path)
+                    continue
+                if entry.name.endswith(self.SUFFIX):
+                    entries.append((stat.st_mtime, stat.st_size, Path(entry.path)))
+                    total += stat.st_size
+        return entries, total
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits its budget"""
+        entries, total = self._scan()
+        if total > self.max_bytes:
+            cutoff = time.time() - self.MIN_EVICT_AGE
+            entries.sort()  # Oldest mtime first
+            for mtime, size, path in entries:
+                if total <= self.max_bytes or mtime > cutoff:
+                    break
+                if self._discard(path):
+                    total -= size
+        self._approx_bytes = total
+        return total
+
+    def clear(self):
+        """Remove every entry from the cache"""
+        entries, _ = self._scan()
+        for _, _, path in entries:
+            self._discard(path)
+        self._approx_bytes = 0
+
+    def stats(self):
+        entries, total = self._scan()
+        with self._lock:
+            mapped = len(self._open)
+        return {'entries': len(entries), 'bytes': total, 'max_bytes': self.max_bytes, 'mapped': mapped}
@@ -0,0 +1,220 @@
+"""Block-by-block decoding for analysing long audio in bounded memory.
+
+A PcmStream yields a clip as (frames, channels) int16 arrays of at most
+block_frames frames, so a pass over an hour of audio holds a single block
+of samples at a time instead of the whole decoded clip. PCM WAV is read
+directly; other formats are decoded by an ffmpeg process writing WAV to a
+pipe. Every iteration decodes the clip again, so passes over the same clip
+should share one stream (see ``analyze``).
+"""
+import io
+import math
+import struct
+import subprocess
+import threading
+
+import numpy as np
+
+from utils import audio_format
+from utils.decoded_audio import source_bytes
+
+# Frames per block (a multiple of peaks.BASE_BLOCK, so blocks never split a peak block)
+BLOCK_FRAMES = 64 * 1024
+# Data chunk sizes that mean "until the end of the stream" (ffmpeg writing to a pipe, RF64)
+_OPEN_ENDED = (0, 0xFFFFFFFF)
+_WAVE_FORMAT_PCM = 1
+# Bytes of ffmpeg's error output kept for the exception message
+_STDERR_TAIL = 8192
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+def _read_wav_header(f):
+    """(channels, frame_rate, sample_width, data_size) of an integer PCM WAV stream, leaving f
+    at the first sample; None if f holds anything else. data_size is None when open-ended.
+    """
+    riff = f.read(12)
+    if len(riff) < 12 or riff[:4] not in (b'RIFF', b'RF64') or riff[8:12] != b'WAVE':
+        return None
+    fmt = None
+    while True:
+        chunk = f.read(8)
+        if len(chunk) < 8:
+            return None
+        chunk_id, size = chunk[:4], struct.unpack('<I', chunk[4:])[0]
+        if chunk_id == b'data':
+            if fmt is None:
+                return None
+            return fmt + (None if size in _OPEN_ENDED else size,)
+        body = f.read(size + (size & 1))
+        if chunk_id == b'fmt ':
+            if len(body) < 16:
+                return None
+            tag, channels, frame_rate, _, _, bits = struct.unpack_from('<HHIIHH', body)
+            if tag == _WAVE_FORMAT_EXTENSIBLE and len(body) >= 26:
+                tag = struct.unpack_from('<H', body, 24)[0]  # First field of the subformat GUID
+            if tag != _WAVE_FORMAT_PCM or bits not in (8, 16, 32) or not channels:
+                return None  # Float, compressed or 24-bit: ffmpeg converts these
+            fmt = (channels, frame_rate, bits // 8)
+
+
+def _to_int16(samples, sample_width):
+    if sample_width == 1:
+        return (samples.astype(np.int16) - 128) << 8  # 8-bit WAV is unsigned
+    if sample_width == 4:
+        return (samples >> 16).astype(np.int16)
+    return samples
+
+
+class PcmStream:
+    """Decoded int16 blocks of a file path, AudioBuffer or bytes.
+
+    Use as a context manager, or iterate to the end, so an ffmpeg process
+    stopped early is cleaned up.
+    """
+
+    def __init__(self, source, block_frames=BLOCK_FRAMES):
+        self.block_frames = block_frames
+        self._process = None
+        self._stderr = bytearray()
+        self._stderr_thread = None
+        data = source_bytes(source)
+        self._file = io.BytesIO(data) if data is not None else open(source, 'rb')
+        header = _read_wav_header(self._file)
+        if header is None:
+            self._file.close()
+            self._file = None
+            header = self._start_ffmpeg(source, data)
+        self.channels, self.frame_rate, self.sample_width, self._data_size = header
+
+    def _start_ffmpeg(self, source, data):
+        ffmpeg = audio_format.ffmpeg_path()
+        if ffmpeg is None:
+            raise RuntimeError("ffmpeg is required to decode audio but was not found")
+        command = [ffmpeg, '-loglevel', 'error', '-i', 'pipe:0' if data is not None else str(source),
+                   '-vn', '-c:a', 'pcm_s16le', '-f', 'wav', 'pipe:1']
+        if data is None:
+            command.insert(1, '-nostdin')
+        self._process = subprocess.Popen(
+            command, stdin=subprocess.PIPE if data is not None else subprocess.DEVNULL,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        # Drained all along: a chatty ffmpeg would otherwise block on a full stderr pipe
+        self._stderr_thread = threading.Thread(
+            target=self._drain_stderr, args=(self._process.stderr,), name="pcm-stream-stderr", daemon=True
+        )
+        self._stderr_thread.start()
+        if data is not None:
+            threading.Thread(target=self._feed, args=(data,), name="pcm-stream-feed", daemon=True).start()
+        header = _read_wav_header(self._process.stdout)
+        if header is None:
+            self._finish()  # Raises ffmpeg's own error if it failed
+            raise RuntimeError("ffmpeg produced no audio")
+        return header
+
+    def _feed(self, data):
+        try:
+            self._process.stdin.write(data)
+        except (BrokenPipeError, OSError):
+            pass  # ffmpeg stopped reading: finished early or failed, reported by _finish
+        finally:
+            try:
+                self._process.stdin.close()
+            except OSError:
+                pass
+
+    def _drain_stderr(self, stderr):
+        for chunk in iter(lambda: stderr.read1(4096), b''):
+            self._stderr += chunk
+            del self._stderr[:-_STDERR_TAIL]
+
+    def __iter__(self):
+        reader = self._file if self._process is None else self._process.stdout
+        frame_bytes = self.channels * self.sample_width
+        dtype = {1: 'u1', 2: '<i2', 4: '<i4'}[self.sample_width]
+        remaining = self._data_size
+        try:
+            while remaining is None or remaining > 0:
+                wanted = self.block_frames * frame_bytes
+                if remaining is not None:
+                    wanted = min(wanted, remaining)
+                chunk = reader.read(wanted)
+                usable = len(chunk) - len(chunk) % frame_bytes
+                if usable:
+                    samples = np.frombuffer(chunk, dtype, usable // self.sample_width)
+                    yield _to_int16(samples, self.sample_width).reshape(-1, self.channels)
+                if len(chunk) < wanted:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+            self._finish()
+        finally:
+            self.close()
+
+    def _finish(self):
+        """Wait for ffmpeg and raise if it failed"""
+        if self._process is None:
+            return
+        process, self._process = self._process, None
+        process.wait()
+        self._stderr_thread.join()
+        process.stdout.close()
+        process.stderr.close()
+        if process.returncode != 0:
+            raise RuntimeError(f"ffmpeg failed: {self._stderr.decode('utf-8', 'replace').strip()}")
+
+    def close(self):
+        """Release the file, or stop ffmpeg if the stream wasn't read to the end"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._process is not None:
+            process, self._process = self._process, None
+            if process.poll() is None:
+                process.kill()
+            process.wait()
+            self._stderr_thread.join()
+            process.stdout.close()
+            process.stderr.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class LevelMeter:
+    """Streaming loudness pass: RMS and peak level of a clip in dBFS"""
+
+    def __init__(self):
+        self.frames = 0
+        self._sum_squares = 0.0
+        self._peak = 0
+
+    def feed(self, block):
+        samples = block.ravel().astype(np.float64)
+        self._sum_squares += float(np.dot(samples, samples))
+        self._peak = max(self._peak, int(np.abs(samples).max(initial=0)))
+        self.frames += len(block)
+
+    def result(self, frame_rate, channels):
+        count = self.frames * channels
+        rms = math.sqrt(self._sum_squares / count) if count else 0.0
+        return {
+            'duration_ms': round(1000 * self.frames / frame_rate) if frame_rate else 0,
+            'rms_dbfs': 20 * math.log10(rms / 32768) if rms else float('-inf'),
+            'peak_dbfs': 20 * math.log10(self._peak / 32768) if self._peak else float('-inf'),
+        }
+
+
+def analyze(source, *passes, block_frames=BLOCK_FRAMES):
+    """Run every pass (objects with a feed(block) method) over one decode of source.
+
+    Returns the stream, whose frame_rate and channels the passes' results
+    need.
+    """
+    with PcmStream(source, block_frames) as stream:
+        for block in stream:
+            for analysis in passes:
+                analysis.feed(block)
+    return stream
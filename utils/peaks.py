@@ -0,0 +1,178 @@
+"""Min/max peak pyramid for drawing waveforms at any zoom level.
+
+Level 0 holds the lowest and highest sample of every BASE_BLOCK frames,
+across all channels; each further level halves the resolution. Drawing
+``width`` columns uses the coarsest level that still has a block for
+every column, so it reads fewer than 2 * width blocks however long the
+clip is. A pyramid is saved next to its audio as ``<file>.peaks`` and
+is only valid for the file size and mtime it was built from.
+"""
+import os
+import struct
+import uuid
+
+import numpy as np
+
+# Frames summarized by one level-0 block
+BASE_BLOCK = 256
+# Levels are added until one has this few blocks
+MIN_LEVEL_BLOCKS = 16
+SIDECAR_SUFFIX = ".peaks"
+
+_MAGIC = b"CHPK"
+_VERSION = 1
+# magic, version, frame rate, base block, frames, source size, source mtime (ns), level count
+_HEADER = struct.Struct("<4sBIIQQqB")
+
+
+def sidecar_path(audio_path):
+    return f"{audio_path}{SIDECAR_SUFFIX}"
+
+
+def _to_int16(values, sample_width):
+    """Rescale peaks of 8/16/32-bit samples to int16"""
+    if sample_width == 1:
+        return values.astype(np.int16) << 8
+    if sample_width == 4:
+        return (values >> 16).astype(np.int16)
+    return values.astype(np.int16)
+
+
+def block_peaks(samples, sample_width=2, base_block=BASE_BLOCK):
+    """(blocks, 2) int16 min/max of every base_block frames of a (frames, channels) array.
+
+    The last block may be shorter. Reductions run over a reshaped view, no
+    per-sample Python work and no copy of the samples.
+    """
+    frames = len(samples)
+    flat = samples.reshape(frames, -1)
+    full = frames // base_block
+    # Explicit row length: -1 can't be inferred when there is no full block
+    body = flat[:full * base_block].reshape(full, base_block * flat.shape[1])
+    mins, maxs = body.min(axis=1), body.max(axis=1)
+    if frames > full * base_block:
+        tail = flat[full * base_block:]
+        mins = np.append(mins, tail.min())
+        maxs = np.append(maxs, tail.max())
+    return np.stack([_to_int16(mins, sample_width), _to_int16(maxs, sample_width)], axis=1)
+
+
+def _build_levels(base):
+    levels = [base]
+    while len(levels[-1]) > MIN_LEVEL_BLOCKS:
+        previous = levels[-1]
+        if len(previous) % 2:
+            previous = np.concatenate([previous, previous[-1:]])
+        pairs = previous.reshape(-1, 2, 2)
+        levels.append(np.stack([pairs[:, :, 0].min(axis=1), pairs[:, :, 1].max(axis=1)], axis=1))
+    return levels
+
+
+class PeakPyramid:
+    """Peak levels of one clip; level n has one (min, max) int16 row per base_block << n frames"""
+
+    def __init__(self, levels, frame_rate, frames, base_block=BASE_BLOCK):
+        self.levels = levels
+        self.frame_rate = frame_rate
+        self.frames = frames
+        self.base_block = base_block
+
+    @classmethod
+    def from_samples(cls, samples, frame_rate, sample_width=2, base_block=BASE_BLOCK):
+        """Build from a (frames, channels) integer sample array"""
+        if len(samples) == 0:
+            return cls([np.zeros((0, 2), np.int16)], frame_rate, 0, base_block)
+        return cls(_build_levels(block_peaks(samples, sample_width, base_block)), frame_rate, len(samples), base_block)
+
+    @classmethod
+    def from_blocks(cls, base, frame_rate, frames, base_block=BASE_BLOCK):
+        """Build from level-0 rows computed elsewhere, e.g. block by block while streaming"""
+        return cls(_build_levels(base), frame_rate, frames, base_block)
+
+    @property
+    def nbytes(self):
+        return sum(level.nbytes for level in self.levels)
+
+    def minmax(self, width, start=0, end=None):
+        """(width, 2) float32 min/max in [-1, 1] of frames start..end, one row per column"""
+        end = self.frames if end is None else min(end, self.frames)
+        start = max(0, min(start, end))
+        if width <= 0 or end <= start or not len(self.levels[0]):
+            return np.zeros((max(width, 0), 2), np.float32)
+
+        # Coarsest level that still has at least one block per column
+        level = 0
+        while (level + 1 < len(self.levels)
+               and (end - start) // (self.base_block << (level + 1)) >= width):
+            level += 1
+        data = self.levels[level]
+        block = self.base_block << level
+        first = start // block
+        last = min(-(-end // block), len(data))
+        span = data[first:last]
+
+        # First block of each column; a column narrower than a block repeats it
+        column_starts = start + (np.arange(width, dtype=np.int64) * (end - start)) // width
+        indices = np.minimum(column_starts // block - first, len(span) - 1)
+        mins = np.minimum.reduceat(span[:, 0], indices)
+        maxs = np.maximum.reduceat(span[:, 1], indices)
+        return np.stack([mins, maxs], axis=1).astype(np.float32) / 32768.0
+
+    def save(self, path, source_stat):
+        """Write the pyramid to path, tagged with the source's size and mtime"""
+        header = _HEADER.pack(_MAGIC, _VERSION, self.frame_rate, self.base_block, self.frames,
+                              source_stat.st_size, source_stat.st_mtime_ns, len(self.levels))
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                f.write(header)
+                f.write(np.array([len(level) for level in self.levels], dtype="<u8").tobytes())
+                for level in self.levels:
+                    f.write(level.astype("<i2").tobytes())
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    @classmethod
+    def load(cls, path, source_stat):
+        """Read a pyramid written by save; None if missing, damaged or built from another version of the source"""
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            magic, version, frame_rate, base_block, frames, size, mtime, count = _HEADER.unpack_from(data)
+            if (magic != _MAGIC or version != _VERSION
+                    or size != source_stat.st_size or mtime != source_stat.st_mtime_ns):
+                return None
+            offset = _HEADER.size
+            lengths = np.frombuffer(data, "<u8", count, offset)
+            offset += lengths.nbytes
+            levels = []
+            for length in lengths:
+                level = np.frombuffer(data, "<i2", int(length) * 2, offset).reshape(-1, 2)
+                offset += level.nbytes
+                levels.append(level)
+        except (OSError, struct.error, ValueError):
+            return None
+        return cls(levels, frame_rate, frames, base_block)
+
+
+class PeakBuilder:
+    """Streaming waveform pass: collects level-0 rows block by block (see pcm_stream.analyze).
+
+    Blocks must be whole multiples of base_block frames, except the last.
+    """
+
+    def __init__(self, base_block=BASE_BLOCK):
+        self.base_block = base_block
+        self.frames = 0
+        self._rows = []
+
+    def feed(self, block):
+        self._rows.append(block_peaks(block, 2, self.base_block))
+        self.frames += len(block)
+
+    def result(self, frame_rate):
+        if not self._rows:
+            return PeakPyramid([np.zeros((0, 2), np.int16)], frame_rate, 0, self.base_block)
+        return PeakPyramid.from_blocks(np.concatenate(self._rows), frame_rate, self.frames, self.base_block)
@@ -1,30 +1,21 @@
-import multiprocessing as mp
-import json
 import os
-from pathlib import Path
+import time
+
+from services.registry import create_service
+from utils import tracing
 
 class ProcessManager:
     """Manages multiprocessing operations for CPU-intensive tasks"""
 
     @staticmethod
-    def run_tts_generation(provider_name, text, output_path, voice, rate, pitch, result_queue):
-        """Run TTS generation in a separate process"""
+    def run_tts_generation(provider, text, output_path, voice, rate, pitch):
+        """Run TTS generation in a worker process and return a result dict.
+
+        provider is a registered provider name or a ProviderSpec.
+        """
         try:
-            service = None
-            # Import services here to avoid circular imports
-            if provider_name == 'gtts':
-                from services.gtts_service import GTTSService
-                service = GTTSService()
-            elif provider_name == 'edge_tts':
-                from services.edge_tts_service import EdgeTTSService
-                service = EdgeTTSService()
-                # Rate conversion is handled within EdgeTTSService.synthesize now
-            elif provider_name == 'pyttsx3':
-                from services.pyttsx3_service import Pyttsx3Service
-                service = Pyttsx3Service()
-            else:
-                result_queue.put({"error": f"Unknown provider: {provider_name}"})
-                return
+            # The service module is only imported here, inside the worker
+            service = create_service(provider)
 
             # Generate audio
             # Pass the original float rate; the service handles specific formatting if needed
@@ -32,34 +23,58 @@ class ProcessManager:
 
             # Check if file exists
             if os.path.exists(output_path):
-                result_queue.put({"path": output_path})
-            else:
-                result_queue.put({"error": f"Failed to generate audio at {output_path}"})
+                return {"path": output_path}
+            return {"error": f"Failed to generate audio at {output_path}"}
         except Exception as e:
-            result_queue.put({"error": str(e)})
+            return {"error": str(e)}
 
     @staticmethod
-    def run_voice_loading(provider_name, result_queue):
-        """Load voices for a provider in a separate process"""
+    def run_voice_loading(provider):
+        """Load voices for a provider in a worker process and return a result dict.
+
+        provider is a registered provider name or a ProviderSpec.
+        """
         try:
-            service = None
-            # Import services here
-            if provider_name == 'gtts':
-                from services.gtts_service import GTTSService
-                service = GTTSService()
-            elif provider_name == 'edge_tts':
-                from services.edge_tts_service import EdgeTTSService
-                service = EdgeTTSService()
-            elif provider_name == 'pyttsx3':
-                from services.pyttsx3_service import Pyttsx3Service
-                service = Pyttsx3Service()
-            else:
-                result_queue.put({"error": f"Unknown provider: {provider_name}"})
-                return
+            service = create_service(provider)
 
             # Get voices
             voices = service.get_voices()
-            result_queue.put({"voices": voices})
+            return {"voices": voices}
 
         except Exception as e:
-            result_queue.put({"error": str(e)})
\ No newline at end of file
+            return {"error": str(e)}
+
+    @staticmethod
+    def run_pyttsx3_worker(conn):
+        """Long-lived pyttsx3 worker: initialize the engine once, then serve jobs from a pipe"""
+        try:
+            service = create_service('pyttsx3')
+        except Exception as e:
+            conn.send(('init_error', None, str(e)))
+            return
+
+        conn.send(('ready', None, None))
+        while True:
+            try:
+                job = conn.recv()
+            except (EOFError, OSError):
+                break
+            if job is None:
+                # Pool asked this worker to retire
+                break
+
+            job_id, text, output_path, voice, rate, pitch, trace = job
+            try:
+                started = time.time()
+                service.synthesize(text, output_path, voice, rate, pitch)
+                if trace:
+                    # Tracing lives in the parent process, send the span back to it
+                    conn.send(('spans', job_id, [tracing.make_event(
+                        'pyttsx3.synthesize', started, time.time(), trace, chars=len(text)
+                    )]))
+                if os.path.exists(output_path):
+                    conn.send(('ok', job_id, output_path))
+                else:
+                    conn.send(('error', job_id, f"Failed to generate audio at {output_path}"))
+            except Exception as e:
+                conn.send(('error', job_id, str(e)))
\ No newline at end of file
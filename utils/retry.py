@@ -0,0 +1,113 @@
+import random
+import threading
+import time
+from collections import deque
+
+# Error classes returned by classify_error
+TRANSIENT = 'transient'
+RATE_LIMITED = 'rate_limited'
+PERMANENT = 'permanent'
+
+# Exception class names (anywhere in the MRO) that mean a network hiccup
+_TRANSIENT_NAMES = ('Timeout', 'Connection', 'Disconnected', 'NoAudioReceived', 'WebSocketError')
+
+
+def _status_code(error):
+    """HTTP status attached to a provider error, if any"""
+    # Not "or": a requests.Response with an error status is falsy
+    response = getattr(error, 'rsp', None)
+    if response is None:
+        response = getattr(error, 'response', None)
+    status = getattr(response, 'status_code', None) or getattr(error, 'status', None)
+    return status if isinstance(status, int) else None
+
+
+def classify_error(error):
+    """Sort a provider exception into TRANSIENT, RATE_LIMITED or PERMANENT"""
+    status = _status_code(error)
+    if status == 429:
+        return RATE_LIMITED
+    if status is not None:
+        return TRANSIENT if status >= 500 or status == 408 else PERMANENT
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return TRANSIENT
+    if any(name in cls.__name__ for cls in type(error).__mro__ for name in _TRANSIENT_NAMES):
+        return TRANSIENT
+    # gTTS reports "Failed to connect" as a gTTSError without a response
+    if hasattr(error, 'rsp') and error.rsp is None:
+        return TRANSIENT
+    return PERMANENT
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter; rate-limit errors back off longer"""
+
+    def __init__(self, max_attempts=3, base_delay=0.5, max_delay=8.0, rate_limit_delay=2.0):
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.rate_limit_delay = rate_limit_delay
+
+    # Keys of the "retry" config section
+    SETTINGS = ('max_attempts', 'base_delay', 'max_delay', 'rate_limit_delay')
+
+    @classmethod
+    def from_config(cls, settings):
+        """Policy from the "retry" config section; unknown keys are reported and ignored"""
+        settings = dict(settings or {})
+        unknown = sorted(set(settings) - set(cls.SETTINGS))
+        if unknown:
+            print(f"Ignoring unknown retry settings: {', '.join(unknown)}")
+        return cls(**{key: value for key, value in settings.items() if key in cls.SETTINGS})
+
+    def delay(self, attempt, kind):
+        """Seconds to sleep before retry number ``attempt`` (1-based)"""
+        base = self.rate_limit_delay if kind == RATE_LIMITED else self.base_delay
+        return random.uniform(0, min(self.max_delay, base * 2 ** (attempt - 1)))
+
+
+def call_with_retry(fn, policy, should_retry=None, description="request", cancel_token=None):
+    """Call fn() until it succeeds, retrying transient and rate-limit errors.
+
+    should_retry(error) can veto a retry, e.g. once audio was already
+    streamed to listeners. The last error is re-raised. A cancelled
+    cancel_token ends the backoff early with OperationCancelled.
+    """
+    attempt = 1
+    while True:
+        try:
+            return fn()
+        except Exception as e:
+            kind = classify_error(e)
+            if (kind == PERMANENT or attempt >= policy.max_attempts
+                    or (should_retry is not None and not should_retry(e))):
+                raise
+            delay = policy.delay(attempt, kind)
+            print(f"{description} failed ({kind}: {e}), retry {attempt}/{policy.max_attempts - 1} "
+                  f"in {delay:.2f}s")
+            if cancel_token is not None:
+                cancel_token.sleep(delay)
+            else:
+                time.sleep(delay)
+            attempt += 1
+
+
+class LatencyTracker:
+    """Recent successful request durations, used to decide when to hedge"""
+
+    def __init__(self, size=200, min_samples=20):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self.min_samples = min_samples
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, fraction):
+        """Observed latency at the given fraction, or None until there are enough samples"""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
@@ -0,0 +1,231 @@
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from utils.cancellation import cancel_future
+
+# Priority lanes, highest priority first
+LANES = ('interactive', 'batch')
+
+
+class TokenBucket:
+    """Request-rate limiter: ``rate`` tokens per second, holding at most ``burst``"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, now=None):
+        """Take a token if one is available; otherwise return seconds until the next one"""
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+
+class ScheduledJob:
+    """A job waiting for (or holding) a provider slot"""
+
+    def __init__(self, provider, lane, seq, fn, args):
+        self.provider = provider
+        self.lane = lane
+        self.seq = seq
+        self.fn = fn
+        self.args = args
+        self.future = Future()
+        self.queued_at = time.monotonic()
+        self.dispatched = False  # Left the queue, either started or cancelled
+        self.throttled = False
+
+    def cancel(self):
+        """Drop the job if it has not been dispatched yet"""
+        return cancel_future(self.future)
+
+
+class _ProviderQueue:
+    """Per-provider limits, queued jobs and counters"""
+
+    def __init__(self, max_concurrency, rate=None, burst=None):
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.heap = []
+        self.queued = dict.fromkeys(LANES, 0)
+        self.running = 0
+        self.completed = 0
+        self.throttled = 0  # Dispatches delayed by the rate limit
+        self.waits = deque(maxlen=200)  # Recent queue wait times in seconds
+
+    def push(self, job):
+        heapq.heappush(self.heap, (LANES.index(job.lane), job.seq, job))
+
+    def peek(self):
+        """Next queued job, dropping stale heap entries left behind by reprioritize/cancel"""
+        while self.heap:
+            lane_index, _, job = self.heap[0]
+            if job.dispatched or LANES[lane_index] != job.lane:
+                heapq.heappop(self.heap)
+                continue
+            return job
+        return None
+
+
+class ProviderScheduler:
+    """Central queue in front of the providers.
+
+    Each provider gets a maximum number of concurrently running jobs and an
+    optional token-bucket rate limit. Queued jobs are dispatched by lane
+    ('interactive' before 'batch'), then in submission order, and run on the
+    given executor. Providers without configured limits run unthrottled up to
+    ``default_concurrency`` jobs at a time.
+    """
+
+    def __init__(self, executor, limits=None, default_concurrency=4):
+        self._executor = executor
+        self._limits = limits or {}
+        self._default_concurrency = default_concurrency
+        self._queues = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="tts-scheduler", daemon=True)
+        self._thread.start()
+
+    def _queue(self, provider):
+        queue = self._queues.get(provider)
+        if queue is None:
+            limit = self._limits.get(provider, {})
+            queue = _ProviderQueue(
+                limit.get('max_concurrency', self._default_concurrency),
+                rate=limit.get('rate_per_sec'),
+                burst=limit.get('burst')
+            )
+            self._queues[provider] = queue
+        return queue
+
+    def submit(self, provider, fn, *args, lane='interactive'):
+        """Queue fn(*args) for a provider and return a ScheduledJob"""
+        if lane not in LANES:
+            raise ValueError(f"Unknown priority lane: {lane}")
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Scheduler has been shut down")
+            job = ScheduledJob(provider, lane, next(self._seq), fn, args)
+            queue = self._queue(provider)
+            queue.push(job)
+            queue.queued[lane] += 1
+            self._cond.notify()
+        job.future.add_done_callback(lambda f: f.cancelled() and self._remove(job))
+        return job
+
+    def _remove(self, job):
+        """Take a cancelled job out of the queue counts"""
+        with self._cond:
+            if not job.dispatched:
+                job.dispatched = True
+                self._queues[job.provider].queued[job.lane] -= 1
+
+    def reprioritize(self, job, lane):
+        """Move a queued job to a higher-priority lane (e.g. a UI request joined a batch job)"""
+        with self._cond:
+            if job.dispatched or job.future.done() or LANES.index(lane) >= LANES.index(job.lane):
+                return False
+            queue = self._queues[job.provider]
+            queue.queued[job.lane] -= 1
+            queue.queued[lane] += 1
+            job.lane = lane
+            queue.push(job)  # The entry in the old lane is skipped as stale
+            self._cond.notify()
+            return True
+
+    def stats(self):
+        """Queue depth per lane, running jobs and recent wait times per provider"""
+        with self._cond:
+            stats = {}
+            for provider, queue in self._queues.items():
+                waits = sorted(queue.waits)
+                stats[provider] = {
+                    'queued': dict(queue.queued),
+                    'running': queue.running,
+                    'max_concurrency': queue.max_concurrency,
+                    'rate_per_sec': queue.bucket.rate if queue.bucket else None,
+                    'completed': queue.completed,
+                    'throttled': queue.throttled,
+                    'wait_p50_ms': round(waits[len(waits) // 2] * 1000, 1) if waits else None,
+                    'wait_max_ms': round(waits[-1] * 1000, 1) if waits else None,
+                }
+            return stats
+
+    def shutdown(self):
+        """Stop dispatching and cancel every job still queued"""
+        with self._cond:
+            self._closed = True
+            for queue in self._queues.values():
+                heap, queue.heap = queue.heap, []
+                for _, _, job in heap:
+                    cancel_future(job.future)
+            self._cond.notify()
+
+    def _run(self):
+        with self._cond:
+            while not self._closed:
+                timeout = self._dispatch_ready()
+                self._cond.wait(timeout)
+
+    def _dispatch_ready(self):
+        """Start every job that has a free slot and a token; return how long to sleep"""
+        now = time.monotonic()
+        timeout = None
+        for queue in self._queues.values():
+            while queue.running < queue.max_concurrency:
+                job = queue.peek()
+                if job is None:
+                    break
+                if queue.bucket:
+                    delay = queue.bucket.try_acquire(now)
+                    if delay:
+                        if not job.throttled:
+                            job.throttled = True
+                            queue.throttled += 1
+                        timeout = delay if timeout is None else min(timeout, delay)
+                        break
+                heapq.heappop(queue.heap)
+                queue.queued[job.lane] -= 1
+                job.dispatched = True
+                if not job.future.set_running_or_notify_cancel():
+                    continue
+                queue.running += 1
+                queue.waits.append(now - job.queued_at)
+                try:
+                    self._executor.submit(self._execute, queue, job)
+                except RuntimeError as e:
+                    # Executor shut down underneath us
+                    queue.running -= 1
+                    job.future.set_exception(e)
+        return timeout
+
+    def _execute(self, queue, job):
+        result = error = None
+        try:
+            result = job.fn(*job.args)
+        except BaseException as e:
+            error = e
+        # Free the slot before waking the caller so the stats it reads are current
+        with self._cond:
+            queue.running -= 1
+            queue.completed += 1
+            self._cond.notify()
+        if error is not None:
+            job.future.set_exception(error)
+        else:
+            job.future.set_result(result)
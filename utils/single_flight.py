@@ -0,0 +1,194 @@
+import threading
+from concurrent.futures import Future, InvalidStateError
+
+from utils.cancellation import cancel_future
+
+
+class Flight:
+    """One in-flight job shared by every caller that asked for the same key.
+
+    The job reports back through ``resolve``/``fail`` and, for streaming
+    providers, ``publish``. Each attached caller holds a ``FlightTicket``;
+    the job is cancelled only when the last ticket is cancelled.
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self.future = Future()
+        self._lock = threading.Lock()
+        self._waiters = 0
+        self._canceller = None
+        self.job = None  # Scheduler entry of the underlying work, if any
+        self.trace = None  # Tracing job id of the underlying work
+        self.meta = {}  # Details recorded with the result in the audio index (provider, text hash)
+        self._abandoned = False
+        self._chunks = []
+        self._listeners = []
+
+    def set_canceller(self, canceller):
+        """Register how to stop the underlying work once nobody is waiting for it"""
+        with self._lock:
+            self._canceller = canceller
+            abandoned = self._abandoned
+        if abandoned and canceller:
+            canceller()
+
+    def publish(self, data):
+        """Pass a chunk of streamed audio to every attached listener"""
+        with self._lock:
+            self._chunks.append(data)
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(data)
+
+    def subscribe(self, listener):
+        """Receive every chunk published so far, then the live ones"""
+        with self._lock:
+            backlog = list(self._chunks)
+            self._listeners.append(listener)
+        for data in backlog:
+            listener(data)
+
+    def unsubscribe(self, listener):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def resolve(self, result):
+        """Complete the job; returns False if every caller already gave up on it"""
+        with self._lock:
+            self._chunks = []
+        try:
+            self.future.set_result(result)
+            return True
+        except InvalidStateError:
+            return False
+
+    def fail(self, error):
+        with self._lock:
+            self._chunks = []
+        try:
+            self.future.set_exception(error)
+            return True
+        except InvalidStateError:
+            return False
+
+
+class FlightTicket:
+    """A single caller's handle on a shared Flight.
+
+    The ticket has its own future mirroring the flight's, so a caller that
+    cancels stops waiting even while other callers keep the job running.
+    convert(result), if given, turns the flight's result into what this
+    caller wants; it may return a Future, whose outcome is then passed on.
+    """
+
+    def __init__(self, group, flight, listener=None, convert=None):
+        self._group = group
+        self.flight = flight
+        self._listener = listener
+        self._released = False
+        self.future = Future()
+        flight.future.add_done_callback(lambda source: self._copy(source, convert))
+
+    def _copy(self, source, convert=None):
+        try:
+            if source.cancelled():
+                cancel_future(self.future)
+            elif source.exception() is not None:
+                self.future.set_exception(source.exception())
+            elif convert is None:
+                self.future.set_result(source.result())
+            else:
+                try:
+                    result = convert(source.result())
+                except Exception as e:
+                    self.future.set_exception(e)
+                    return
+                if isinstance(result, Future):
+                    result.add_done_callback(self._copy)
+                else:
+                    self.future.set_result(result)
+        except InvalidStateError:
+            pass  # This caller already cancelled
+
+    def done(self):
+        return self.future.done()
+
+    def result(self, timeout=None):
+        return self.future.result(timeout)
+
+    def cancel(self):
+        """Stop waiting; the job itself is cancelled only if no other caller still wants it"""
+        if self._released:
+            return False
+        self._released = True
+        cancel_future(self.future)
+        if self._listener:
+            self.flight.unsubscribe(self._listener)
+        return self._group._release(self.flight)
+
+
+class SingleFlight:
+    """Coalesce concurrent requests for the same key into one job"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+        self.coalesced = 0  # Requests that attached to an already running job
+
+    def join(self, key, start, listener=None, convert=None):
+        """Attach to the in-flight job for key, or start it with start(flight).
+
+        start is called outside the lock and should return a callable that
+        cancels the underlying work (or None). Returns a FlightTicket, whose
+        result goes through convert (see FlightTicket).
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            created = flight is None
+            if created:
+                flight = Flight(key)
+                self._flights[key] = flight
+                flight.future.add_done_callback(lambda _: self._forget(key, flight))
+            else:
+                self.coalesced += 1
+            with flight._lock:
+                flight._waiters += 1
+
+        if listener:
+            flight.subscribe(listener)
+        if created:
+            try:
+                flight.set_canceller(start(flight))
+            except Exception as e:
+                flight.fail(e)
+        return FlightTicket(self, flight, listener, convert)
+
+    def _release(self, flight):
+        """Drop one waiter; cancel the job when it was the last one"""
+        with self._lock:
+            with flight._lock:
+                flight._waiters -= 1
+                if flight._waiters > 0 or flight.future.done():
+                    return False
+                flight._abandoned = True
+                canceller = flight._canceller
+            # Forget it right away so a new request starts a fresh job
+            if self._flights.get(flight.key) is flight:
+                del self._flights[flight.key]
+
+        cancel_future(flight.future)
+        if canceller:
+            canceller()
+        return True
+
+    def _forget(self, key, flight):
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    def in_flight(self):
+        """Number of distinct jobs currently running"""
+        with self._lock:
+            return len(self._flights)
@@ -0,0 +1,51 @@
+import re
+
+# Sentence end: terminal punctuation (latin and CJK) (plus closing quotes) followed by whitespace
+SENTENCE_END = re.compile(r'(?:(?<=[.!?;。！？])|(?<=[.!?;。！？]["\')\]”’]))\s+')
+PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+# Fallback split points for a single sentence that is too long
+CLAUSE_BREAK = re.compile(r'(?<=[,:、，])\s+')
+
+
+def _split_long(piece, max_chars):
+    """Split an over-long sentence at clause boundaries, then at whitespace"""
+    parts = []
+    for clause in CLAUSE_BREAK.split(piece):
+        while len(clause) > max_chars:
+            cut = clause.rfind(' ', 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+            parts.append(clause[:cut].strip())
+            clause = clause[cut:].strip()
+        if clause:
+            parts.append(clause)
+    return parts
+
+
+def split_text(text, max_chars=400):
+    """Split text into chunks of at most max_chars at paragraph and sentence boundaries.
+
+    Sentences are packed greedily into chunks; a chunk never spans a
+    paragraph break, so pauses between paragraphs are preserved.
+    """
+    chunks = []
+    for paragraph in PARAGRAPH_BREAK.split(text or ""):
+        paragraph = " ".join(paragraph.split())
+        if not paragraph:
+            continue
+
+        current = ""
+        for sentence in SENTENCE_END.split(paragraph):
+            sentence = sentence.strip()
+            if not sentence:
+                continue
+            pieces = [sentence] if len(sentence) <= max_chars else _split_long(sentence, max_chars)
+            for piece in pieces:
+                if current and len(current) + 1 + len(piece) > max_chars:
+                    chunks.append(current)
+                    current = piece
+                else:
+                    current = f"{current} {piece}" if current else piece
+        if current:
+            chunks.append(current)
+    return chunks
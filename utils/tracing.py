@@ -0,0 +1,192 @@
+"""Per-stage timing spans for the synthesis pipeline.
+
+Tracing is off by default. While it is off ``span()`` returns a shared
+no-op object and ``record()`` returns immediately, so instrumented code
+pays for little more than a function call.
+
+Enable it with the "tracing" config section or the CHUNTTS_TRACE
+environment variable (a file path; ``.json`` selects Chrome trace format,
+anything else JSONL). Spans carry a job id so one request can be followed
+across threads, and worker processes send theirs back through ``ingest``.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+import uuid
+
+# Flush to disk once this many spans are buffered
+FLUSH_EVERY = 1000
+
+_enabled = False
+_path = None
+_format = 'jsonl'
+_lock = threading.Lock()
+_buffer = []
+_named_threads = set()
+_chrome_started = False
+
+
+class _NullSpan:
+    """Stand-in returned by span() while tracing is disabled"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """Times a with-block and records it on exit"""
+
+    __slots__ = ('name', 'job', 'attrs', 'start')
+
+    def __init__(self, name, job, attrs):
+        self.name = name
+        self.job = job
+        self.attrs = attrs
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.attrs['error'] = exc_type.__name__
+        record(self.name, self.start, time.time(), self.job, **self.attrs)
+        return False
+
+    def set(self, **attrs):
+        """Attach extra attributes, e.g. the result size"""
+        self.attrs.update(attrs)
+
+
+def enabled():
+    return _enabled
+
+
+def configure(enabled=False, path=None, fmt=None):
+    """Turn tracing on or off; spans are appended to path as JSONL or Chrome trace events"""
+    global _enabled, _path, _format, _chrome_started
+    flush()
+    with _lock:
+        _path = str(path) if path else None
+        _format = fmt or ('chrome' if _path and _path.endswith('.json') else 'jsonl')
+        # Keep appending to the array of an existing Chrome trace file
+        _chrome_started = bool(_path and os.path.exists(_path) and os.path.getsize(_path))
+        _named_threads.clear()
+        _enabled = bool(enabled and _path)
+        if _enabled:
+            os.makedirs(os.path.dirname(os.path.abspath(_path)), exist_ok=True)
+    if _enabled:
+        print(f"Tracing enabled, writing {_format} spans to {_path}")
+
+
+def configure_from_config(config):
+    """Apply the "tracing" config section; CHUNTTS_TRACE=<path> overrides it"""
+    settings = (config.get("tracing", {}) if config is not None else {}) or {}
+    env_path = os.environ.get('CHUNTTS_TRACE')
+    if env_path:
+        configure(True, env_path)
+    elif settings.get('enabled'):
+        configure(True, settings.get('path', 'traces/trace.jsonl'), settings.get('format'))
+
+
+def new_job_id():
+    """Id used to group the spans of one request; None while tracing is disabled"""
+    return uuid.uuid4().hex[:12] if _enabled else None
+
+
+def span(name, job=None, **attrs):
+    """Context manager recording how long its block takes"""
+    if not _enabled:
+        return _NULL_SPAN
+    return Span(name, job, attrs)
+
+
+def make_event(name, start, end, job=None, **attrs):
+    """Span as a plain dict (picklable, so worker processes can send it back)"""
+    thread = threading.current_thread()
+    return {
+        'name': name,
+        'job': job,
+        'start': start,
+        'dur': end - start,
+        'pid': os.getpid(),
+        'tid': thread.ident,
+        'thread': thread.name,
+        'attrs': attrs,
+    }
+
+
+def record(name, start, end, job=None, **attrs):
+    """Record a span measured by the caller; start and end are time.time() values"""
+    if not _enabled:
+        return
+    ingest([make_event(name, start, end, job, **attrs)])
+
+
+def ingest(events):
+    """Add spans recorded elsewhere, e.g. in a worker process"""
+    if not _enabled or not events:
+        return
+    with _lock:
+        _buffer.extend(events)
+        full = len(_buffer) >= FLUSH_EVERY
+    if full:
+        flush()
+
+
+def _chrome_lines(events):
+    """Chrome trace 'X' events, plus a thread_name entry the first time a thread shows up"""
+    for event in events:
+        key = (event['pid'], event['tid'])
+        if key not in _named_threads:
+            _named_threads.add(key)
+            yield {'name': 'thread_name', 'ph': 'M', 'pid': event['pid'], 'tid': event['tid'],
+                   'args': {'name': event['thread']}}
+        yield {
+            'name': event['name'],
+            'cat': event['name'].split('.')[0],
+            'ph': 'X',
+            'ts': round(event['start'] * 1e6),
+            'dur': round(event['dur'] * 1e6),
+            'pid': event['pid'],
+            'tid': event['tid'],
+            'args': dict(event['attrs'], job=event['job']),
+        }
+
+
+def flush():
+    """Write buffered spans to the trace file"""
+    global _chrome_started
+    with _lock:
+        if not _buffer or not _path:
+            _buffer.clear()
+            return
+        events = list(_buffer)
+        _buffer.clear()
+        try:
+            with open(_path, 'a', encoding='utf-8') as f:
+                if _format == 'chrome':
+                    # JSON array format; Chrome and Perfetto accept it without the closing bracket
+                    for line in _chrome_lines(events):
+                        f.write(('[\n' if not _chrome_started else ',\n') + json.dumps(line, default=str))
+                        _chrome_started = True
+                else:
+                    for event in events:
+                        f.write(json.dumps(event, default=str) + '\n')
+        except OSError as e:
+            print(f"Error writing trace file: {e}")
+
+
+atexit.register(flush)
@@ -0,0 +1,46 @@
+import json
+import os
+import time
+import uuid
+from pathlib import Path
+
+
+class VoiceCatalogCache:
+    """Per-provider voice lists persisted as JSON with a time-to-live"""
+
+    def __init__(self, cache_dir, ttl_seconds=24 * 3600):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+
+    def _path(self, provider):
+        return self.cache_dir / f"{provider}.json"
+
+    def load(self, provider):
+        """Return (voices, fetched_at) for a provider, or (None, None) if nothing is cached"""
+        try:
+            with open(self._path(provider), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data['voices'], data['fetched_at']
+        except (OSError, ValueError, KeyError) as e:
+            if not isinstance(e, FileNotFoundError):
+                print(f"Ignoring unreadable voice cache for {provider}: {e}")
+            return None, None
+
+    def save(self, provider, voices):
+        """Write a provider's voice list, replacing the previous one atomically"""
+        path = self._path(provider)
+        temp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'fetched_at': time.time(), 'voices': voices}, f)
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"Error saving voice cache for {provider}: {e}")
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+    def is_fresh(self, fetched_at):
+        return fetched_at is not None and time.time() - fetched_at < self.ttl_seconds
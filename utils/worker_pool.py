@@ -0,0 +1,298 @@
+import itertools
+import multiprocessing as mp
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from multiprocessing.connection import wait
+
+from utils.cancellation import OperationCancelled
+from utils.process_manager import ProcessManager
+from utils import tracing
+
+
+class _Worker:
+    """Bookkeeping for one pool process"""
+
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+        self.ready = False      # Engine initialized and waiting for work
+        self.job = None         # (job_id, args, future, attempts) while busy
+        self.retiring = False   # Will be told to exit once idle
+        self.spawned_at = time.time()
+
+
+class Pyttsx3WorkerPool:
+    """Pool of long-lived processes that each keep an initialized pyttsx3 engine.
+
+    Jobs are dispatched over pipes by a background thread which also watches
+    the worker processes, replacing any that crash. ``submit`` returns a
+    ``concurrent.futures.Future`` that resolves to the output path.
+    """
+
+    # Give up respawning after this many workers in a row fail to initialize
+    MAX_INIT_FAILURES = 3
+
+    def __init__(self, size=1, max_retries=1):
+        self._ctx = mp.get_context()
+        self._lock = threading.Lock()
+        self._pending = deque()
+        self._workers = []
+        self._target_size = max(1, int(size))
+        self._max_retries = max_retries
+        self._job_ids = itertools.count()
+        self._init_failures = 0
+        self._closed = False
+
+        # Self-pipe used to wake the dispatcher when jobs arrive or the pool is resized
+        self._wake_reader, self._wake_writer = mp.Pipe(duplex=False)
+        self._wake_lock = threading.Lock()
+        self._wake_pending = False  # A wake-up is in the pipe and not yet drained
+
+        with self._lock:
+            self._adjust_workers()
+        self._thread = threading.Thread(target=self._run, name="pyttsx3-pool", daemon=True)
+        self._thread.start()
+
+    # --- Public API ---
+
+    def submit(self, text, output_path, voice=None, rate=1.0, pitch=1.0, trace=None):
+        """Queue a synthesis job and return a Future resolving to the output path.
+
+        With a tracing job id the worker reports its spans back to this process.
+        """
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("pyttsx3 worker pool has been shut down")
+            self._init_failures = 0  # A new job gets a fresh chance to spawn workers
+            job_id = next(self._job_ids)
+            self._pending.append((job_id, (text, output_path, voice, rate, pitch, trace), future, 0))
+        self._wake()
+        return future
+
+    def cancel(self, future):
+        """Cancel a job. A job that is already running is stopped by terminating
+        its worker process, which the pool then replaces.
+        """
+        if future.cancel():
+            return True  # Still queued, the dispatcher skips it
+        with self._lock:
+            victim = next((w for w in self._workers if w.job is not None and w.job[2] is future), None)
+            if victim is not None:
+                victim.job = None
+                victim.retiring = True  # A replacement is spawned right away
+                victim.process.terminate()
+            else:
+                # A crashed job queued again for retry
+                entry = next((job for job in self._pending if job[2] is future), None)
+                if entry is None:
+                    return False
+                self._pending.remove(entry)
+        if not future.done():
+            future.set_exception(OperationCancelled("pyttsx3 job was cancelled"))
+        self._wake()
+        return True
+
+    def resize(self, size):
+        """Change the number of worker processes"""
+        with self._lock:
+            self._target_size = max(1, int(size))
+        self._wake()
+
+    def queue_depth(self):
+        """Number of jobs waiting for a free worker"""
+        with self._lock:
+            return len(self._pending)
+
+    def stats(self):
+        """Snapshot of pool state"""
+        with self._lock:
+            live = [w for w in self._workers if not w.retiring]
+            return {
+                'workers': len(live),
+                'ready': sum(1 for w in live if w.ready),
+                'busy': sum(1 for w in self._workers if w.job is not None),
+                'queued': len(self._pending),
+                'target_size': self._target_size,
+            }
+
+    def shutdown(self, timeout=2.0):
+        """Stop all workers and fail any jobs still waiting"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            pending = list(self._pending)
+            self._pending.clear()
+        for _, _, future, _ in pending:
+            if not future.done():
+                future.set_exception(RuntimeError("pyttsx3 worker pool shut down"))
+        self._wake()
+        self._thread.join(timeout)
+
+    # --- Dispatcher thread ---
+
+    def _wake(self):
+        # At most one wake-up is ever in the pipe, so sending can't block on a full buffer
+        with self._wake_lock:
+            if self._wake_pending:
+                return
+            self._wake_pending = True
+            try:
+                self._wake_writer.send_bytes(b"x")
+            except OSError:
+                pass
+
+    def _spawn_worker(self):
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(
+            target=ProcessManager.run_pyttsx3_worker,
+            args=(child_conn,),
+            daemon=True
+        )
+        process.start()
+        child_conn.close()  # The child owns its end now
+        self._workers.append(_Worker(process, parent_conn))
+
+    def _adjust_workers(self):
+        """Spawn or retire workers to match the target size (lock held)"""
+        live = [w for w in self._workers if not w.retiring]
+        if len(live) < self._target_size and self._init_failures < self.MAX_INIT_FAILURES:
+            for _ in range(self._target_size - len(live)):
+                self._spawn_worker()
+        elif len(live) > self._target_size:
+            # Retire idle workers first, busy ones finish their current job
+            surplus = sorted(live, key=lambda w: w.job is not None)[:len(live) - self._target_size]
+            for worker in surplus:
+                worker.retiring = True
+
+        for worker in self._workers:
+            if worker.retiring and worker.job is None:
+                self._send(worker, None)
+
+    def _send(self, worker, message):
+        try:
+            worker.conn.send(message)
+            return True
+        except OSError:
+            # Broken pipe, the sentinel will report the dead process
+            return False
+
+    def _dispatch(self):
+        """Hand queued jobs to idle workers (lock held)"""
+        for worker in self._workers:
+            if not self._pending:
+                break
+            if not worker.ready or worker.retiring or worker.job is not None:
+                continue
+            while self._pending:
+                job_id, args, future, attempts = self._pending.popleft()
+                # Skip jobs cancelled while queued; retried jobs are already running
+                if attempts == 0 and not future.set_running_or_notify_cancel():
+                    continue
+                worker.job = (job_id, args, future, attempts)
+                self._send(worker, (job_id,) + args)
+                break
+
+    def _handle_message(self, worker, message):
+        kind, job_id, payload = message
+        if kind == 'ready':
+            worker.ready = True
+            self._init_failures = 0
+            tracing.record('pyttsx3.spawn', worker.spawned_at, time.time(), pid=worker.process.pid)
+        elif kind == 'spans':
+            tracing.ingest(payload)
+        elif kind == 'init_error':
+            self._init_failures += 1
+            print(f"pyttsx3 worker failed to initialize: {payload}")
+            if self._init_failures >= self.MAX_INIT_FAILURES:
+                # Nothing will ever run, fail the queue instead of hanging forever
+                while self._pending:
+                    _, _, future, attempts = self._pending.popleft()
+                    if attempts or future.set_running_or_notify_cancel():
+                        future.set_exception(RuntimeError(f"pyttsx3 engine unavailable: {payload}"))
+        elif worker.job is not None and worker.job[0] == job_id:
+            future = worker.job[2]
+            worker.job = None
+            if kind == 'ok':
+                future.set_result(payload)
+            else:
+                future.set_exception(RuntimeError(payload))
+            if worker.retiring:
+                self._send(worker, None)
+
+    def _reap(self, worker):
+        """Forget a dead worker, retrying or failing the job it was running (lock held)"""
+        worker.process.join(0)
+        exitcode = worker.process.exitcode
+        if worker in self._workers:
+            self._workers.remove(worker)
+        try:
+            worker.conn.close()
+        except OSError:
+            pass
+
+        if worker.job is not None:
+            job_id, args, future, attempts = worker.job
+            worker.job = None
+            if attempts < self._max_retries and not self._closed:
+                print(f"pyttsx3 worker crashed (exit code {exitcode}), retrying job {job_id}")
+                self._pending.appendleft((job_id, args, future, attempts + 1))
+            else:
+                future.set_exception(RuntimeError(f"pyttsx3 worker crashed (exit code {exitcode})"))
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if self._closed:
+                    break
+                by_conn = {w.conn: w for w in self._workers}
+                by_sentinel = {w.process.sentinel: w for w in self._workers}
+            ready = wait([self._wake_reader] + list(by_conn) + list(by_sentinel))
+
+            with self._lock:
+                for obj in ready:
+                    if obj is self._wake_reader:
+                        with self._wake_lock:
+                            self._wake_pending = False
+                            while self._wake_reader.poll():
+                                self._wake_reader.recv_bytes()
+                    elif obj in by_conn:
+                        worker = by_conn[obj]
+                        try:
+                            while worker.conn.poll():
+                                self._handle_message(worker, worker.conn.recv())
+                        except (EOFError, OSError):
+                            self._reap(worker)
+                    elif obj in by_sentinel:
+                        worker = by_sentinel[obj]
+                        if worker in self._workers:
+                            # Drain any final result before declaring the job lost
+                            try:
+                                while worker.conn.poll():
+                                    self._handle_message(worker, worker.conn.recv())
+                            except (EOFError, OSError):
+                                pass
+                            self._reap(worker)
+
+                if not self._closed:
+                    self._adjust_workers()
+                    self._dispatch()
+
+        self._stop_workers()
+
+    def _stop_workers(self):
+        with self._lock:
+            workers = list(self._workers)
+            self._workers.clear()
+        for worker in workers:
+            self._send(worker, None)
+        for worker in workers:
+            worker.process.join(1.0)
+            if worker.process.is_alive():
+                worker.process.terminate()
+                worker.process.join(1.0)
+            if worker.job is not None and not worker.job[2].done():
+                worker.job[2].set_exception(RuntimeError("pyttsx3 worker pool shut down"))